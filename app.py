@@ -1,6 +1,8 @@
 # Standard library imports
+import asyncio
 import json
 import threading
+from functools import partial
 from multiprocessing import Queue
 from typing import Callable, Generator, Union
 
@@ -9,17 +11,25 @@ from flask import Flask, request, Response, stream_with_context
 from flask_cors import CORS
 
 # Local imports
+from cache import cache
 from progress_sink import ProgressSink
 from generate_recent_news import GenerateRecentNews
 from search_term_generation import generate_search_terms
 from websearch import perform_web_search
-from crawling import perform_crawling
+from crawling import perform_crawling, hedging_budget
+from detection_of_near_duplicate_articles import detect_near_duplicate_articles
+from article_pre_ranking import pre_rank_articles
 from identification_of_relevant_articles import identify_relevant_articles
 from generation_of_most_impactful_news import generate_most_impactful_news
+from async_pipeline import execute_pipeline_steps_async
 from utils import *
 
 app = Flask(__name__)
 
+MAX_CONCURRENT_QUERIES_IN_BATCH = 8
+
+batch_worker_pool = WorkerPool(name='batch processing', max_workers=MAX_CONCURRENT_QUERIES_IN_BATCH)
+
 # Configure CORS with specific settings for streaming
 CORS(app, resources={
     r"/*": {
@@ -42,21 +52,29 @@ def after_request(response):
     return response
 
 
-def execute_pipeline_steps(query: str, sink: ProgressSink) -> GenerateRecentNews:
+def execute_pipeline_steps(query: str, sink: ProgressSink, asynchronous: bool = False) -> GenerateRecentNews:
     """
     Executes all steps of the news generation pipeline for a single query.
     
     Args:
         query (str): The search query to process
         sink (ProgressSink): A sink for logging progress
+        asynchronous (bool, optional): Whether to run the pipeline on the asyncio engine, which starts crawling
+            the URLs while the web search is still running. Defaults to False, in which case the web search
+            is completed before the crawling starts.
     
     Returns:
         GenerateRecentNews: An object containing the generated news and all intermediary results
     """
 
+    if asynchronous:
+        return asyncio.run(execute_pipeline_steps_async(query=query, sink=sink))
+
     news_generation_pipeline_output = generate_search_terms(query=query, sink=sink)
     news_generation_pipeline_output = perform_web_search(recent_news=news_generation_pipeline_output, sink=sink)
     news_generation_pipeline_output = perform_crawling(recent_news=news_generation_pipeline_output, sink=sink)
+    news_generation_pipeline_output = detect_near_duplicate_articles(recent_news=news_generation_pipeline_output, sink=sink)
+    news_generation_pipeline_output = pre_rank_articles(recent_news=news_generation_pipeline_output, sink=sink)
     news_generation_pipeline_output = identify_relevant_articles(recent_news=news_generation_pipeline_output, sink=sink)
     news_generation_pipeline_output = generate_most_impactful_news(recent_news=news_generation_pipeline_output, sink=sink)
     return news_generation_pipeline_output
@@ -77,7 +95,11 @@ def run_pipeline(request_body: dict, queue: Queue) -> None:
     sink = ProgressSink(queue=queue)
     query = request_body['query']
     
-    news_generation_pipeline_output = execute_pipeline_steps(query=query, sink=sink)
+    news_generation_pipeline_output = execute_pipeline_steps(
+        query=query,
+        sink=sink,
+        asynchronous=request_body.get('asynchronous', False)
+    )
     sink.send_final(final_output=news_generation_pipeline_output._serialize_most_impactful_news())
 
 
@@ -152,7 +174,7 @@ def read_data(input_filename: str, n_rows: Union[str, None] = None) -> list[str]
 
 def start_rate_limiters(max_search_requests_per_sec: int = 30, max_llm_requests_per_sec: int = 5) -> None:
     """
-    Initializes and starts the rate limiters for search and LLM requests.
+    Configures the rate limiters for search and LLM requests. The token buckets refill by themselves, without background processes.
     
     Args:
         max_search_requests_per_sec (int, optional): Maximum search requests per second. Defaults to 30.
@@ -178,20 +200,11 @@ def start_rate_limiters(max_search_requests_per_sec: int = 30, max_llm_requests_
         rate_limiter_llm_calls.update_max_requests_per_sec(max_requests_per_sec=max_llm_requests_per_sec)
     
     # Log the current limits in a single statement
-    log.info('Rate limiters configured: search={}/sec, llm={}/sec\n'.format(
+    log.info('Rate limiters configured with maximum rates: search={}/sec, llm={}/sec\n'.format(
         rate_limiter_search_requests.get_max_requests_per_sec(),
         rate_limiter_llm_calls.get_max_requests_per_sec()
     ))
     
-    # Start background processes for both limiters
-    processes = []
-    for limiter in [rate_limiter_search_requests, rate_limiter_llm_calls]:
-        process = Process(target=limiter.reset_count, daemon=True)
-        process.start()
-        processes.append(process)
-    
-    log.info('Started {} background processes for rate limiters\n'.format(len(processes)))
-
 
 def process_batch(
     pipeline: Callable, 
@@ -229,10 +242,11 @@ def process_batch(
         'parallel' if in_parallel else 'sequential'
     ))
 
-    # Configure rate limiters based on processing mode
+    # The rate limiters are shared by all the queries and adapt to the throttling of the providers in both modes,
+    # so the same maximum rates apply in both modes
     rate_limits = {
-        'search': 10 if in_parallel else 30,
-        'llm': 1 if in_parallel else 5
+        'search': 30,
+        'llm': 5
     }
     start_rate_limiters(
         max_search_requests_per_sec=rate_limits['search'],
@@ -260,17 +274,13 @@ def process_batch(
         return pipeline_output
 
     if in_parallel:
-        # Use a wrapper to capture results in parallel processing
-        def parallel_wrapper(query, batch_processing_results):
-            result = process_single_query(query)
-            batch_processing_results.append(result)
-            return result
-
-        batch_processing_results = list(run_multiple_with_limited_time(
-            func=parallel_wrapper,
+        # Process queries in parallel on the batch worker pool
+        batch_processing_results = run_multiple_with_limited_time(
+            func=process_single_query,
             args=queries,
-            max_time=None
-        ))
+            max_time=None,
+            pool=batch_worker_pool
+        )
     else:
         # Process queries sequentially
         for query in queries:
@@ -300,7 +310,14 @@ def get_statistics(batch_processing_results: list[GenerateRecentNews]) -> dict:
         'number_of_chars_in_most_impactful_news': [
             sum(len(news.news_summary) for news in result.most_impactful_news) 
             for result in batch_processing_results
-        ]
+        ],
+        'cache_statistics': cache.get_statistics(),
+        'hedging_statistics': hedging_budget.get_statistics(),
+        'rate_limiter_statistics': {
+            'search': rate_limiter_search_requests.get_statistics(),
+            'llm': rate_limiter_llm_calls.get_statistics(),
+            'crawlbase': rate_limiter_crawlbase.get_statistics()
+        }
     }
 
 
@@ -360,7 +377,7 @@ def run_pipeline_batch(request_body: dict, queue: Queue) -> None:
         
         # Process batch
         batch_processing_results = process_batch(
-            pipeline=execute_pipeline_steps,
+            pipeline=partial(execute_pipeline_steps, asynchronous=request_body.get('asynchronous', False)),
             queries=queries,
             output_writer=output_writer,
             sink_summary_progress_messages=sink,
@@ -459,6 +476,21 @@ def health_check() -> tuple[str, int, dict]:
     return json.dumps({"message": "Request {} was successful!".format(query)}), 200, {"Content-Type": "application/json"}
 
 
+@app.route("/rate_limits", methods=["GET"])
+def rate_limits() -> tuple[str, int, dict]:
+    """
+    Endpoint reporting the effective rates of the adaptive rate limiters of the upstream services.
+    
+    Returns:
+        tuple[str, int, dict]: The statistics of each rate limiter, status code, and headers
+    """
+    return json.dumps({
+        'search': rate_limiter_search_requests.get_statistics(),
+        'llm': rate_limiter_llm_calls.get_statistics(),
+        'crawlbase': rate_limiter_crawlbase.get_statistics()
+    }), 200, {"Content-Type": "application/json"}
+
+
 @app.route("/health_check_streaming", methods=["POST"])
 def health_check_streaming():
     data = request.get_json()
@@ -0,0 +1,150 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+from generate_recent_news import GenerateRecentNews
+from progress_sink import ProgressSink
+from utils import log, get_and_log_current_time, log_processing_duration
+
+
+MAX_PRE_RANKED_ARTICLES = int(os.environ.get('MAX_PRE_RANKED_ARTICLES', 30)) #Articles kept for the identification of relevant articles
+BM25_K1 = 1.5 #Saturation of the term frequencies
+BM25_B = 0.75 #Normalization of the term frequencies by the length of the article
+QUERY_WEIGHT = 3.0 #Weight of the score against the query and its meaning, relative to the best score against a single search term
+
+# Words which carry no topic: English function words, and the words which the generated search terms are padded with
+STOPWORDS = frozenset('''
+    a about above after again against all am an and any are as at be because been before being below between both but by
+    can could did do does doing down during each few for from further had has have having he her here hers herself him himself
+    his how i if in into is it its itself just me more most my myself no nor not now of off on once only or other our ours
+    ourselves out over own same she should so some such than that the their theirs them themselves then there these they this
+    those through to too under until up very was we were what when where which while who whom why will with would you your
+    yours yourself yourselves
+    breaking current daily headlines latest new news recent report reports today update updates week
+'''.split())
+
+
+def _tokenize(text: str) -> list[str]:
+    return [term for term in re.findall(r'\w+', text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over a set of documents, such as the texts of the crawled articles.
+    The term frequencies of each document are kept as sparse counters, so that scoring a query only visits the terms of the query.
+    """
+
+    def __init__(self, documents: dict[str, str], k1: float = BM25_K1, b: float = BM25_B) -> None:
+        self.k1 = k1
+        self.b = b
+        self.term_frequencies = {key: Counter(_tokenize(text)) for key, text in documents.items()}
+        self.lengths = {key: sum(frequencies.values()) for key, frequencies in self.term_frequencies.items()}
+        self.average_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0
+        self.document_frequencies = Counter(term for frequencies in self.term_frequencies.values() for term in frequencies)
+
+    def _get_idf(self, term: str) -> float:
+        number_of_documents = len(self.term_frequencies)
+        document_frequency = self.document_frequencies[term]
+        return math.log((number_of_documents - document_frequency + 0.5) / (document_frequency + 0.5) + 1)
+
+    def score(self, query: str) -> dict[str, float]:
+        """
+        Scores the documents against a query
+
+        Args:
+            query (str): The query, whose distinct terms are matched
+
+        Returns:
+            dict[str, float]: The BM25 score of each document, 0 for the documents containing none of the terms of the query
+        """
+
+        scores = dict.fromkeys(self.term_frequencies, 0.0)
+        for term in set(_tokenize(query)):
+            if not self.document_frequencies[term]:
+                continue
+            idf = self._get_idf(term=term)
+            for key, frequencies in self.term_frequencies.items():
+                frequency = frequencies[term]
+                if frequency:
+                    length_normalization = 1 - self.b + self.b * self.lengths[key] / self.average_length
+                    scores[key] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_normalization)
+        return scores
+
+
+def select_top_articles(articles: dict[str, str], query: str, max_articles: int, search_terms: Optional[list[str]] = None) -> dict[str, str]:
+    """
+    Selects the articles which are the most relevant to a query according to BM25.
+    The score of an article is its score against the query, weighted by QUERY_WEIGHT, plus its best score against a single
+    search term, so that broad search terms, such as those about the whole market, do not add up in favour of market wraps.
+    Articles which contain none of the terms of the query and of the search terms are dropped, unless no article contains any of them.
+
+    Args:
+        articles (dict[str, str]): A dictionary containing for each URL the text of the article
+        query (str): The query the articles are ranked against
+        max_articles (int): The maximum number of articles to keep
+        search_terms (Optional[list[str]]): The search terms the articles are also ranked against
+
+    Returns:
+        dict[str, str]: The selected articles, in the order of the input
+    """
+
+    index = BM25Index(documents=articles)
+    search_term_scores = [index.score(query=search_term) for search_term in search_terms or []]
+    scores = {
+        url: QUERY_WEIGHT * score + max((term_scores[url] for term_scores in search_term_scores), default=0.0)
+        for url, score in index.score(query=query).items()
+    }
+    ranked_urls = sorted(articles, key=lambda url: scores[url], reverse=True)
+    if scores and scores[ranked_urls[0]] > 0:
+        ranked_urls = [url for url in ranked_urls if scores[url] > 0]
+
+    selected_urls = set(ranked_urls[:max_articles])
+    return {url: content for url, content in articles.items() if url in selected_urls}
+
+
+def pre_rank_articles(recent_news: GenerateRecentNews, sink: ProgressSink, max_articles: int = MAX_PRE_RANKED_ARTICLES) -> GenerateRecentNews:
+    """
+    Keeps only the parsed articles which are the most relevant to the query, ranked locally with BM25 against the query
+    and its meaning, and against each search term, so that off-topic articles are not sent to the LLM
+
+    Args:
+        recent_news (GenerateRecentNews): The news generation request, having the parsed_urls field populated
+        sink (ProgressSink): A message sink to which progress messages are sent
+        max_articles (int, optional): The maximum number of articles to keep. Defaults to MAX_PRE_RANKED_ARTICLES
+
+    Returns:
+        GenerateRecentNews: A new object whose parsed URLs only contain the top-ranked articles
+    """
+
+    timestamp_start = get_and_log_current_time(message=f'The pre-ranking of the articles for {recent_news.query} started at', sink=sink)
+
+    articles = recent_news.parsed_urls or {}
+    parsed_urls = select_top_articles(
+        articles=articles,
+        query=f'{recent_news.query} {recent_news.query_meaning or ""}',
+        max_articles=max_articles,
+        search_terms=recent_news.search_terms
+    )
+
+    message = f'{len(parsed_urls)} articles out of {len(articles)} were kept by the pre-ranking'
+    log.info(msg=message + '\n')
+    sink.send(message=message)
+
+    timestamp_end = get_and_log_current_time(message=f'The pre-ranking of the articles for {recent_news.query} finished at', sink=sink)
+    log_processing_duration(
+        timestamp_start=timestamp_start,
+        timestamp_end=timestamp_end,
+        message=f'The pre-ranking of the articles for {recent_news.query}',
+        sink=sink
+    )
+
+    return GenerateRecentNews(
+        query=recent_news.query,
+        query_meaning=recent_news.query_meaning,
+        search_terms=recent_news.search_terms,
+        retrieved_urls=recent_news.retrieved_urls,
+        parsed_urls=parsed_urls,
+        alternate_urls={url: alternates for url, alternates in (recent_news.alternate_urls or {}).items() if url in parsed_urls}
+    )
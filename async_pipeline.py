@@ -0,0 +1,208 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from article_pre_ranking import pre_rank_articles
+from crawling import MAX_CONCURRENT_CRAWLS_PER_DOMAIN, _get_domain, _processWebpage_async, _is_crawlable, _set_entry_for_timed_out_crawls, _remove_paragraphs_repeated_across_pages, _get_urls_that_could_be_parsed
+from detection_of_near_duplicate_articles import detect_near_duplicate_articles
+from generate_recent_news import GenerateRecentNews
+from generation_of_most_impactful_news import generate_most_impactful_news
+from identification_of_relevant_articles import identify_relevant_articles_async
+from llm_client import llm_worker_pool
+from progress_sink import ProgressSink
+from url_canonicalization import canonicalize_url
+from search_term_generation import generate_search_terms
+from utils import log, get_and_log_current_time, log_processing_duration
+from websearch import MAX_TIME_WEBSEARCH_PER_SEARCH_TERM, _set_entry_for_timed_out_searches, _log_search_results
+from websearch_client import websearch_client
+
+
+class CrawlingHandoff:
+    """
+    Streams the URLs returned by the web search to the crawling.
+    The search results of each search term are deduplicated incrementally and the new URLs are put on a crawl queue,
+    from which a consumer starts the crawling right away, while the other search terms are still being searched.
+    If max_concurrent_per_domain is given, at most that many URLs of the same domain are crawled at once.
+    The handoff is only used by the asyncio engine of the pipeline, which is opt-in (asynchronous=True): the default,
+    synchronous pipeline still runs perform_web_search to completion before perform_crawling starts.
+    """
+
+    def __init__(self, crawl: Callable[[str], Awaitable[Any]], max_concurrent_per_domain: Optional[int] = None) -> None:
+        self.crawl = crawl
+        self.max_concurrent_per_domain = max_concurrent_per_domain
+        self.domain_semaphores = {}
+        self.queue = asyncio.Queue()
+        self.original_urls = {}
+        self.crawling_tasks = {}
+        self.statistics_at_end_of_search = None
+        self._consumer = asyncio.ensure_future(self._consume())
+
+    async def _consume(self) -> None:
+        """Starts the crawling of each URL put on the crawl queue, until the end of the search is signalled."""
+        while True:
+            url = await self.queue.get()
+            if url is None:
+                return
+            self.crawling_tasks[url] = asyncio.ensure_future(self._crawl_within_domain_limit(url))
+
+    async def _crawl_within_domain_limit(self, url: str) -> Any:
+        """Crawls a URL once fewer than max_concurrent_per_domain URLs of its domain are being crawled."""
+        if self.max_concurrent_per_domain is None:
+            return await self.crawl(url)
+
+        domain = _get_domain(url=url)
+        if domain not in self.domain_semaphores:
+            self.domain_semaphores[domain] = asyncio.Semaphore(self.max_concurrent_per_domain)
+        async with self.domain_semaphores[domain]:
+            return await self.crawl(url)
+
+    def add_search_results(self, urls: list[str]) -> int:
+        """
+        Puts on the crawl queue the URLs which have not been returned by a previous search term, comparing their canonical forms.
+        The first URL returned for each canonical form is the one which is crawled, since its canonical form may not be fetchable.
+        
+        Args:
+            urls (list[str]): The URLs returned by a search term
+        
+        Returns:
+            int: The number of URLs which were put on the crawl queue
+        """
+
+        new_urls = []
+        for url in urls:
+            canonical_url = canonicalize_url(url=url)
+            if canonical_url not in self.original_urls:
+                self.original_urls[canonical_url] = url
+                new_urls.append(url)
+        for url in new_urls:
+            if _is_crawlable(url=url):
+                self.queue.put_nowait(url)
+        return len(new_urls)
+
+    def get_statistics(self) -> dict[str, int]:
+        """Returns how far the crawling of the URLs which have been handed off has progressed."""
+        return {
+            'number_of_urls_handed_off': self.queue.qsize() + len(self.crawling_tasks),
+            'number_of_urls_queued': self.queue.qsize(),
+            'number_of_urls_in_flight': self.queue.qsize() + sum(1 for task in self.crawling_tasks.values() if not task.done()),
+            'number_of_urls_crawled': sum(1 for task in self.crawling_tasks.values() if task.done())
+        }
+
+    def end_of_search(self) -> dict[str, int]:
+        """
+        Signals that the last search term has been searched and records the progress of the crawling at that moment,
+        which measures the overlap gained by streaming.
+        
+        Returns:
+            dict[str, int]: The statistics of the handoff at the end of the web search
+        """
+
+        self.statistics_at_end_of_search = self.get_statistics()
+        self.queue.put_nowait(None)
+        return self.statistics_at_end_of_search
+
+    async def get_crawling_results(self) -> dict[str, Optional[Any]]:
+        """Waits for the crawling of all the URLs which have been handed off and returns the results by URL."""
+        await self._consumer
+        crawling_outputs = await asyncio.gather(*self.crawling_tasks.values())
+        return dict(zip(self.crawling_tasks.keys(), crawling_outputs))
+
+
+async def perform_web_search_and_crawling_async(recent_news: GenerateRecentNews, sink: ProgressSink) -> GenerateRecentNews:
+    """
+    Performs the web search of the generated search terms and the crawling of the retrieved URLs concurrently.
+    The crawling of a URL starts as soon as the first search term returning it has been searched.
+
+    Args:
+        recent_news (GenerateRecentNews): The news generation request, having the search_terms field populated
+        sink (ProgressSink): A message sink to which progress messages are sent
+
+    Returns:
+        GenerateRecentNews: A new object with the retrieved URLs and the crawled URLs
+
+    Raises:
+        Exception: If search_terms is empty or if no URLs have been returned by the web search
+    """
+
+    if len(recent_news.search_terms) == 0:
+        raise Exception("Search terms have not been generated")
+
+    timestamp_start = get_and_log_current_time(message=f'The web search and crawling for {recent_news.query} started at', sink=sink)
+
+    search_results = {}
+    handoff = CrawlingHandoff(crawl=lambda url: _processWebpage_async(url=url), max_concurrent_per_domain=MAX_CONCURRENT_CRAWLS_PER_DOMAIN)
+
+    async def search(search_term: str) -> None:
+        try:
+            response = await websearch_client.search_web_async(search_term, max_time=MAX_TIME_WEBSEARCH_PER_SEARCH_TERM)
+        except Exception as e:
+            log.info(msg=f'The web search for {search_term} did not finish: {e!r}\n')
+            return
+
+        search_results[search_term] = response['search_results']
+        handoff.add_search_results(urls=response['search_results'])
+
+    await asyncio.gather(*(search(search_term) for search_term in recent_news.search_terms))
+    handoff_statistics = handoff.end_of_search()
+
+    search_results = _set_entry_for_timed_out_searches(search_terms=recent_news.search_terms, search_results=search_results)
+    _log_search_results(search_results=search_results)
+
+    # The URLs which were handed off, so that the variant of each article which is crawled is also the one which is retrieved
+    retrieved_urls = sorted(handoff.original_urls.values())
+    sink.send(message=f'Found {len(retrieved_urls)} search results')
+    log.info(msg=f'Found {len(retrieved_urls)} search results\n')
+
+    message = (f'When the web search finished, {handoff_statistics["number_of_urls_crawled"]} URLs had already been crawled '
+               f'and {handoff_statistics["number_of_urls_in_flight"]} URLs were being crawled')
+    sink.send(message=message)
+    log.info(msg=message + '\n')
+
+    crawling_outputs = await handoff.get_crawling_results()
+
+    if not retrieved_urls:
+        raise Exception("No URLs have been returned by the web search")
+
+    crawling_results = {url: output['content'] for url, output in crawling_outputs.items() if output is not None}
+    crawling_results = _set_entry_for_timed_out_crawls(retrieved_urls=retrieved_urls, crawling_results=crawling_results)
+    crawling_results = _remove_paragraphs_repeated_across_pages(crawling_results=crawling_results)
+    parsed_urls = _get_urls_that_could_be_parsed(crawling_results=crawling_results, sink=sink)
+
+    timestamp_end = get_and_log_current_time(message=f'The web search and crawling for {recent_news.query} finished at', sink=sink)
+    log_processing_duration(
+        timestamp_start=timestamp_start,
+        timestamp_end=timestamp_end,
+        message=f'The web search and crawling for {recent_news.query}',
+        sink=sink
+    )
+
+    return GenerateRecentNews(
+        query=recent_news.query,
+        query_meaning=recent_news.query_meaning,
+        search_terms=recent_news.search_terms,
+        retrieved_urls=retrieved_urls,
+        parsed_urls=parsed_urls
+    )
+
+
+async def execute_pipeline_steps_async(query: str, sink: ProgressSink) -> GenerateRecentNews:
+    """
+    Executes all steps of the news generation pipeline for a single query, overlapping the web search and the crawling
+    and running the LLM calls as coroutines.
+
+    Args:
+        query (str): The search query to process
+        sink (ProgressSink): A sink for logging progress
+
+    Returns:
+        GenerateRecentNews: An object containing the generated news and all intermediary results
+    """
+
+    news_generation_pipeline_output = await llm_worker_pool.run_async(generate_search_terms, query=query, sink=sink)
+    news_generation_pipeline_output = await perform_web_search_and_crawling_async(recent_news=news_generation_pipeline_output, sink=sink)
+    # The detection of near-duplicates and the pre-ranking are local and CPU-bound, so they run on the default thread pool
+    # rather than taking workers of the LLM calls
+    news_generation_pipeline_output = await asyncio.to_thread(detect_near_duplicate_articles, recent_news=news_generation_pipeline_output, sink=sink)
+    news_generation_pipeline_output = await asyncio.to_thread(pre_rank_articles, recent_news=news_generation_pipeline_output, sink=sink)
+    news_generation_pipeline_output = await identify_relevant_articles_async(recent_news=news_generation_pipeline_output, sink=sink)
+    news_generation_pipeline_output = await llm_worker_pool.run_async(generate_most_impactful_news, recent_news=news_generation_pipeline_output, sink=sink)
+    return news_generation_pipeline_output
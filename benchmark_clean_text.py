@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of llm_client.clean_text against the former implementation, which made one str.replace pass
+per quote character and per contraction, on a corpus of recorded LLM responses.
+
+Usage:
+    python benchmark_clean_text.py <directory of .txt or .json files> [--repeat N]
+
+Each file of the corpus contains the raw text of one LLM response, before it is cleaned and parsed as JSON.
+"""
+
+import argparse
+import glob
+import os
+import time
+from typing import Callable
+
+from llm_client import QUOTE_REPLACEMENTS, clean_text
+
+
+def clean_text_with_sequential_replacements(text: str) -> str:
+    """The former implementation of clean_text, which is the reference for the output of the current one."""
+    if text.startswith('```json'):
+        text = text[7:]
+    if text.startswith('```'):
+        text = text[3:]
+    if text.endswith('```'):
+        text = text[:-3]
+
+    text = text.strip()
+    text = text.replace('`', '')
+
+    for curly, straight in QUOTE_REPLACEMENTS.items():
+        text = text.replace(curly, straight)
+
+    for contraction in ["'s", "'t", "'m", "'re", "'ve", "'ll", "'d"]:
+        text = text.replace(contraction, '\\' + contraction)
+
+    return text
+
+
+def load_corpus(directory: str) -> dict[str, str]:
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.txt')) + glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, encoding='utf-8') as file:
+            corpus[os.path.basename(path)] = file.read()
+    return corpus
+
+
+def benchmark(function: Callable[[str], str], corpus: dict[str, str], repeat: int) -> float:
+    """Returns the best total time over the repetitions to clean all the responses of the corpus."""
+    best_duration = float('inf')
+    for _ in range(repeat):
+        timestamp_start = time.perf_counter()
+        for text in corpus.values():
+            function(text)
+        best_duration = min(best_duration, time.perf_counter() - timestamp_start)
+    return best_duration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the speed and the output of clean_text with its former implementation')
+    parser.add_argument('directory', help='Directory containing the recorded LLM responses')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of passes over the corpus, the fastest one is reported')
+    arguments = parser.parse_args()
+
+    corpus = load_corpus(directory=arguments.directory)
+    if not corpus:
+        raise SystemExit(f'No .txt or .json files found in {arguments.directory}')
+
+    corpus_size = sum(len(text) for text in corpus.values())
+    print(f'{len(corpus)} responses, {corpus_size / 1e3:.1f} k characters')
+
+    identical_responses = sum(1 for text in corpus.values() if clean_text(text) == clean_text_with_sequential_replacements(text))
+    print(f'Identical output on {identical_responses}/{len(corpus)} responses')
+
+    for name, function in [('sequential', clean_text_with_sequential_replacements), ('current', clean_text)]:
+        duration = benchmark(function=function, corpus=corpus, repeat=arguments.repeat)
+        print(f'{name:>12}: {duration * 1e6 / len(corpus):8.1f} us per response, {corpus_size / duration / 1e6:6.1f} M characters/s')
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the text extraction engines on a corpus of saved HTML pages.
+
+Usage:
+    python benchmark_text_extraction.py <directory of .html files> [--repeat N]
+
+The pages of a corpus can be saved with:
+    curl -s -o pages/reuters-1.html <url>
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from text_extraction import EXTRACTION_ENGINES
+
+
+def load_corpus(directory: str) -> dict[str, str]:
+    """Reads the .html files of a directory, decoding them as the crawler decodes pages without a declared charset."""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, 'rb') as file:
+            corpus[os.path.basename(path)] = file.read().decode('utf-8', errors='replace')
+    return corpus
+
+
+def benchmark_engine(engine_name: str, corpus: dict[str, str], repeat: int) -> tuple[float, dict[str, set[str]]]:
+    """Returns the best total extraction time over the repetitions and the set of paragraphs extracted from each page."""
+    engine = EXTRACTION_ENGINES[engine_name]()
+    best_duration = float('inf')
+    paragraphs = {}
+    for _ in range(repeat):
+        timestamp_start = time.perf_counter()
+        for name, html in corpus.items():
+            paragraphs[name] = set(engine.extract_paragraphs(html=html))
+        best_duration = min(best_duration, time.perf_counter() - timestamp_start)
+    return best_duration, paragraphs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the speed and the output of the text extraction engines')
+    parser.add_argument('directory', help='Directory containing the saved HTML pages')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of passes over the corpus, the fastest one is reported')
+    arguments = parser.parse_args()
+
+    corpus = load_corpus(directory=arguments.directory)
+    if not corpus:
+        raise SystemExit(f'No .html files found in {arguments.directory}')
+
+    corpus_size = sum(len(html) for html in corpus.values())
+    print(f'{len(corpus)} pages, {corpus_size / 1e6:.1f} MB')
+
+    results = {name: benchmark_engine(engine_name=name, corpus=corpus, repeat=arguments.repeat) for name in EXTRACTION_ENGINES}
+    reference_name = 'beautifulsoup'
+    _, reference_paragraphs = results[reference_name]
+
+    for name, (duration, paragraphs) in results.items():
+        identical_pages = sum(1 for page in corpus if paragraphs[page] == reference_paragraphs[page])
+        print(
+            f'{name:>15}: {duration * 1000 / len(corpus):8.2f} ms per page, '
+            f'{corpus_size / duration / 1e6:6.1f} MB/s, '
+            f'same paragraphs as {reference_name} on {identical_pages}/{len(corpus)} pages'
+        )
@@ -1,9 +1,385 @@
 import diskcache as dc
 import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
 
 # Create cache directory if it doesn't exist
 cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
 os.makedirs(cache_dir, exist_ok=True)
 
-cache = dc.Cache(cache_dir)
-TTL = 3600 #1 hour in seconds
\ No newline at end of file
+TTL = 3600 #1 hour in seconds, for the entries which do not belong to a namespace
+MEMORY_CACHE_MAX_SIZE = 256 * 1024 * 1024 #256 MiB
+COMPRESSION_THRESHOLD = 1024 #Values smaller than 1 KiB are stored uncompressed
+COMPRESSION_LEVEL = 6
+SINGLE_FLIGHT_LEASE = 60 #Seconds after which a single-flight lock is released, in case its holder died
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+MAX_CONCURRENT_REVALIDATIONS = 4
+
+_MISSING = object()
+_NAMESPACE_TTL = object()
+
+
+@dataclass(frozen=True)
+class CacheNamespace:
+    """
+    A group of cache entries sharing a key prefix and a storage policy.
+    Entries are fresh for ttl seconds. If stale_ttl is positive, they are then kept stale for stale_ttl more seconds,
+    during which they can be served while they are revalidated in the background (stale-while-revalidate).
+    Entries of the namespaces which are not in_memory are only kept on disk, so that each process sees at once the writes of the others.
+    """
+    name: str
+    key_prefix: str
+    ttl: Optional[float] = TTL
+    stale_ttl: float = 0
+    compress: bool = False
+    in_memory: bool = True
+
+
+CACHE_NAMESPACES = [
+    #Searches are restricted to today's news, so their results go stale quickly
+    CacheNamespace(name='search results', key_prefix='Search results for: ', ttl=15 * 60, stale_ttl=2 * 3600),
+    #The text of a published article basically never changes. Stale texts are kept to be revalidated with conditional requests
+    CacheNamespace(name='crawled content', key_prefix='Crawled content of the website: ', ttl=7 * 24 * 3600, stale_ttl=30 * 24 * 3600, compress=True),
+    #The ETag and Last-Modified validators of the crawled pages live as long as their stale texts
+    CacheNamespace(name='page validators', key_prefix='Validators of the website: ', ttl=(7 + 30) * 24 * 3600),
+    CacheNamespace(name='LLM answers', key_prefix='LLM answer', ttl=TTL, compress=True),
+    #The state of a circuit breaker is shared by the crawling processes, so it is always read from disk
+    CacheNamespace(name='circuit breakers', key_prefix='Circuit breaker ', ttl=TTL, in_memory=False),
+]
+
+
+def get_cache_namespace(key: Any) -> Optional[CacheNamespace]:
+    """Returns the namespace a cache key belongs to, or None if it does not belong to any namespace."""
+    if not isinstance(key, str):
+        return None
+    return next((namespace for namespace in CACHE_NAMESPACES if key.startswith(namespace.key_prefix)), None)
+
+
+def _is_kept_in_memory(key: Any) -> bool:
+    """Returns whether the entry of a cache key is kept in the memory tier, which is the case unless its namespace opts out."""
+    namespace = get_cache_namespace(key)
+    return namespace is None or namespace.in_memory
+
+
+@dataclass(frozen=True)
+class CompressedValue:
+    """A value stored zlib-compressed on disk, either a UTF-8 encoded string or a pickled object."""
+    data: bytes
+    is_pickled: bool
+
+    def decompress(self) -> Any:
+        raw_data = zlib.decompress(self.data)
+        return pickle.loads(raw_data) if self.is_pickled else raw_data.decode('utf-8')
+
+
+class TieredCache:
+    """
+    Cache facade putting a bounded in-process LRU tier in front of a diskcache.Cache.
+    Entries are written through to both tiers and evicted from the memory tier when they expire
+    or when the total size of the memory tier exceeds its bound, least recently used first.
+    Values other than strings and bytes are kept pickled in the memory tier, so that callers always get their own copy.
+    Values of the namespaces which are configured for compression are stored zlib-compressed on disk when they are large enough.
+    Entries expire after the TTL of their namespace unless an explicit expiry is given. The entries of the namespaces with
+    a stale TTL are kept on disk past their freshness, with the time until which they are fresh stored as their diskcache tag,
+    unless they are set without a stale TTL, as the markers of failures are.
+    """
+
+    def __init__(self, disk_cache: dc.Cache, max_memory_size: int = MEMORY_CACHE_MAX_SIZE) -> None:
+        self.disk_cache = disk_cache
+        self.max_memory_size = max_memory_size
+        self._memory_entries = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._statistics = {tier: {'hits': 0, 'misses': 0} for tier in ('memory', 'disk')}
+        self._single_flight_statistics = {'acquisitions': 0, 'waits': 0, 'timeouts': 0}
+        self._key_locks = {}
+        self._revalidation_statistics = {'stale_hits': 0, 'revalidations': 0, 'failed_revalidations': 0}
+        self._revalidating_keys = set()
+        self._revalidation_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REVALIDATIONS, thread_name_prefix='cache_revalidation')
+        self._compression_statistics = {
+            namespace.name: {'compressed_entries': 0, 'uncompressed_bytes': 0, 'compressed_bytes': 0}
+            for namespace in CACHE_NAMESPACES if namespace.compress
+        }
+
+    def _count(self, tier: str, outcome: str) -> None:
+        with self._lock:
+            self._statistics[tier][outcome] += 1
+
+    def _remove_from_memory(self, key: Any) -> None:
+        """Removes an entry from the memory tier. The lock must be held by the caller."""
+        entry = self._memory_entries.pop(key, None)
+        if entry is not None:
+            self._memory_size -= entry[-1]
+
+    def _set_in_memory(self, key: Any, value: Any, expire_time: Optional[float], fresh_until: Optional[float]) -> None:
+        """Stores an entry into the memory tier and evicts the least recently used entries beyond the size bound."""
+        is_pickled = not isinstance(value, (str, bytes))
+        stored_value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) if is_pickled else value
+        size = len(stored_value)
+        if size > self.max_memory_size:
+            return
+
+        with self._lock:
+            self._remove_from_memory(key)
+            self._memory_entries[key] = (stored_value, is_pickled, expire_time, fresh_until, size)
+            self._memory_size += size
+            while self._memory_size > self.max_memory_size:
+                _, evicted_entry = self._memory_entries.popitem(last=False)
+                self._memory_size -= evicted_entry[-1]
+
+    def _get_from_memory(self, key: Any) -> tuple[Any, Optional[float], Optional[float]]:
+        """Returns the value, the expiration time and the freshness limit of an entry of the memory tier, or _MISSING if there is no entry."""
+        with self._lock:
+            entry = self._memory_entries.get(key)
+            if entry is None:
+                return _MISSING, None, None
+            stored_value, is_pickled, expire_time, fresh_until, _ = entry
+            if expire_time is not None and expire_time <= time.time():
+                self._remove_from_memory(key)
+                return _MISSING, None, None
+            self._memory_entries.move_to_end(key)
+
+        return (pickle.loads(stored_value) if is_pickled else stored_value), expire_time, fresh_until
+
+    def _compress_for_disk(self, key: Any, value: Any) -> Any:
+        """Compresses a value before it is stored on disk, if its namespace is configured for compression and it is large enough."""
+        namespace = get_cache_namespace(key)
+        if namespace is None or not namespace.compress:
+            return value
+
+        is_pickled = not isinstance(value, str)
+        raw_data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) if is_pickled else value.encode('utf-8')
+        if len(raw_data) < COMPRESSION_THRESHOLD:
+            return value
+
+        compressed_data = zlib.compress(raw_data, COMPRESSION_LEVEL)
+        if len(compressed_data) >= len(raw_data):
+            return value
+
+        with self._lock:
+            namespace_statistics = self._compression_statistics[namespace.name]
+            namespace_statistics['compressed_entries'] += 1
+            namespace_statistics['uncompressed_bytes'] += len(raw_data)
+            namespace_statistics['compressed_bytes'] += len(compressed_data)
+        return CompressedValue(data=compressed_data, is_pickled=is_pickled)
+
+    def _get_entry(self, key: Any) -> tuple[Any, Optional[float], Optional[float]]:
+        """
+        Gets an entry from the memory tier, falling back to the disk tier and promoting the entry into the memory tier.
+        Returns its value, which is _MISSING if there is no entry, its expiration time and the time until which it is fresh.
+        """
+
+        is_kept_in_memory = _is_kept_in_memory(key)
+        if is_kept_in_memory:
+            value, expire_time, fresh_until = self._get_from_memory(key)
+            if value is not _MISSING:
+                self._count('memory', 'hits')
+                return value, expire_time, fresh_until
+            self._count('memory', 'misses')
+
+        value, expire_time, fresh_until = self.disk_cache.get(key, default=_MISSING, expire_time=True, tag=True)
+        if value is _MISSING:
+            self._count('disk', 'misses')
+            return _MISSING, None, None
+
+        self._count('disk', 'hits')
+        if isinstance(value, CompressedValue):
+            value = value.decompress()
+        if is_kept_in_memory:
+            self._set_in_memory(key=key, value=value, expire_time=expire_time, fresh_until=fresh_until)
+        return value, expire_time, fresh_until
+
+    def get(self, key: Any, default: Any = None, expire_time: bool = False, stale: bool = False) -> Any:
+        """
+        Gets a fresh value, from the memory tier or else from the disk tier. Stale entries are treated as missing unless stale is True.
+
+        Args:
+            key (Any): The key of the entry
+            default (Any): The value returned if there is no fresh entry for the key
+            expire_time (bool): Whether to also return the expiration time of the entry, as with diskcache
+            stale (bool): Whether to also return the value of a stale entry
+
+        Returns:
+            Any: The value, or a tuple of the value and its expiration time if expire_time is True
+        """
+
+        value, entry_expire_time, fresh_until = self._get_entry(key)
+        if value is _MISSING or (not stale and fresh_until is not None and fresh_until <= time.time()):
+            value, entry_expire_time = default, None
+
+        return (value, entry_expire_time) if expire_time else value
+
+    def get_stale_while_revalidate(self, key: Any, revalidate: Callable[[], Any], default: Any = None) -> Any:
+        """
+        Gets a value, serving it even if it is stale. A stale value is returned at once,
+        while revalidate is run in the background to store a fresh value for the key.
+
+        Args:
+            key (Any): The key of the entry
+            revalidate (Callable[[], Any]): Function storing a fresh value for the key into the cache
+            default (Any): The value returned if there is no entry for the key
+
+        Returns:
+            Any: The fresh or stale value, or the default value
+        """
+
+        value, _, fresh_until = self._get_entry(key)
+        if value is _MISSING:
+            return default
+
+        if fresh_until is not None and fresh_until <= time.time():
+            with self._lock:
+                self._revalidation_statistics['stale_hits'] += 1
+                is_revalidating = key in self._revalidating_keys
+                self._revalidating_keys.add(key)
+            if not is_revalidating:
+                self._revalidation_executor.submit(self._revalidate, key, revalidate)
+
+        return value
+
+    def _revalidate(self, key: Any, revalidate: Callable[[], Any]) -> None:
+        """Runs the revalidation of a stale entry in the background."""
+        try:
+            revalidate()
+            outcome = 'revalidations'
+        except Exception:
+            outcome = 'failed_revalidations'
+        with self._lock:
+            self._revalidation_statistics[outcome] += 1
+            self._revalidating_keys.discard(key)
+
+    def set(self, key: Any, value: Any, expire: Any = _NAMESPACE_TTL, stale_ttl: Any = _NAMESPACE_TTL) -> bool:
+        """
+        Sets a value into both tiers.
+
+        Args:
+            key (Any): The key of the entry
+            value (Any): The value to store
+            expire (Optional[float]): Seconds for which the entry is fresh, None for no expiry.
+                Defaults to the TTL of the namespace of the key
+            stale_ttl (float): Seconds for which the entry is kept stale after its freshness, 0 for none.
+                Defaults to the stale TTL of the namespace of the key
+
+        Returns:
+            bool: True if the value was set
+        """
+
+        namespace = get_cache_namespace(key)
+        if expire is _NAMESPACE_TTL:
+            expire = namespace.ttl if namespace is not None else TTL
+        if stale_ttl is _NAMESPACE_TTL:
+            stale_ttl = namespace.stale_ttl if namespace is not None else 0
+        if expire is None:
+            stale_ttl = 0
+
+        now = time.time()
+        fresh_until = now + expire if stale_ttl > 0 else None
+        disk_expire = expire + stale_ttl if expire is not None else None
+
+        result = self.disk_cache.set(key, self._compress_for_disk(key=key, value=value), expire=disk_expire, tag=fresh_until)
+        if namespace is None or namespace.in_memory:
+            self._set_in_memory(key=key, value=value, expire_time=None if disk_expire is None else now + disk_expire, fresh_until=fresh_until)
+        return result
+
+    def delete(self, key: Any) -> bool:
+        """Deletes an entry from both tiers and returns True if it was found on disk."""
+        with self._lock:
+            self._remove_from_memory(key)
+        return self.disk_cache.delete(key)
+
+    def __contains__(self, key: Any) -> bool:
+        """Returns whether there is a fresh entry for the key, without counting the lookup in the hit and miss statistics."""
+        value, _, fresh_until = self._get_from_memory(key) if _is_kept_in_memory(key) else (_MISSING, None, None)
+        if value is _MISSING:
+            value, _, fresh_until = self.disk_cache.get(key, default=_MISSING, expire_time=True, tag=True)
+        return value is not _MISSING and (fresh_until is None or fresh_until > time.time())
+
+    def iterkeys(self) -> Iterator[Any]:
+        """Iterates over the keys of the disk tier, which holds all the entries."""
+        return self.disk_cache.iterkeys()
+
+    def clear(self) -> int:
+        """Removes all the entries from both tiers and returns the number of entries removed from disk."""
+        with self._lock:
+            self._memory_entries.clear()
+            self._memory_size = 0
+        return self.disk_cache.clear()
+
+    def close(self) -> None:
+        self._revalidation_executor.shutdown(wait=True)
+        self.disk_cache.close()
+
+    @contextmanager
+    def single_flight(self, key: Any, lease: float = SINGLE_FLIGHT_LEASE) -> Iterator[None]:
+        """
+        Context manager letting only one caller at a time, across threads and processes, compute the value of a key.
+        Callers should check the cache again once inside the context, since the value may have been stored
+        by the caller they waited for, and only make the outbound call if it is still missing.
+        Threads of the same process wait on a per-key lock, while processes coordinate through a lock entry
+        added atomically to the disk tier, which expires after the lease in case its holder died.
+        A caller which waited for the lease without getting the lock computes the value anyway.
+
+        Args:
+            key (Any): The cache key whose value is computed
+            lease (float): Maximum time in seconds to hold, or wait for, the lock of another thread or process
+        """
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        has_key_lock = key_lock[0].acquire(blocking=False)
+        waited = not has_key_lock
+        if waited:
+            has_key_lock = key_lock[0].acquire(timeout=lease)
+
+        lock_key = f'Single flight lock for: {key}'
+        has_lock_entry = False
+        try:
+            deadline = time.monotonic() + lease
+            while has_key_lock:
+                has_lock_entry = self.disk_cache.add(lock_key, os.getpid(), expire=lease)
+                if has_lock_entry or time.monotonic() >= deadline:
+                    break
+                waited = True
+                time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+
+            with self._lock:
+                self._single_flight_statistics['acquisitions'] += 1
+                self._single_flight_statistics['waits'] += int(waited)
+                self._single_flight_statistics['timeouts'] += int(not has_key_lock)
+
+            yield
+        finally:
+            if has_lock_entry:
+                self.disk_cache.delete(lock_key)
+            if has_key_lock:
+                key_lock[0].release()
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def get_statistics(self) -> dict[str, Any]:
+        """Returns the hit and miss counts of each tier, the current size of the memory tier and the bytes saved by compression."""
+        with self._lock:
+            return {
+                'memory': dict(self._statistics['memory'], entries=len(self._memory_entries), size=self._memory_size),
+                'disk': dict(self._statistics['disk']),
+                'single_flight': dict(self._single_flight_statistics),
+                'stale_while_revalidate': dict(self._revalidation_statistics),
+                'compression': {
+                    name: dict(namespace_statistics, bytes_saved=namespace_statistics['uncompressed_bytes'] - namespace_statistics['compressed_bytes'])
+                    for name, namespace_statistics in self._compression_statistics.items()
+                }
+            }
+
+
+cache = TieredCache(disk_cache=dc.Cache(cache_dir))
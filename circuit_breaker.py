@@ -0,0 +1,60 @@
+import threading
+
+from cache import cache
+from utils import log
+
+
+class CircuitBreaker:
+    """
+    Remembers the keys, such as the domains of crawled URLs, for which calls keep failing.
+    After failure_threshold consecutive failures for a key, the circuit of the key opens for open_duration seconds,
+    during which callers skip the call instead of waiting for it to fail again. When the circuit closes, the next call is
+    a trial: it is made again, and failure_threshold further failures reopen the circuit.
+    The state of the circuits is persisted in the cache, so that it is shared across processes and survives restarts.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, open_duration: float = 3600) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+        self._lock = threading.Lock()
+
+    def _get_cache_key(self, key: str) -> str:
+        return f'Circuit breaker {self.name} for: {key}'
+
+    def is_open(self, key: str) -> bool:
+        """
+        Checks whether calls for a key should be skipped.
+
+        Args:
+            key (str): The key, such as a domain
+
+        Returns:
+            bool: True if the circuit of the key is open
+        """
+
+        state = cache.get(self._get_cache_key(key))
+        return state is not None and state['open']
+
+    def record_success(self, key: str) -> None:
+        """Closes the circuit of a key and resets its count of consecutive failures."""
+        cache_key = self._get_cache_key(key)
+        with self._lock:
+            if cache.get(cache_key) is not None:
+                cache.delete(cache_key)
+
+    def record_failure(self, key: str) -> None:
+        """Counts a failure for a key, opening its circuit once failure_threshold consecutive failures have been counted."""
+        cache_key = self._get_cache_key(key)
+        with self._lock:
+            state = cache.get(cache_key) or {'failures': 0, 'open': False}
+            if state['open']:
+                return
+
+            failures = state['failures'] + 1
+            is_open = failures >= self.failure_threshold
+            # The failures are forgotten after open_duration seconds without a new failure
+            cache.set(cache_key, {'failures': failures, 'open': is_open}, expire=self.open_duration)
+
+        if is_open:
+            log.info(f'Circuit breaker {self.name} opened for {key} after {failures} consecutive failures\n')
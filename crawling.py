@@ -1,26 +1,117 @@
+import asyncio
+import multiprocessing
 import os
-from urllib.parse import quote_plus
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait
+from functools import partial
+from typing import Any, Callable, Optional
+from urllib.parse import quote_plus, urlparse
 
-from bs4 import BeautifulSoup
 import requests
 from dotenv import load_dotenv
 
-from cache import cache, TTL
+from cache import cache
+from circuit_breaker import CircuitBreaker
+from hedging import HedgingBudget, LatencyTracker
+from http_client import http_client, DownloadCancelled, UnsupportedContentTypeError
 from generate_recent_news import GenerateRecentNews
 from progress_sink import ProgressSink
-from utils import log, get_and_log_current_time, log_processing_duration, run_multiple_with_limited_time, convert_to_dictionary
+from text_extraction import PARAGRAPH_SEPARATOR, parse_text_from_html
+from url_canonicalization import canonicalize_url
+from utils import log, get_and_log_current_time, log_processing_duration, run_multiple_with_limited_time, convert_to_dictionary, WorkerPool, rate_limiter_crawlbase, THROTTLING_STATUS_CODES
 
 load_dotenv()
 
 MAX_TIME_WEBPAGE_CRAWLING = 5
+MAX_WEBPAGE_SIZE = int(os.environ.get('MAX_WEBPAGE_SIZE', 2 * 1024 * 1024)) #Bytes, the rest of larger pages is not downloaded
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+MIN_PAGES_WITH_BOILERPLATE = 3 #A paragraph found on fewer pages of a domain may be shared by syndicated copies or variants of an article
+MAX_BOILERPLATE_PARAGRAPH_LENGTH = 300 #Characters, longer paragraphs repeated across pages are article text rather than boilerplate
+MAX_CONCURRENT_CRAWLS = 64
+MAX_CONCURRENT_CRAWLS_PER_DOMAIN = 4
+FAILED_CRAWL_TTL = 3600 #Seconds, pages which could not be crawled are tried again after this time
+FETCHED_DIRECTLY = 'direct'
+FETCHED_USING_CRAWLBASE = 'Crawlbase'
+HEDGED_FETCH = os.environ.get('HEDGED_FETCH', 'false').lower() == 'true'
+HEDGE_DELAY_PERCENTILE = float(os.environ.get('HEDGE_DELAY_PERCENTILE', 0.9))
+DEFAULT_HEDGE_DELAY = 1.0 #Seconds, used until enough direct fetches have been timed
+MAX_HEDGE_RATIO = float(os.environ.get('MAX_HEDGE_RATIO', 0.1)) #Share of the direct fetches which may be hedged using Crawlbase
+MAX_PARSING_PROCESSES = int(os.environ.get('MAX_PARSING_PROCESSES', os.cpu_count() or 1))
+MAX_TIME_HTML_PARSING = 5 #Seconds, pages whose parsing takes longer are treated as failed
+# Forking the crawling process, whose threads may hold locks, could leave the parsing processes with locks that are never released
+PARSING_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+if PARSING_START_METHOD == 'forkserver':
+    # The fork server only preloads the parsing code, rather than the main module of the app and all its imports
+    multiprocessing.get_context('forkserver').set_forkserver_preload(['text_extraction'])
+
+crawling_worker_pool = WorkerPool(name='crawling', max_workers=MAX_CONCURRENT_CRAWLS)
+# Runs both legs of the hedged fetches, apart from the crawling worker pool from which they are started
+hedging_worker_pool = WorkerPool(name='hedged fetches', max_workers=2 * MAX_CONCURRENT_CRAWLS)
+# Parses the fetched pages, so that parsing neither competes with the fetches for the GIL nor counts against their time limit
+parsing_worker_pool = WorkerPool(name='HTML parsing', max_workers=MAX_PARSING_PROCESSES, use_processes=True, start_method=PARSING_START_METHOD)
+direct_fetch_latency = LatencyTracker()
+hedging_budget = HedgingBudget(max_hedge_ratio=MAX_HEDGE_RATIO)
+# Learns the domains which cannot be crawled directly, or at all, such as the ones blocking crawlers or rendering with JavaScript
+crawling_circuit_breaker = CircuitBreaker(name='crawling', failure_threshold=3, open_duration=6 * 3600)
+
+
+def _get_domain(url: str) -> str:
+    """
+    Gets the domain of a URL, without the www. prefix
+    
+    Args:
+        url (str): The URL
+        
+    Returns:
+        str: The domain, in lowercase
+    """
+
+    return urlparse(url).netloc.lower().removeprefix('www.')
+
+
+def _get_crawl_cache_key(url: str) -> str:
+    """Gets the cache key of the crawled content of a URL, which is the same for all the variants of the URL."""
+    return f"Crawled content of the website: {canonicalize_url(url=url)}"
+
+
+def _get_validators_cache_key(url: str) -> str:
+    """Gets the cache key of the ETag and Last-Modified validators of the crawled content of a URL."""
+    return f"Validators of the website: {canonicalize_url(url=url)}"
+
+
+def _get_conditional_request_headers(validators: Optional[dict[str, str]]) -> dict[str, str]:
+    """
+    Gets the headers of a conditional request, which the server answers with a 304 status code if the page has not changed
+    
+    Args:
+        validators (Optional[dict[str, str]]): The ETag and Last-Modified validators of the cached version of the page
+        
+    Returns:
+        dict[str, str]: The If-None-Match and If-Modified-Since headers, empty if there are no validators
+    """
 
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
 
-def _crawl_url_using_crawlbase(url: str) -> dict[str, str]:
+
+def _get_circuit_breaker_key(url: str, fetched_by: str) -> str:
+    return f'{fetched_by} {_get_domain(url=url)}'
+
+
+def _crawl_url_using_crawlbase(url: str, cancel_event: Optional[threading.Event] = None) -> dict[str, str]:
     """
     Crawls a URL using the Crawlbase API service.
     
     Args:
         url (str): The URL to crawl
+        cancel_event (Optional[threading.Event]): Event which, once set, stops the crawling
         
     Returns:
         dict[str, str]: A dictionary containing the status code and content of the crawled page
@@ -28,106 +119,424 @@ def _crawl_url_using_crawlbase(url: str) -> dict[str, str]:
 
     try:
         api_url = f"https://api.crawlbase.com/?token={os.environ.get('CRAWLBASE_API')}&url={quote_plus(url)}"
-        response = requests.get(url=api_url, timeout=MAX_TIME_WEBPAGE_CRAWLING)
-
-        if response.status_code == 200:
-            log.info(msg=f"Crawled URL {url} successfully using Crawlbase\n")
+        rate_limiter_crawlbase.acquire()
+        status_code, content = http_client.download_text(
+            url=api_url,
+            max_bytes=MAX_WEBPAGE_SIZE,
+            max_time=MAX_TIME_WEBPAGE_CRAWLING,
+            cancel_event=cancel_event
+        )
+        rate_limiter_crawlbase.record_response(status_code=status_code)
+        log.info(msg=f"Crawled URL {url} successfully using Crawlbase\n")
+        return {'status_code': status_code, 'content': content.strip(), 'fetched_by': FETCHED_USING_CRAWLBASE}
 
-        response.raise_for_status()
-        return {'status_code': response.status_code, 'content': response.text.strip()}
+    except DownloadCancelled:
+        return {'status_code': 499, 'content': '', 'fetched_by': FETCHED_USING_CRAWLBASE}
 
     except requests.exceptions.RequestException as e:
         status_code = getattr(e.response, 'status_code', 500) if hasattr(e, 'response') else 500
+        if e.response is not None:
+            rate_limiter_crawlbase.record_response(status_code=status_code)
+        # Exceeding the Crawlbase quota says nothing about the domain
+        if status_code not in THROTTLING_STATUS_CODES:
+            crawling_circuit_breaker.record_failure(key=_get_circuit_breaker_key(url=url, fetched_by=FETCHED_USING_CRAWLBASE))
         #log.info(msg=f"Error crawling URL {url} using Crawlbase: {str(e)}\n")
-        return {'status_code': status_code, 'content': ''}
+        return {'status_code': status_code, 'content': '', 'fetched_by': FETCHED_USING_CRAWLBASE}
 
 
-def _extract_text_from_url(url: str) -> dict[str, str]:
+def _fetch_directly(
+    url: str,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    validators: Optional[dict[str, str]] = None
+) -> dict[str, str]:
     """
-    Extracts text content from a URL using the requests library.
+    Fetches a URL using the shared connection-pooled HTTP client, timing how long the headers take to arrive.
+    A fetch which fails before its headers arrive, such as a timeout, is timed as DEFAULT_HEDGE_DELAY: leaving it out
+    would bias the percentile of the latencies low, while its full duration would delay every later hedge.
+    With validators, the request is conditional and its status code is 304 if the page has not changed.
     
     Args:
-        url (str): The URL to extract text from
+        url (str): The URL to fetch
+        on_response (Optional[Callable[[requests.Response], None]]): Function called as soon as the headers are received
+        cancel_event (Optional[threading.Event]): Event which, once set, stops the download
+        validators (Optional[dict[str, str]]): The ETag and Last-Modified validators of the cached version of the page
         
     Returns:
-        dict[str, str]: A dictionary containing the status code and content of the page
+        dict[str, str]: A dictionary containing the status code and content of the page, how the page was fetched,
+            and the validators of the response
+    
+    Raises:
+        requests.exceptions.RequestException: If the page could not be fetched
     """
 
+    timestamp_start = time.monotonic()
+    response_validators = {}
+    headers_received = threading.Event()
+
+    def record_response(response: requests.Response) -> None:
+        headers_received.set()
+        direct_fetch_latency.record(time.monotonic() - timestamp_start)
+        response_validators.update(
+            (name, value) for name, value in [('etag', response.headers.get('ETag')), ('last_modified', response.headers.get('Last-Modified'))] if value
+        )
+        if on_response is not None:
+            on_response(response)
+
     try:
-        response = requests.get(url=url, timeout=MAX_TIME_WEBPAGE_CRAWLING)
-        response.raise_for_status()
+        status_code, content = http_client.download_text(
+            url=url,
+            max_bytes=MAX_WEBPAGE_SIZE,
+            max_time=MAX_TIME_WEBPAGE_CRAWLING,
+            content_types=HTML_CONTENT_TYPES,
+            on_response=record_response,
+            cancel_event=cancel_event,
+            headers=_get_conditional_request_headers(validators=validators)
+        )
+    except Exception:
+        if not headers_received.is_set():
+            direct_fetch_latency.record(DEFAULT_HEDGE_DELAY)
+        raise
+    
+    #if status_code == 200:
+    #    log.info(msg=f"Crawled URL {url} successfully\n")
+
+    return {'status_code': status_code, 'content': content.strip(), 'fetched_by': FETCHED_DIRECTLY, 'validators': response_validators}
+
+
+def _get_direct_fetch_outcome(url: str, fetch: Callable[[], dict[str, str]]) -> Optional[dict[str, str]]:
+    """
+    Runs a direct fetch and handles its errors
+    
+    Args:
+        url (str): The URL being fetched
+        fetch (Callable[[], dict[str, str]]): Function fetching the URL directly, or returning the result of a direct fetch
         
-        #if response.status_code == 200:
-        #    log.info(msg=f"Crawled URL {url} successfully\n")
+    Returns:
+        Optional[dict[str, str]]: The result of the fetch, or None if the page should be fetched using Crawlbase instead
+    """
+
+    try:
+        return fetch()
 
-        return {'status_code': response.status_code, 'content': response.text.strip()}
+    except UnsupportedContentTypeError as e:
+        # Documents such as PDFs or videos would not be parsed by the Crawlbase fallback either
+        log.info(msg=f"Skipped URL {url}: {str(e)}\n")
+        return {'status_code': 415, 'content': '', 'fetched_by': FETCHED_DIRECTLY}
+
+    except DownloadCancelled:
+        return None
 
     except requests.exceptions.RequestException as e:
-        return _crawl_url_using_crawlbase(url)
+        crawling_circuit_breaker.record_failure(key=_get_circuit_breaker_key(url=url, fetched_by=FETCHED_DIRECTLY))
+        return None
 
         #status_code = getattr(e.response, 'status_code', 500) if hasattr(e, 'response') else 500
         #log.info(msg=f"Error extracting text from URL {url}: {str(e)}")
         #return {'status_code': status_code, 'content': ''}
 
 
-def _parse_text_from_url(text: str) -> str:
+def _fetch_with_hedging(url: str, validators: Optional[dict[str, str]] = None) -> dict[str, str]:
     """
-    Parses HTML text to extract clean paragraph content.
+    Fetches a URL directly and, if the headers have not arrived within the usual time of direct fetches,
+    races a Crawlbase request against it. The first successful response wins and the other request is cancelled.
+    The number of hedged Crawlbase requests is capped by the hedging budget.
+    The direct fetch can only be cancelled while its body is downloaded: a losing direct fetch whose headers have not arrived
+    keeps its worker of the hedging pool until they do or until it times out, which is why hedging is disabled by default.
     
     Args:
-        text (str): The HTML text to parse
+        url (str): The URL to fetch
+        validators (Optional[dict[str, str]]): The validators of the cached version of the page, for a conditional direct fetch
         
     Returns:
-        str: Cleaned text content with duplicate paragraphs removed. Returns empty string if input is empty, None, or contains only whitespace.
+        dict[str, str]: A dictionary containing the status code and content of the page, and how the page was fetched
     """
 
-    if not text or not text.strip():
-        return ''
+    headers_received = threading.Event()
+    cancel_direct_fetch = threading.Event()
+    cancel_hedged_fetch = threading.Event()
+
+    hedging_budget.record_request()
+    direct_fetch = hedging_worker_pool.submit(
+        _fetch_directly, url=url, on_response=lambda response: headers_received.set(), cancel_event=cancel_direct_fetch, validators=validators
+    )
+    direct_fetch.add_done_callback(lambda future: headers_received.set())
+
+    hedge_delay = direct_fetch_latency.get_percentile(percentile=HEDGE_DELAY_PERCENTILE, default=DEFAULT_HEDGE_DELAY)
+    if headers_received.wait(timeout=hedge_delay) or not hedging_budget.try_acquire():
+        outcome = _get_direct_fetch_outcome(url=url, fetch=direct_fetch.result)
+        return outcome if outcome is not None else _crawl_url_using_crawlbase(url)
+
+    log.info(msg=f"No response from {url} after {hedge_delay:.2f} seconds, hedging using Crawlbase\n")
+    hedged_fetch = hedging_worker_pool.submit(_crawl_url_using_crawlbase, url=url, cancel_event=cancel_hedged_fetch)
+
+    pending = {direct_fetch, hedged_fetch}
+    hedged_outcome = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        if direct_fetch in done:
+            outcome = _get_direct_fetch_outcome(url=url, fetch=direct_fetch.result)
+            if outcome is not None:
+                cancel_hedged_fetch.set()
+                hedged_fetch.cancel()
+                return outcome
+
+        if hedged_fetch in done:
+            hedged_outcome = hedged_fetch.result()
+            if hedged_outcome['status_code'] == 200:
+                cancel_direct_fetch.set()
+                hedging_budget.record_hedge_won()
+                return hedged_outcome
+
+    return hedged_outcome
+
+
+def _extract_text_from_url(url: str, validators: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """
+    Extracts text content from a URL using the shared connection-pooled HTTP client, falling back to Crawlbase.
+    The URLs of the domains which keep failing when crawled directly are crawled using Crawlbase right away.
+    In hedged-fetch mode, slow direct fetches are raced against Crawlbase.
+    
+    Args:
+        url (str): The URL to extract text from
+        validators (Optional[dict[str, str]]): The validators of the cached version of the page, for a conditional direct fetch
         
-    soup = BeautifulSoup(text, 'html.parser')
-    paragraphs = soup.find_all('p')
+    Returns:
+        dict[str, str]: A dictionary containing the status code and content of the page, and how the page was fetched
+    """
+
+    if crawling_circuit_breaker.is_open(key=_get_circuit_breaker_key(url=url, fetched_by=FETCHED_DIRECTLY)):
+        return _crawl_url_using_crawlbase(url)
+
+    if HEDGED_FETCH:
+        return _fetch_with_hedging(url=url, validators=validators)
+
+    outcome = _get_direct_fetch_outcome(url=url, fetch=lambda: _fetch_directly(url=url, validators=validators))
+    return outcome if outcome is not None else _crawl_url_using_crawlbase(url)
+
+
+def _remove_paragraphs_repeated_across_pages(crawling_results: dict[str, str]) -> dict[str, str]:
+    """
+    Removes the short paragraphs found on several pages of the same domain, such as cookie banners, newsletter prompts and footers.
+    A paragraph is only boilerplate if it is found on at least MIN_PAGES_WITH_BOILERPLATE pages, so that the text shared by two copies
+    of an article is kept for the detection of near-duplicate articles. A page all of whose paragraphs are repeated is left unchanged,
+    since it is a duplicate of another page rather than boilerplate.
     
-    # Use a set comprehension for deduplication and cleaning
-    unique_paragraphs = {
-        ' '.join(p.get_text().split())
-        for p in paragraphs
-    }
+    Args:
+        crawling_results (dict[str, str]): A dictionary containing for each URL the extracted text content
     
-    return ' '.join(unique_paragraphs).strip()
+    Returns:
+        dict[str, str]: The crawling results dictionary without the repeated paragraphs
+    """
 
+    urls_by_domain = defaultdict(list)
+    for url, content in crawling_results.items():
+        if content:
+            urls_by_domain[_get_domain(url=url)].append(url)
 
-def _processWebpage(url: str) -> dict[str, str]:
+    number_of_removed_paragraphs = 0
+    for urls in urls_by_domain.values():
+        if len(urls) < MIN_PAGES_WITH_BOILERPLATE:
+            continue
+
+        paragraphs_by_url = {url: crawling_results[url].split(PARAGRAPH_SEPARATOR) for url in urls}
+        page_counts = Counter(paragraph for paragraphs in paragraphs_by_url.values() for paragraph in set(paragraphs))
+        boilerplate = {
+            paragraph for paragraph, page_count in page_counts.items()
+            if page_count >= MIN_PAGES_WITH_BOILERPLATE and len(paragraph) <= MAX_BOILERPLATE_PARAGRAPH_LENGTH
+        }
+
+        for url, paragraphs in paragraphs_by_url.items():
+            kept_paragraphs = [paragraph for paragraph in paragraphs if paragraph not in boilerplate]
+            if kept_paragraphs and len(kept_paragraphs) < len(paragraphs):
+                number_of_removed_paragraphs += len(paragraphs) - len(kept_paragraphs)
+                crawling_results[url] = PARAGRAPH_SEPARATOR.join(kept_paragraphs)
+
+    if number_of_removed_paragraphs:
+        log.info(msg=f'Removed {number_of_removed_paragraphs} paragraphs repeated across pages of the same domain\n')
+
+    return crawling_results
+
+
+def _cache_failed_crawl(url: str) -> None:
     """
-    Processes a webpage by extracting and parsing its content
+    Caches an empty text for a webpage which could not be crawled, so that it is not crawled again for FAILED_CRAWL_TTL seconds.
+    A cached text, even a stale one, is kept instead, since the stale text of a page is what its conditional revalidation relies on.
     
     Args:
-        url (str): The URL to process
+        url (str): The URL of the webpage
+    """
+
+    key = _get_crawl_cache_key(url=url)
+    if cache.get(key=key, default=["No cache entry found"], stale=True) == ["No cache entry found"]:
+        cache.set(key=key, value='', expire=FAILED_CRAWL_TTL, stale_ttl=0)
+
+
+def _fetchWebpage(url: str, max_crawling_time: Optional[float] = None) -> dict[str, Any]:
+    """
+    Fetches a webpage, which is the I/O-bound part of processing it. The fetched HTML is handed over to the
+    parsing worker pool right away, so that the time limit of the crawling only covers the fetch.
+    A page fetched after the time limit of the crawling is not parsed, since the caller no longer waits for it.
+    A page whose cached text went stale is revalidated with a conditional request, and is neither downloaded
+    nor parsed again if it has not changed.
+    
+    Args:
+        url (str): The URL to fetch
+        max_crawling_time (Optional[float]): The time limit of the crawling of the page in seconds, if any
         
     Returns:
-        dict[str, str]: A dictionary containing the status code and processed content
+        dict[str, Any]: A dictionary containing the status code and either the processed content,
+            or the future of the parsing of the page with how the page was fetched and its validators
     """
-    key = f"Crawled content of the website: {url}"
+    timestamp_start = time.monotonic()
+    key = _get_crawl_cache_key(url=url)
     cached_result = cache.get(key=key, default=["No cache entry found"])
 
     if cached_result != ["No cache entry found"]:
         return {'status_code': 200, 'content': cached_result}
 
+    validators = cache.get(key=_get_validators_cache_key(url=url))
+    stale_content = cache.get(key=key, stale=True) if validators else None
+
     try:
-        extracted_text = _extract_text_from_url(url=url)
+        extracted_text = _extract_text_from_url(url=url, validators=validators if stale_content else None)
         
+        if extracted_text['status_code'] == 304 and stale_content:
+            crawling_circuit_breaker.record_success(key=_get_circuit_breaker_key(url=url, fetched_by=FETCHED_DIRECTLY))
+            cache.set(key=key, value=stale_content)
+            return {'status_code': 200, 'content': stale_content}
+        
+        if extracted_text['status_code'] == 200 and max_crawling_time is not None and time.monotonic() - timestamp_start > max_crawling_time:
+            log.info(msg=f"Fetched URL {url} after the crawling time limit, skipping its parsing\n")
+            return {'status_code': 408, 'content': ''}
+
         if extracted_text['status_code'] == 200:
-            parsed_text = _parse_text_from_url(text=extracted_text['content'])
-            cache.set(key=key, value=parsed_text, expire=TTL)
-            return {'status_code': 200, 'content': parsed_text}
+            return {
+                'status_code': 200,
+                'parsing': parsing_worker_pool.submit(parse_text_from_html, text=extracted_text['content']),
+                'html': extracted_text['content'],
+                'fetched_by': extracted_text['fetched_by'],
+                'validators': extracted_text.get('validators'),
+                'had_validators': validators is not None
+            }
             
-        cache.set(key=key, value='', expire=TTL)
+        _cache_failed_crawl(url=url)
         return {'status_code': extracted_text['status_code'], 'content': ''}
         
     except Exception as e:
-        cache.set(key=key, value='', expire=TTL)
+        _cache_failed_crawl(url=url)
         return {'status_code': getattr(e, 'status_code', 500), 'content': ''}
 
 
+def _get_parsed_text(url: str, fetched_webpage: dict[str, Any], max_time: float = MAX_TIME_HTML_PARSING) -> str:
+    """
+    Waits for the parsing of a fetched page, parsing it in the current thread if the parsing worker pool failed.
+    A page whose parsing does not finish in time gets an empty text, as a failed page. Its parsing is cancelled if it has not started,
+    and is otherwise left to finish in its worker process.
+    """
+    try:
+        return fetched_webpage['parsing'].result(timeout=max_time)
+    except FutureTimeoutError:
+        fetched_webpage['parsing'].cancel()
+        log.info(msg=f'The parsing of URL {url} did not finish in time\n')
+        return ''
+    except Exception as e:
+        log.info(msg=f'The parsing worker pool failed, parsing in the crawling thread instead: {str(e)}\n')
+        return parse_text_from_html(text=fetched_webpage['html'])
+
+
+def _finishProcessingWebpage(url: str, fetched_webpage: dict[str, Any], max_parsing_time: float = MAX_TIME_HTML_PARSING) -> dict[str, str]:
+    """
+    Completes the processing of a fetched webpage, once it has been parsed, by caching its text
+    
+    Args:
+        url (str): The URL of the webpage
+        fetched_webpage (dict[str, Any]): The result of fetching the webpage
+        max_parsing_time (float, optional): Maximum time to wait for the parsing in seconds. Defaults to MAX_TIME_HTML_PARSING
+        
+    Returns:
+        dict[str, str]: A dictionary containing the status code and processed content
+    """
+
+    if 'parsing' not in fetched_webpage:
+        return fetched_webpage
+
+    key = _get_crawl_cache_key(url=url)
+    parsed_text = _get_parsed_text(url=url, fetched_webpage=fetched_webpage, max_time=max_parsing_time)
+            
+    # A page without any article text counts as a failure, as for pages rendered with JavaScript
+    circuit_breaker_key = _get_circuit_breaker_key(url=url, fetched_by=fetched_webpage['fetched_by'])
+    if parsed_text:
+        crawling_circuit_breaker.record_success(key=circuit_breaker_key)
+        cache.set(key=key, value=parsed_text)
+        validators_key = _get_validators_cache_key(url=url)
+        if fetched_webpage['validators']:
+            cache.set(key=validators_key, value=fetched_webpage['validators'])
+        elif fetched_webpage['had_validators']:
+            cache.delete(key=validators_key)
+    else:
+        crawling_circuit_breaker.record_failure(key=circuit_breaker_key)
+        _cache_failed_crawl(url=url)
+    return {'status_code': 200, 'content': parsed_text}
+
+
+def _processWebpage(url: str) -> dict[str, str]:
+    """
+    Processes a webpage by extracting and parsing its content
+    
+    Args:
+        url (str): The URL to process
+        
+    Returns:
+        dict[str, str]: A dictionary containing the status code and processed content
+    """
+
+    return _finishProcessingWebpage(url=url, fetched_webpage=_fetchWebpage(url=url))
+
+
+def _is_crawlable(url: str) -> bool:
+    """
+    Checks whether a URL should be crawled. The URLs of the domains which keep failing both when crawled directly
+    and when crawled using Crawlbase are skipped, such as MSN pages which cannot be parsed.
+    
+    Args:
+        url (str): The URL to check
+        
+    Returns:
+        bool: True if the URL should be crawled, False otherwise
+    """
+
+    return not all(
+        crawling_circuit_breaker.is_open(key=_get_circuit_breaker_key(url=url, fetched_by=fetched_by))
+        for fetched_by in [FETCHED_DIRECTLY, FETCHED_USING_CRAWLBASE]
+    )
+
+
+async def _processWebpage_async(url: str) -> Optional[dict[str, str]]:
+    """
+    Coroutine fetching a webpage on the crawling worker pool, within the crawling time limit, and then awaiting its parsing
+    
+    Args:
+        url (str): The URL to process
+        
+    Returns:
+        Optional[dict[str, str]]: A dictionary containing the status code and processed content, or None if the fetch timed out
+    """
+
+    try:
+        fetched_webpage = await crawling_worker_pool.run_async(
+            _fetchWebpage, url=url, max_crawling_time=MAX_TIME_WEBPAGE_CRAWLING, max_time=MAX_TIME_WEBPAGE_CRAWLING
+        )
+    except asyncio.TimeoutError:
+        return None
+
+    if 'parsing' in fetched_webpage:
+        # Failures and timeouts of the parsing are handled when finishing the processing, which then no longer waits
+        await asyncio.wait([asyncio.wrap_future(fetched_webpage['parsing'])], timeout=MAX_TIME_HTML_PARSING)
+    return await crawling_worker_pool.run_async(_finishProcessingWebpage, url=url, fetched_webpage=fetched_webpage, max_parsing_time=0)
+
+
 def _set_entry_for_timed_out_crawls(retrieved_urls: list[str], crawling_results: dict[str, str]) -> dict[str, str]:
     """
     Sets an empty entry into the crawling results dictionary and into the cache for URLs for which the crawling timed out
@@ -140,13 +549,10 @@ def _set_entry_for_timed_out_crawls(retrieved_urls: list[str], crawling_results:
         dict[str, str]: The crawling results dictionary with empty entries for timed out URLs
     """
     
-    timed_out_urls = [
-        url for url in retrieved_urls
-        if cache.get(key=f"Crawled content of the website: {url}", default=["No cache entry found"]) == ["No cache entry found"]
-    ]
+    timed_out_urls = [url for url in retrieved_urls if url not in crawling_results]
     
     for url in timed_out_urls:
-        cache.set(key=f"Crawled content of the website: {url}", value='', expire=TTL)
+        _cache_failed_crawl(url=url)
         crawling_results[url] = ''
     
     if timed_out_urls:
@@ -199,25 +605,41 @@ def perform_crawling(recent_news: GenerateRecentNews, sink: ProgressSink) -> Gen
         sink=sink
     )   
     
-    # Filter out MSN URLs and process the rest
-    urls_to_process = [url for url in recent_news.retrieved_urls if 'www.msn.com' not in url]
+    # Skip the URLs of the domains which cannot be crawled and process the rest
+    urls_to_process = [url for url in recent_news.retrieved_urls if _is_crawlable(url=url)]
     
     def wrapper(crawling_function):
-        return lambda url, results: results.append({url: crawling_function(url=url)['content']})
+        return lambda url: {url: crawling_function(url=url)}
         
-    crawling_results = convert_to_dictionary(
+    # The time limit only applies to the fetches, the fetched pages being parsed in the meantime by the parsing worker pool
+    fetched_webpages = convert_to_dictionary(
         key_value_list=run_multiple_with_limited_time(
-            func=wrapper(_processWebpage),
+            func=wrapper(partial(_fetchWebpage, max_crawling_time=MAX_TIME_WEBPAGE_CRAWLING)),
             args=urls_to_process,
-            max_time=MAX_TIME_WEBPAGE_CRAWLING
+            max_time=MAX_TIME_WEBPAGE_CRAWLING,
+            pool=crawling_worker_pool,
+            key=_get_domain,
+            max_concurrent_per_key=MAX_CONCURRENT_CRAWLS_PER_DOMAIN
         )
     )
     
+    # The parsing of all the pages shares a single time limit, after which the processing of the pages no longer waits
+    wait(
+        [fetched_webpage['parsing'] for fetched_webpage in fetched_webpages.values() if 'parsing' in fetched_webpage],
+        timeout=MAX_TIME_HTML_PARSING
+    )
+    crawling_results = {
+        url: _finishProcessingWebpage(url=url, fetched_webpage=fetched_webpage, max_parsing_time=0)['content']
+        for url, fetched_webpage in fetched_webpages.items()
+    }
+    
     crawling_results = _set_entry_for_timed_out_crawls(
         retrieved_urls=recent_news.retrieved_urls,
         crawling_results=crawling_results
     )
     
+    crawling_results = _remove_paragraphs_repeated_across_pages(crawling_results=crawling_results)
+    
     parsed_urls = _get_urls_that_could_be_parsed(
         crawling_results=crawling_results,
         sink=sink
@@ -0,0 +1,161 @@
+import heapq
+import itertools
+import random
+import re
+import zlib
+from collections import defaultdict
+
+from generate_recent_news import GenerateRecentNews
+from progress_sink import ProgressSink
+from utils import log, get_and_log_current_time, log_processing_duration
+
+
+SHINGLE_SIZE = 5 #Words per shingle
+SIGNATURE_SIZE = 64 #Smallest hashes kept per article
+SIMILARITY_THRESHOLD = 0.8 #Estimated Jaccard similarity of the shingles above which two articles are near-duplicates
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed coefficients of the hash function (a * x + b) mod p spreading the shingles, so that signatures are deterministic
+_random = random.Random(0)
+HASH_COEFFICIENTS = (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+
+
+def _get_shingles(text: str) -> set[int]:
+    """
+    Gets the hashes of the sequences of SHINGLE_SIZE consecutive words of a text, ignoring case and punctuation
+
+    Args:
+        text (str): The text of an article
+
+    Returns:
+        set[int]: The 32-bit hashes of the shingles
+    """
+
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(' '.join(words).encode())} if words else set()
+    return {zlib.crc32(' '.join(words[i: i + SHINGLE_SIZE]).encode()) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def compute_minhash_signature(text: str) -> tuple[int, ...]:
+    """
+    Computes the bottom-k MinHash signature of a text, whose overlap with the signature of another text estimates
+    the Jaccard similarity of their shingles. Each shingle is hashed once, rather than once per permutation
+
+    Args:
+        text (str): The text of an article
+
+    Returns:
+        tuple[int, ...]: The SIGNATURE_SIZE smallest hashes of the shingles in increasing order, empty for a text without words
+    """
+
+    a, b = HASH_COEFFICIENTS
+    return tuple(heapq.nsmallest(SIGNATURE_SIZE, {(a * shingle + b) % MERSENNE_PRIME for shingle in _get_shingles(text=text)}))
+
+
+def estimate_similarity(signature: tuple[int, ...], other_signature: tuple[int, ...]) -> float:
+    """
+    Estimates the Jaccard similarity of the shingles of two texts from their MinHash signatures
+
+    Args:
+        signature (tuple[int, ...]): The signature of a text
+        other_signature (tuple[int, ...]): The signature of another text
+
+    Returns:
+        float: The share of the smallest hashes of the union of the signatures which are in both signatures, 0 if a text has no words
+    """
+
+    if not signature or not other_signature:
+        return 0.0
+    union_signature = heapq.nsmallest(SIGNATURE_SIZE, set(signature).union(other_signature))
+    shared_hashes = set(signature).intersection(other_signature)
+    return sum(1 for x in union_signature if x in shared_hashes) / len(union_signature)
+
+
+def group_near_duplicates(articles: dict[str, str]) -> dict[str, list[str]]:
+    """
+    Groups the near-duplicate articles, such as the copies of a wire story published by several outlets.
+    The representative of each group is its longest article, so that no content is lost.
+
+    Args:
+        articles (dict[str, str]): A dictionary containing for each URL the text of the article
+
+    Returns:
+        dict[str, list[str]]: A dictionary containing for the URL of the representative of each group the URLs of the
+            other articles of the group, in the order of the input
+    """
+
+    urls = list(articles)
+    signatures = [compute_minhash_signature(text=articles[url]) for url in urls]
+
+    # Union-find over the pairs of near-duplicates
+    parents = list(range(len(urls)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    # Only the articles sharing a hash of their signatures can be similar, so the other pairs are not compared
+    articles_by_hash = defaultdict(list)
+    for i, signature in enumerate(signatures):
+        for x in signature:
+            articles_by_hash[x].append(i)
+    candidate_pairs = {pair for indices in articles_by_hash.values() for pair in itertools.combinations(indices, 2)}
+
+    for i, j in sorted(candidate_pairs):
+        if estimate_similarity(signature=signatures[i], other_signature=signatures[j]) >= SIMILARITY_THRESHOLD:
+            parents[find(j)] = find(i)
+
+    groups = {}
+    for i in range(len(urls)):
+        groups.setdefault(find(i), []).append(urls[i])
+
+    near_duplicates = {}
+    for group in groups.values():
+        representative = max(group, key=lambda url: len(articles[url]))
+        near_duplicates[representative] = [url for url in group if url != representative]
+    return near_duplicates
+
+
+def detect_near_duplicate_articles(recent_news: GenerateRecentNews, sink: ProgressSink) -> GenerateRecentNews:
+    """
+    Collapses the near-duplicate parsed articles into one representative, keeping the URLs of the other copies
+
+    Args:
+        recent_news (GenerateRecentNews): The news generation request, having the parsed_urls field populated
+        sink (ProgressSink): A message sink to which progress messages are sent
+
+    Returns:
+        GenerateRecentNews: A new object whose parsed URLs only contain the representatives, with the alternate URLs of each of them
+    """
+
+    timestamp_start = get_and_log_current_time(message=f'The detection of near-duplicate articles for {recent_news.query} started at', sink=sink)
+
+    articles = recent_news.parsed_urls or {}
+    near_duplicates = group_near_duplicates(articles=articles)
+    parsed_urls = {url: content for url, content in articles.items() if url in near_duplicates}
+    alternate_urls = {url: alternates for url, alternates in near_duplicates.items() if alternates}
+
+    number_of_removed_articles = len(articles) - len(parsed_urls)
+    message = f'{number_of_removed_articles} near-duplicate articles out of {len(articles)} were collapsed'
+    log.info(msg=message + '\n')
+    sink.send(message=message)
+
+    timestamp_end = get_and_log_current_time(message=f'The detection of near-duplicate articles for {recent_news.query} finished at', sink=sink)
+    log_processing_duration(
+        timestamp_start=timestamp_start,
+        timestamp_end=timestamp_end,
+        message=f'The detection of near-duplicate articles for {recent_news.query}',
+        sink=sink
+    )
+
+    return GenerateRecentNews(
+        query=recent_news.query,
+        query_meaning=recent_news.query_meaning,
+        search_terms=recent_news.search_terms,
+        retrieved_urls=recent_news.retrieved_urls,
+        parsed_urls=parsed_urls,
+        alternate_urls=alternate_urls
+    )
@@ -56,6 +56,7 @@ class GenerateRecentNews:
     search_terms: Optional[List[str]] = None
     retrieved_urls: Optional[List[str]] = None
     parsed_urls: Optional[Dict[str, str]] = None
+    alternate_urls: Optional[Dict[str, List[str]]] = None
     relevant_articles: Optional[List[List[Article]]] = None
     most_impactful_news: Optional[List[News]] = None
 
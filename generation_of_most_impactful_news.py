@@ -207,6 +207,7 @@ def generate_most_impactful_news(recent_news: GenerateRecentNews, sink: Progress
             search_terms=recent_news.search_terms,
             retrieved_urls=recent_news.retrieved_urls,
             parsed_urls=recent_news.parsed_urls,
+            alternate_urls=recent_news.alternate_urls,
             relevant_articles=recent_news.relevant_articles,
             most_impactful_news=most_impactful_news
         )
@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies of an operation to estimate their percentiles."""
+
+    def __init__(self, window_size: int = 256, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def get_percentile(self, percentile: float, default: float) -> float:
+        """
+        Estimates a percentile of the recent latencies.
+
+        Args:
+            percentile (float): The percentile, between 0 and 1
+            default (float): The value returned while fewer than min_samples latencies have been recorded
+
+        Returns:
+            float: The latency below which the given share of the recent latencies falls
+        """
+
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return default
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+
+class HedgingBudget:
+    """
+    Caps the number of hedged requests, which are paid requests to a fallback service, to a share of the primary requests.
+    A few hedges are always allowed, so that hedging works from the first requests on.
+    """
+
+    def __init__(self, max_hedge_ratio: float = 0.1, min_hedges: int = 10) -> None:
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_hedges = min_hedges
+        self._statistics = {'requests': 0, 'hedges': 0, 'hedges_denied': 0, 'hedges_won': 0}
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        """Counts a primary request, which increases the number of hedges allowed."""
+        with self._lock:
+            self._statistics['requests'] += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a hedge from the budget if any is left.
+
+        Returns:
+            bool: True if a hedged request may be sent
+        """
+
+        with self._lock:
+            if self._statistics['hedges'] >= self.min_hedges + self.max_hedge_ratio * self._statistics['requests']:
+                self._statistics['hedges_denied'] += 1
+                return False
+            self._statistics['hedges'] += 1
+            return True
+
+    def record_hedge_won(self) -> None:
+        """Counts a hedged request which answered before the primary request."""
+        with self._lock:
+            self._statistics['hedges_won'] += 1
+
+    def get_statistics(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._statistics)
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+MAX_POOLED_HOSTS = 128 #Number of hosts for which a connection pool is kept
+MAX_CONNECTIONS_PER_HOST = 16 #Number of connections kept alive per host
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 5))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UnsupportedContentTypeError(requests.exceptions.RequestException):
+    """Raised when the Content-Type of a response is not one of the accepted content types."""
+
+
+class DownloadDeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when downloading a response takes longer than its total time limit."""
+
+
+class DownloadCancelled(requests.exceptions.RequestException):
+    """Raised when a download is cancelled by the caller, such as the loser of a hedged request."""
+
+
+def _iter_available_content(response: requests.Response) -> Iterator[bytes]:
+    """
+    Yields the decoded body of a streamed response as the data arrives, in chunks of at most DOWNLOAD_CHUNK_SIZE bytes.
+    Unlike iter_content, which waits for each chunk to be full, this lets a slowly trickling body be checked against a deadline.
+    """
+
+    read1 = getattr(response.raw, 'read1', None)
+    if read1 is None:
+        #urllib3 1.x has no read1
+        yield from response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+        return
+
+    while True:
+        chunk = read1(DOWNLOAD_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+class HttpClient:
+    """
+    HTTP client sharing a connection-pooled session across threads, so that the requests to the same host
+    reuse kept-alive connections instead of paying a DNS lookup and TCP and TLS handshakes for each URL.
+    The requests library only speaks HTTP/1.1, the reuse of connections is what saves the handshakes.
+    """
+
+    def __init__(
+        self,
+        max_pooled_hosts: int = MAX_POOLED_HOSTS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT
+    ) -> None:
+        self.max_pooled_hosts = max_pooled_hosts
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = (connect_timeout, read_timeout)
+        self._lock = threading.Lock()
+        self._session = None
+        # Connections must not be shared with forked processes, which get a session of their own
+        os.register_at_fork(after_in_child=self._reset_session)
+
+    def _create_session(self) -> requests.Session:
+        """Creates a session whose connection pools are bounded per host."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_pooled_hosts, pool_maxsize=self.max_connections_per_host)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _reset_session(self) -> None:
+        self._lock = threading.Lock()
+        self._session = None
+
+    def get_session(self) -> requests.Session:
+        """Returns the shared session, creating it on first use."""
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def get(self, url: str, timeout: Optional[Union[float, tuple[float, float]]] = None, **kwargs: Any) -> requests.Response:
+        """
+        Sends a GET request through the shared session.
+
+        Args:
+            url (str): The URL to request
+            timeout (Optional[Union[float, tuple[float, float]]]): The timeout, or the connect and read timeouts, in seconds.
+                Defaults to the timeouts of the client
+            **kwargs (Any): Further arguments passed to requests
+
+        Returns:
+            requests.Response: The response
+        """
+
+        return self.get_session().get(url, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+    def download_text(
+        self,
+        url: str,
+        max_bytes: int,
+        max_time: Optional[float] = None,
+        content_types: Optional[tuple[str, ...]] = None,
+        on_response: Optional[Callable[[requests.Response], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs: Any
+    ) -> tuple[int, str]:
+        """
+        Downloads the body of a response as a stream, stopping after max_bytes bytes, and decodes it.
+        The headers are checked before the body is downloaded, so that responses of other content types are not downloaded.
+
+        Args:
+            url (str): The URL to request
+            max_bytes (int): The number of bytes after which the rest of the body is not downloaded
+            max_time (Optional[float]): The time limit in seconds for the whole download, including connecting.
+                No single socket operation waits longer than the timeouts of the client
+            content_types (Optional[tuple[str, ...]]): The accepted media types, responses without a Content-Type are accepted.
+                Defaults to accepting all media types
+            on_response (Optional[Callable[[requests.Response], None]]): Function called as soon as the headers are received
+            cancel_event (Optional[threading.Event]): Event which, once set, stops the download
+            **kwargs (Any): Further arguments passed to requests
+
+        Returns:
+            tuple[int, str]: The status code and the text of the possibly truncated body
+
+        Raises:
+            requests.exceptions.HTTPError: If the status code is an error
+            UnsupportedContentTypeError: If the Content-Type is not one of the accepted content types
+            DownloadDeadlineExceeded: If the download takes longer than max_time
+            DownloadCancelled: If cancel_event is set during the download
+            requests.exceptions.RequestException: For other connection and timeout errors
+        """
+
+        timestamp_start = time.monotonic()
+        timeout = self.timeout if max_time is None else tuple(min(t, max_time) for t in self.timeout)
+
+        with self.get_session().get(url, timeout=timeout, stream=True, **kwargs) as response:
+            if on_response is not None:
+                on_response(response)
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_types is not None and content_type and content_type not in content_types:
+                raise UnsupportedContentTypeError(f'Unsupported content type {content_type} for {url}', response=response)
+
+            chunks = []
+            size = 0
+            for chunk in _iter_available_content(response=response):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    break
+                if max_time is not None and time.monotonic() - timestamp_start > max_time:
+                    raise DownloadDeadlineExceeded(f'Downloading {url} took longer than {max_time} seconds', response=response)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(f'Downloading {url} was cancelled', response=response)
+
+            content = b''.join(chunks)[:max_bytes]
+            try:
+                text = content.decode(response.encoding or 'utf-8', errors='replace')
+            except LookupError:
+                text = content.decode('utf-8', errors='replace')
+            return response.status_code, text
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+http_client = HttpClient()
@@ -1,12 +1,30 @@
+import asyncio
+import os
+import zlib
+from collections import Counter
+from dataclasses import replace
+from itertools import combinations
 from typing import Any, Callable
-from utils import log, get_and_log_current_time, log_processing_duration, run_multiple_with_limited_time
+from utils import log, get_and_log_current_time, log_processing_duration
 from llm_client import llm_client
 from generate_recent_news import GenerateRecentNews, Article, ImpactType
 from progress_sink import ProgressSink
+from prompt_budget import count_tokens, fit_texts_to_token_budget
 
 
 NUMBER_OF_COMPLETIONS = 3
 MAX_TIME_IDENTIFICATION_OF_RELEVANT_ARTICLES = None
+#Estimated tokens, the texts of the articles are truncated so that the prompt fits
+MAX_TOKENS_IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT = int(os.environ.get('MAX_TOKENS_IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT', 100000))
+#Articles are split by hash into this many shards, identified in separate prompts. 0 or 1 sends all the articles in one prompt
+NUMBER_OF_SHARDS = int(os.environ.get('NUMBER_OF_SHARDS', 0))
+MAX_RELEVANT_ARTICLES = 10 #Items requested from the LLM, to which the merged items of the shards are capped
+#In consensus mode, completions are started progressively and stop once enough of them agree on the top relevant URLs
+CONSENSUS_MODE = os.environ.get('CONSENSUS_MODE', 'false').lower() == 'true'
+CONSENSUS_MIN_COMPLETIONS = 2 #Completions started at once, and number of completions which must agree
+CONSENSUS_TOP_URLS = 3 #Number of top URLs compared between completions
+CONSENSUS_OVERLAP_THRESHOLD = 0.66 #Share of their top URLs two completions must have in common to agree
+MAX_TIME_CONSENSUS = float(os.environ.get('MAX_TIME_CONSENSUS', 60)) #Seconds after which no further completion is awaited once one finished
 
 
 IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT_TEMPLATE = \
@@ -47,49 +65,79 @@ Return:
 """
 
 
-def _create_llm_wrapper(LLM_request_function: Callable, query: str) -> Callable[[tuple[int, str]], dict[str, Any]]:
+def _create_llm_wrapper(LLM_request_function: Callable, query: str) -> Callable[[tuple[int, str]], Any]:
     """
     Creates a wrapper function for LLM requests
     
     Args:
-        LLM_request_function (Callable): The LLM request function to wrap
+        LLM_request_function (Callable): The LLM request coroutine function to wrap
         query (str): The query to include into cache prefix
     
     Returns:
-        Callable: A function that for an argument (ordered_prompt, containing the index and the prompt) and a list of results (results)
-        appends the LLM response for the ordered_prompt to the list of results
+        Callable: A function that for an argument (ordered_prompt, containing the index and the prompt)
+        returns the coroutine requesting the LLM response for the ordered_prompt
     """
-    return lambda ordered_prompt, results: results.append(LLM_request_function(
+    return lambda ordered_prompt: LLM_request_function(
         prompt=ordered_prompt[1],
-        cache_prefix=(query, f"relevant articles {ordered_prompt[0] + 1}")
-    ))
+        cache_prefix=(query, f"relevant articles {ordered_prompt[0] + 1}"),
+        max_time=MAX_TIME_IDENTIFICATION_OF_RELEVANT_ARTICLES
+    )
+
 
+def _format_article(idx: int, url: str, content: str) -> str:
+    return f'ARTICLE {idx}: \n URL: {url} \n TEXT: {content} \n \n'
 
-def _build_identification_of_relevant_articles_prompt(recent_news: GenerateRecentNews) -> str:
+
+def _build_identification_of_relevant_articles_prompt(
+    recent_news: GenerateRecentNews,
+    sink: ProgressSink,
+    max_tokens: int = MAX_TOKENS_IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT
+) -> str:
     """
     Builds the prompt that will be sent to the LLM for identifying relevant articles.
     The prompt includes the query meaning and all parsed article URLs with their content.
+    If the prompt would exceed max_tokens, the texts of the articles share the tokens left by the rest of the prompt fairly
+    and the longest ones are truncated, keeping their lead paragraphs.
     
     Args:
         recent_news (GenerateRecentNews): The recent news generation request containing parsed URLs and their content
+        sink (ProgressSink): A sink to which the share of the article texts which was dropped is reported
+        max_tokens (int, optional): The estimated number of tokens the prompt may contain
     
     Returns:
         str: The complete prompt that will be sent to the LLM, including the template, articles, and response format
     """
 
+    template = IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT_TEMPLATE.format(recent_news.query_meaning)
+    articles = dict(sorted(recent_news.parsed_urls.items()))
+    
+    # The tokens left once the template, the response format and the headers of the articles are counted go to the texts
+    fixed_tokens = count_tokens(text=template) + count_tokens(text=IDENTIFICATION_OF_RELEVANT_ARTICLES_RESPONSE_FORMAT) + sum(
+        count_tokens(text=_format_article(idx=idx, url=url, content='')) for idx, url in enumerate(articles, 1)
+    )
+    articles, statistics = fit_texts_to_token_budget(texts=articles, budget=max_tokens - fixed_tokens)
+    
+    if statistics['truncated_texts']:
+        message = (
+            f'{statistics["truncated_texts"]} articles out of {len(articles)} were truncated to fit the prompt for {recent_news.query} '
+            f'into {max_tokens} tokens, dropping {statistics["dropped_tokens"]} of {statistics["original_tokens"]} tokens of article text'
+        )
+        log.info(f'{message}\n')
+        sink.send(message)
+    
     # Start with the template and query meaning
-    prompt_parts = [IDENTIFICATION_OF_RELEVANT_ARTICLES_PROMPT_TEMPLATE.format(recent_news.query_meaning)]
+    prompt_parts = [template]
     
     # Add articles in sorted order
-    for idx, (url, content) in enumerate(sorted(recent_news.parsed_urls.items()), 1):
-        prompt_parts.append(f'ARTICLE {idx}: \n URL: {url} \n TEXT: {content} \n \n')
+    for idx, (url, content) in enumerate(articles.items(), 1):
+        prompt_parts.append(_format_article(idx=idx, url=url, content=content))
     
     # Add response format
     prompt_parts.append(IDENTIFICATION_OF_RELEVANT_ARTICLES_RESPONSE_FORMAT)
     
     prompt = ''.join(prompt_parts)
     
-    log.info(f'The prompt for the identification of relevant articles for {recent_news.query} contains {len(prompt)} characters\n')
+    log.info(f'The prompt for the identification of relevant articles for {recent_news.query} contains {len(prompt)} characters, about {count_tokens(text=prompt)} tokens\n')
     
     return prompt
 
@@ -112,58 +160,375 @@ def _parse_LLM_responses(
         list[list[Article]]: A list of lists containing Article objects, one list per LLM response
     """
 
-    relevant_articles = []
+    relevant_articles = [_parse_LLM_response(idx=idx, response=response) for idx, response in enumerate(LLM_responses, 1)]
+    _report_relevant_article_counts(query=query, relevant_articles=relevant_articles, sink=sink)
+
+    return relevant_articles
+
+
+def _parse_LLM_response(idx: Any, response: dict[str, Any]) -> list[Article]:
+    """
+    Extracts the relevant articles identified in one LLM response, filtering out the articles with neutral impact.
+    
+    Args:
+        idx (Any): The identifier of the LLM completion, used in the logs
+        response (dict[str, Any]): The LLM response dictionary containing article information
+    
+    Returns:
+        list[Article]: The Article objects, empty if the response had an issue
+    """
+
     valid_impact_types = {'positive', 'negative'}
 
-    for idx, response in enumerate(LLM_responses, 1):
-        try:
-            if response.get('status_code') != 200:
-                log.info(f'The LLM completion {idx} had an issue: {response.get("status_code")}\n')
-                relevant_articles.append([])
-                continue
-                
-            items = response.get('response_content', {}).get('items', [])
-            if not items:
-                log.info(f'The LLM completion {idx} returned no items\n')
-                relevant_articles.append([])
-                continue
-                
-            # Process valid items with positive or negative impact
-            list_articles = [
-                Article(
-                    article_number=''.join(filter(str.isdigit, str(item.get('article_number', '')))),
-                    article_url=item.get('article_url', ''),
-                    impact_summary_on_query=item.get('impact_on_term_of_interest', ''),
-                    impact_type_on_query=ImpactType(item.get('impact_type', ''))
-                ) for item in items 
-                if item.get('impact_type') in valid_impact_types
-            ]
-            relevant_articles.append(list_articles)
+    try:
+        if response.get('status_code') != 200:
+            log.info(f'The LLM completion {idx} had an issue: {response.get("status_code")}\n')
+            return []
             
-        except Exception as e:
-            log.info(f'Error processing LLM completion {idx}: {str(e)}\n')
-            relevant_articles.append([])
+        items = response.get('response_content', {}).get('items', [])
+        if not items:
+            log.info(f'The LLM completion {idx} returned no items\n')
+            return []
+            
+        # Process valid items with positive or negative impact
+        return [
+            Article(
+                article_number=''.join(filter(str.isdigit, str(item.get('article_number', '')))),
+                article_url=item.get('article_url', ''),
+                impact_summary_on_query=item.get('impact_on_term_of_interest', ''),
+                impact_type_on_query=ImpactType(item.get('impact_type', ''))
+            ) for item in items 
+            if item.get('impact_type') in valid_impact_types
+        ]
+        
+    except Exception as e:
+        log.info(f'Error processing LLM completion {idx}: {str(e)}\n')
+        return []
 
+
+def _report_relevant_article_counts(query: str, relevant_articles: list[list[Article]], sink: ProgressSink) -> None:
     article_counts = [len(x) for x in relevant_articles]
     result_message = f'The counts of relevant articles identified for {query} are: {article_counts}'
     sink.send(result_message)
     log.info(f'{result_message}\n')
 
+
+async def _identify_relevant_articles_in_one_prompt(
+    recent_news: GenerateRecentNews,
+    sink: ProgressSink,
+    number_of_completions: int
+) -> list[list[Article]]:
+    """
+    Identifies the relevant articles of each completion with a prompt containing all the articles.
+    
+    Args:
+        recent_news (GenerateRecentNews): The news generation request containing parsed URLs and their content
+        sink (ProgressSink): A sink for logging progress and results
+        number_of_completions (int): Number of LLM completions to generate
+    
+    Returns:
+        list[list[Article]]: A list of lists containing Article objects, one list per LLM response
+    """
+
+    # Build the prompt
+    identification_of_relevant_articles_prompt = _build_identification_of_relevant_articles_prompt(
+        recent_news=recent_news,
+        sink=sink
+    )
+    
+    # Create the wrapper function for LLM requests
+    llm_wrapper = _create_llm_wrapper(llm_client.ask_LLM_async, recent_news.query)
+    
+    # Prepare arguments for multiple LLM requests
+    llm_args = [(idx, identification_of_relevant_articles_prompt) 
+               for idx in range(number_of_completions)]
+    
+    # Run multiple LLM requests concurrently, dropping the ones which timed out or failed
+    LLM_responses = [
+        response for response in await asyncio.gather(*(llm_wrapper(arg) for arg in llm_args), return_exceptions=True)
+        if not isinstance(response, BaseException)
+    ]
+    
+    # Parse the LLM responses
+    return _parse_LLM_responses(
+        query=recent_news.query,
+        LLM_responses=LLM_responses,
+        sink=sink
+    )
+
+
+def _has_consensus(relevant_articles: list[list[Article]]) -> bool:
+    """
+    Checks whether CONSENSUS_MIN_COMPLETIONS completions agree on their top relevant URLs
+    
+    Args:
+        relevant_articles (list[list[Article]]): The relevant articles of each completion, by decreasing impact
+    
+    Returns:
+        bool: True if enough completions have at least CONSENSUS_OVERLAP_THRESHOLD of their top CONSENSUS_TOP_URLS URLs in common
+    """
+
+    top_urls = [{article.article_url for article in list_articles[:CONSENSUS_TOP_URLS]} for list_articles in relevant_articles if list_articles]
+    for group in combinations(top_urls, CONSENSUS_MIN_COMPLETIONS):
+        common_urls = set.intersection(*group)
+        if len(common_urls) / max(len(urls) for urls in group) >= CONSENSUS_OVERLAP_THRESHOLD:
+            return True
+    return False
+
+
+def _merge_by_vote(relevant_articles: list[list[Article]]) -> list[Article]:
+    """
+    Merges the relevant articles of several completions into a single list, ranked by the number of completions
+    which identified each URL, ties being broken by the best rank of the URL
+    
+    Args:
+        relevant_articles (list[list[Article]]): The relevant articles of each completion, by decreasing impact
+    
+    Returns:
+        list[Article]: At most MAX_RELEVANT_ARTICLES articles, each one as described by the completion which ranked it best
+    """
+
+    votes = Counter(url for list_articles in relevant_articles for url in {article.article_url for article in list_articles})
+    best_ranked_articles = {}
+    for list_articles in relevant_articles:
+        for rank, article in enumerate(list_articles):
+            if article.article_url not in best_ranked_articles or rank < best_ranked_articles[article.article_url][0]:
+                best_ranked_articles[article.article_url] = (rank, article)
+
+    ranked_urls = sorted(best_ranked_articles, key=lambda url: (-votes[url], best_ranked_articles[url][0]))
+    return [best_ranked_articles[url][1] for url in ranked_urls[:MAX_RELEVANT_ARTICLES]]
+
+
+async def _identify_relevant_articles_until_consensus(
+    recent_news: GenerateRecentNews,
+    sink: ProgressSink,
+    number_of_completions: int
+) -> list[list[Article]]:
+    """
+    Identifies the relevant articles with up to number_of_completions completions, started progressively:
+    CONSENSUS_MIN_COMPLETIONS completions are started at once, and a further one each time all the completions started
+    so far finished without agreeing. No completion is started or awaited anymore once the completions agree, or once MAX_TIME_CONSENSUS
+    seconds have passed and at least one completion finished. The completions are merged by vote.
+    Completions still pending at that point are cancelled, which only stops the ones still queued on the LLM worker pool:
+    the ones already running cannot be stopped, and still acquire their rate limiter token and cache their answer.
+    Since the further completions are only started one at a time, these are at most the ones running when MAX_TIME_CONSENSUS passed.
+    
+    Args:
+        recent_news (GenerateRecentNews): The news generation request containing parsed URLs and their content
+        sink (ProgressSink): A sink for logging progress and results
+        number_of_completions (int): Maximum number of LLM completions to generate
+    
+    Returns:
+        list[list[Article]]: A list containing the merged list of Article objects
+    """
+
+    identification_of_relevant_articles_prompt = _build_identification_of_relevant_articles_prompt(
+        recent_news=recent_news,
+        sink=sink
+    )
+    llm_wrapper = _create_llm_wrapper(llm_client.ask_LLM_async, recent_news.query)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + MAX_TIME_CONSENSUS
+    completion_indexes = {}
+    finished_completions = {}
+    relevant_articles = []
+
+    def start_completion() -> asyncio.Future:
+        idx = len(completion_indexes)
+        completion = asyncio.ensure_future(llm_wrapper((idx, identification_of_relevant_articles_prompt)))
+        completion_indexes[completion] = idx
+        return completion
+
+    pending = {start_completion() for _ in range(min(CONSENSUS_MIN_COMPLETIONS, number_of_completions))}
+
+    has_consensus = False
+    while pending:
+        timeout = max(0, deadline - loop.time()) if relevant_articles else None
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        for completion in done:
+            if completion.exception() is None:
+                idx = completion_indexes[completion]
+                finished_completions[idx] = _parse_LLM_response(idx=idx + 1, response=completion.result())
+        # In the order in which the completions were started, so that the merged result does not depend on their timing
+        relevant_articles = [finished_completions[idx] for idx in sorted(finished_completions)]
+
+        has_consensus = _has_consensus(relevant_articles=relevant_articles)
+        if has_consensus or (relevant_articles and loop.time() >= deadline):
+            break
+
+        # A further completion is only started once the completions started so far all finished without agreeing
+        if not pending and len(completion_indexes) < number_of_completions and loop.time() < deadline:
+            pending.add(start_completion())
+
+    # Only stops the completions still queued on the LLM worker pool, the running ones finish in the background
+    for completion in pending:
+        completion.cancel()
+
+    message = (
+        f'The completions for the relevant articles for {recent_news.query} '
+        f'{"agreed" if has_consensus else "did not agree"} after {len(relevant_articles)} of at most {number_of_completions} completions'
+    )
+    log.info(f'{message}\n')
+    sink.send(message)
+
+    _report_relevant_article_counts(query=recent_news.query, relevant_articles=relevant_articles, sink=sink)
+    return [_merge_by_vote(relevant_articles=relevant_articles)]
+
+
+def _split_into_shards(urls: list[str], number_of_shards: int) -> dict[int, list[str]]:
+    """
+    Splits the URLs of the articles into a fixed number of shards, by hash of the URL rather than by position,
+    so that a new article only changes the prompt, and therefore the cached answers, of its own shard
+    
+    Args:
+        urls (list[str]): The URLs of the articles
+        number_of_shards (int): The number of shards
+    
+    Returns:
+        dict[int, list[str]]: The URLs of each non-empty shard, sorted, by shard number. The number of a shard only depends
+            on the hashes of its URLs, so that it identifies the shard across runs
+    """
+
+    shards = {}
+    for url in sorted(urls):
+        shards.setdefault(zlib.crc32(url.encode('utf-8')) % number_of_shards, []).append(url)
+    return dict(sorted(shards.items()))
+
+
+def _renumber_shard_articles(list_articles: list[Article], shard: list[str], article_numbers: dict[str, str]) -> list[Article]:
+    """
+    Gives the relevant articles identified in a shard their URL and their number among all the articles,
+    as in the prompt containing all the articles
+    
+    Args:
+        list_articles (list[Article]): The relevant articles identified in the shard
+        shard (list[str]): The URLs of the articles of the shard, in the order of the shard prompt
+        article_numbers (dict[str, str]): The number of each URL among all the articles
+    
+    Returns:
+        list[Article]: The renumbered articles, in the same order
+    """
+
+    renumbered_articles = []
+    for article in list_articles:
+        url = article.article_url
+        # The article number is the position of the article within the shard prompt
+        if url not in article_numbers and article.article_number.isdigit() and 1 <= int(article.article_number) <= len(shard):
+            url = shard[int(article.article_number) - 1]
+        if url in article_numbers:
+            article = replace(article, article_number=article_numbers[url], article_url=url)
+        renumbered_articles.append(article)
+    return renumbered_articles
+
+
+def _merge_shard_articles(shard_articles: list[list[Article]], votes: Counter) -> list[Article]:
+    """
+    Merges the renumbered relevant articles identified in the shards of one completion into a single ranked list.
+    The articles are ranked by their rank within their shard, ties being broken by the number of completions
+    which identified them.
+    
+    Args:
+        shard_articles (list[list[Article]]): The relevant articles identified in each shard, by decreasing impact
+        votes (Counter): The number of completions and shards which identified each URL
+    
+    Returns:
+        list[Article]: At most MAX_RELEVANT_ARTICLES articles, by decreasing impact
+    """
+
+    ranked_articles = []
+    for list_articles in shard_articles:
+        for rank, article in enumerate(list_articles):
+            ranked_articles.append((rank, -votes[article.article_url], article))
+
+    merged_articles = []
+    for _, _, article in sorted(ranked_articles, key=lambda ranked_article: ranked_article[:2]):
+        if all(article.article_url != merged_article.article_url for merged_article in merged_articles):
+            merged_articles.append(article)
+    return merged_articles[:MAX_RELEVANT_ARTICLES]
+
+
+async def _identify_relevant_articles_in_shards(
+    recent_news: GenerateRecentNews,
+    sink: ProgressSink,
+    number_of_completions: int,
+    number_of_shards: int
+) -> list[list[Article]]:
+    """
+    Identifies the relevant articles of each completion by splitting the articles into shards (map),
+    identifying the relevant articles of all the shards concurrently, and merging the results of the shards (reduce).
+    
+    Args:
+        recent_news (GenerateRecentNews): The news generation request containing parsed URLs and their content
+        sink (ProgressSink): A sink for logging progress and results
+        number_of_completions (int): Number of LLM completions to generate for each shard
+        number_of_shards (int): The number of shards
+    
+    Returns:
+        list[list[Article]]: A list of lists containing Article objects, one list per completion
+    """
+
+    shards = _split_into_shards(urls=list(recent_news.parsed_urls), number_of_shards=number_of_shards)
+    message = f'The {len(recent_news.parsed_urls)} articles for {recent_news.query} were split into {len(shards)} non-empty shards out of {number_of_shards}'
+    log.info(f'{message}\n')
+    sink.send(message)
+
+    shard_prompts = {
+        shard_number: _build_identification_of_relevant_articles_prompt(
+            recent_news=replace(recent_news, parsed_urls={url: recent_news.parsed_urls[url] for url in shard}),
+            sink=sink
+        )
+        for shard_number, shard in shards.items()
+    }
+    article_numbers = {url: str(idx) for idx, url in enumerate(sorted(recent_news.parsed_urls), 1)}
+
+    async def identify_in_shard(completion_idx: int, shard_number: int) -> list[Article]:
+        # The shard number, unlike the position of the shard among the non-empty ones, identifies the shard across runs
+        try:
+            response = await llm_client.ask_LLM_async(
+                prompt=shard_prompts[shard_number],
+                cache_prefix=(recent_news.query, f"relevant articles {completion_idx + 1}", f"shard {shard_number + 1}"),
+                max_time=MAX_TIME_IDENTIFICATION_OF_RELEVANT_ARTICLES
+            )
+        except Exception as e:
+            log.info(f'The LLM completion {completion_idx + 1} for shard {shard_number + 1} failed: {str(e)}\n')
+            return []
+        list_articles = _parse_LLM_response(idx=f'{completion_idx + 1} for shard {shard_number + 1}', response=response)
+        return _renumber_shard_articles(list_articles=list_articles, shard=shards[shard_number], article_numbers=article_numbers)
+
+    shard_articles = await asyncio.gather(*(
+        asyncio.gather(*(identify_in_shard(completion_idx=completion_idx, shard_number=shard_number) for shard_number in shards))
+        for completion_idx in range(number_of_completions)
+    ))
+
+    # The votes are counted once the articles referred to by their number within a shard have been given their URL
+    votes = Counter(article.article_url for completion in shard_articles for list_articles in completion for article in list_articles)
+    relevant_articles = [_merge_shard_articles(shard_articles=completion, votes=votes) for completion in shard_articles]
+    _report_relevant_article_counts(query=recent_news.query, relevant_articles=relevant_articles, sink=sink)
+
     return relevant_articles
 
 
-def identify_relevant_articles(
+async def identify_relevant_articles_async(
     recent_news: GenerateRecentNews,
     sink: ProgressSink,
-    number_of_completions: int = NUMBER_OF_COMPLETIONS
+    number_of_completions: int = NUMBER_OF_COMPLETIONS,
+    number_of_shards: int = NUMBER_OF_SHARDS,
+    consensus: bool = CONSENSUS_MODE
 ) -> GenerateRecentNews:
     """
-    Identifies articles relevant to a query by analyzing the parsed article content.
+    Identifies articles relevant to a query by analyzing the parsed article content, running the LLM completions concurrently.
+    In sharded mode, the articles are split into shards which are identified in separate, individually cached prompts.
+    In consensus mode, completions stop being generated once enough of them agree, and are merged by vote.
     
     Args:
         recent_news (GenerateRecentNews): The news generation request containing parsed URLs and their content
         sink (ProgressSink): A sink for logging progress and results
         number_of_completions (int, optional): Number of LLM completions to generate. Defaults to NUMBER_OF_COMPLETIONS
+        number_of_shards (int, optional): The number of shards, 0 or 1 to send all the articles in one prompt.
+            Defaults to NUMBER_OF_SHARDS
+        consensus (bool, optional): Whether to use the consensus mode, when the articles are not sharded. Defaults to CONSENSUS_MODE
     
     Returns:
         GenerateRecentNews: A new object containing the original query plus identified relevant articles
@@ -183,31 +548,25 @@ def identify_relevant_articles(
     )
     
     try:
-        # Build the prompt
-        identification_of_relevant_articles_prompt = _build_identification_of_relevant_articles_prompt(
-            recent_news=recent_news
-        )
-        
-        # Create the wrapper function for LLM requests
-        llm_wrapper = _create_llm_wrapper(llm_client.ask_LLM, recent_news.query)
-        
-        # Prepare arguments for multiple LLM requests
-        llm_args = [(idx, identification_of_relevant_articles_prompt) 
-                   for idx in range(number_of_completions)]
-        
-        # Run multiple LLM requests with timeout
-        LLM_responses = list(run_multiple_with_limited_time(
-            func=llm_wrapper,
-            args=llm_args,
-            max_time=MAX_TIME_IDENTIFICATION_OF_RELEVANT_ARTICLES
-        ))
-        
-        # Parse the LLM responses
-        relevant_articles = _parse_LLM_responses(
-            query=recent_news.query,
-            LLM_responses=LLM_responses,
-            sink=sink
-        )
+        if number_of_shards > 1:
+            relevant_articles = await _identify_relevant_articles_in_shards(
+                recent_news=recent_news,
+                sink=sink,
+                number_of_completions=number_of_completions,
+                number_of_shards=number_of_shards
+            )
+        elif consensus:
+            relevant_articles = await _identify_relevant_articles_until_consensus(
+                recent_news=recent_news,
+                sink=sink,
+                number_of_completions=number_of_completions
+            )
+        else:
+            relevant_articles = await _identify_relevant_articles_in_one_prompt(
+                recent_news=recent_news,
+                sink=sink,
+                number_of_completions=number_of_completions
+            )
         
         # End timing and log duration
         timestamp_end = get_and_log_current_time(
@@ -228,6 +587,7 @@ def identify_relevant_articles(
             search_terms=recent_news.search_terms,
             retrieved_urls=recent_news.retrieved_urls,
             parsed_urls=recent_news.parsed_urls,
+            alternate_urls=recent_news.alternate_urls,
             relevant_articles=relevant_articles
         )
         
@@ -235,3 +595,38 @@ def identify_relevant_articles(
         # Log the exception and re-raise it
         log.info(f'An exception occurred during the identification of relevant articles for {recent_news.query}: {e}\n')
         raise
+
+
+def identify_relevant_articles(
+    recent_news: GenerateRecentNews,
+    sink: ProgressSink,
+    number_of_completions: int = NUMBER_OF_COMPLETIONS,
+    number_of_shards: int = NUMBER_OF_SHARDS,
+    consensus: bool = CONSENSUS_MODE
+) -> GenerateRecentNews:
+    """
+    Identifies articles relevant to a query by analyzing the parsed article content.
+    Synchronous wrapper around identify_relevant_articles_async.
+    
+    Args:
+        recent_news (GenerateRecentNews): The news generation request containing parsed URLs and their content
+        sink (ProgressSink): A sink for logging progress and results
+        number_of_completions (int, optional): Number of LLM completions to generate. Defaults to NUMBER_OF_COMPLETIONS
+        number_of_shards (int, optional): The number of shards, 0 or 1 to send all the articles in one prompt.
+            Defaults to NUMBER_OF_SHARDS
+        consensus (bool, optional): Whether to use the consensus mode, when the articles are not sharded. Defaults to CONSENSUS_MODE
+    
+    Returns:
+        GenerateRecentNews: A new object containing the original query plus identified relevant articles
+    
+    Raises:
+        Exception: If no URLs have been parsed or if an error occurs during processing
+    """
+
+    return asyncio.run(identify_relevant_articles_async(
+        recent_news=recent_news,
+        sink=sink,
+        number_of_completions=number_of_completions,
+        number_of_shards=number_of_shards,
+        consensus=consensus
+    ))
@@ -1,6 +1,11 @@
 from google import genai
+from google.genai import errors
 from dotenv import load_dotenv
+import hashlib
 import os
+import re
+import time
+import unicodedata
 from abc import ABC, abstractmethod
 import requests
 import json
@@ -11,6 +16,11 @@ from typing import *
 
 load_dotenv()
 
+MAX_CONCURRENT_LLM_CALLS = 16
+LLM_SINGLE_FLIGHT_LEASE = 300 #Seconds, LLM calls can take minutes
+
+llm_worker_pool = WorkerPool(name='LLM calls', max_workers=MAX_CONCURRENT_LLM_CALLS)
+
 
 class LLM_client(ABC):
     """Abstract base class for an LLM client."""     
@@ -25,6 +35,35 @@ class LLM_client(ABC):
         """Method to send a prompt to the LLM and return the response."""
         pass
 
+    async def ask_LLM_async(self, prompt, cache_prefix = '', max_time = None):
+        """Coroutine sending a prompt to the LLM on the LLM worker pool and returning the response."""
+        return await llm_worker_pool.run_async(self.ask_LLM, prompt = prompt, cache_prefix = cache_prefix, max_time = max_time)
+
+
+# Handle all types of quotes and apostrophes
+QUOTE_REPLACEMENTS = {
+    '\u2018': "'",  # Left single quote
+    '\u2019': "'",  # Right single quote
+    '\u201c': '"',  # Left double quote
+    '\u201d': '"',  # Right double quote
+    '\u201a': "'",  # Single low-9 quote
+    '\u201b': "'",  # Single high-reversed-9 quote
+    '\u201e': '"',  # Double low-9 quote
+    '\u201f': '"',  # Double high-reversed-9 quote
+    '\u2032': "'",  # Prime (minutes, feet)
+    '\u2033': '"',  # Double prime (seconds, inches)
+    '\u2035': "'",  # Reversed prime
+    '\u2036': '"',  # Reversed double prime
+    '\u2039': "'",  # Single left-pointing angle quote
+    '\u203a': "'",  # Single right-pointing angle quote
+    '\u275b': '"',  # Heavy single turned comma quote
+    '\u275c': '"',  # Heavy single comma quote
+    '\u275d': '"',  # Heavy double turned comma quote
+    '\u275e': '"',  # Heavy double comma quote
+}
+# Apostrophes in possessives and contractions, escaped in a single pass
+CONTRACTION_APOSTROPHE = re.compile(r"'(?=s|t|m|re|ve|ll|d)")
+
 
 def clean_text(text: str) -> str:
     """
@@ -48,41 +87,74 @@ def clean_text(text: str) -> str:
     text = text.strip()
     text = text.replace('`', '')
     
-    # Handle all types of quotes and apostrophes
-    quote_replacements = {
-        '\u2018': "'",  # Left single quote
-        '\u2019': "'",  # Right single quote
-        '\u201c': '"',  # Left double quote
-        '\u201d': '"',  # Right double quote
-        '\u201a': "'",  # Single low-9 quote
-        '\u201b': "'",  # Single high-reversed-9 quote
-        '\u201e': '"',  # Double low-9 quote
-        '\u201f': '"',  # Double high-reversed-9 quote
-        '\u2032': "'",  # Prime (minutes, feet)
-        '\u2033': '"',  # Double prime (seconds, inches)
-        '\u2035': "'",  # Reversed prime
-        '\u2036': '"',  # Reversed double prime
-        '\u2039': "'",  # Single left-pointing angle quote
-        '\u203a': "'",  # Single right-pointing angle quote
-        '\u275b': '"',  # Heavy single turned comma quote
-        '\u275c': '"',  # Heavy single comma quote
-        '\u275d': '"',  # Heavy double turned comma quote
-        '\u275e': '"',  # Heavy double comma quote
-    }
+    # Curly quotes are not ASCII, so ASCII responses are not scanned for them. str.replace does not copy a text
+    # in which the character is missing, and is much faster than str.translate with a non-ASCII table
+    if not text.isascii():
+        for curly, straight in QUOTE_REPLACEMENTS.items():
+            text = text.replace(curly, straight)
     
-    for curly, straight in quote_replacements.items():
-        text = text.replace(curly, straight)
+    return CONTRACTION_APOSTROPHE.sub(r"\\'", text)
+
+
+LEGACY_CACHE_KEY_SEPARATOR = ' for the prompt: '
+
+
+def canonicalize_prompt(prompt: str) -> str:
+    """
+    Canonicalizes a prompt so that prompts differing only in their Unicode normalization form,
+    line endings or surrounding whitespace share the same cache key.
     
-    # Handle apostrophes in possessives and contractions
-    text = text.replace("'s", "\\'s")
-    text = text.replace("'t", "\\'t")
-    text = text.replace("'m", "\\'m")
-    text = text.replace("'re", "\\'re")
-    text = text.replace("'ve", "\\'ve")
-    text = text.replace("'ll", "\\'ll")
-    text = text.replace("'d", "\\'d")
+    Args:
+        prompt (str): The prompt to canonicalize
+        
+    Returns:
+        str: The canonical prompt
+    """
+    return unicodedata.normalize('NFC', prompt).replace('\r\n', '\n').strip()
+
+
+def build_cache_key(prompt: str, model_name: str, cache_prefix: Any = '') -> str:
+    """
+    Builds the cache key of an LLM answer from a fixed-size digest of the canonical prompt, the model name and the cache prefix.
+    The cache prefix is kept readable in the key, so that the entries of a query can still be found by prefix.
     
-    return text
+    Args:
+        prompt (str): The prompt sent to the LLM
+        model_name (str): The name of the model answering the prompt
+        cache_prefix (Any): Optional prefix for cache key
+        
+    Returns:
+        str: The cache key
+    """
+    digest = hashlib.sha256(json.dumps([str(cache_prefix), model_name, canonicalize_prompt(prompt)]).encode('utf-8')).hexdigest()
+    return f"LLM answer {cache_prefix} of {model_name} for the prompt digest: {digest}" if cache_prefix else f"LLM answer of {model_name} for the prompt digest: {digest}"
+
+
+def build_legacy_cache_key(prompt: str, cache_prefix: Any = '') -> str:
+    """Builds the cache key of an LLM answer as it was built before hashing the prompts, embedding the full prompt."""
+    return f"LLM answer {cache_prefix}{LEGACY_CACHE_KEY_SEPARATOR}{prompt}" if cache_prefix else f"LLM answer{LEGACY_CACHE_KEY_SEPARATOR}{prompt}"
+
+
+def _move_cache_entry(old_key: str, new_key: str) -> bool:
+    """
+    Moves a cache entry to a new key, keeping its remaining time to live.
+    
+    Args:
+        old_key (str): The key the entry is currently stored under
+        new_key (str): The key the entry should be stored under
+        
+    Returns:
+        bool: True if the entry was found and moved, False otherwise
+    """
+    value, expire_time = cache.get(old_key, expire_time = True)
+    if value is None:
+        return False
+    
+    remaining_time = None if expire_time is None else expire_time - time.time()
+    if remaining_time is None or remaining_time > 0:
+        cache.set(new_key, value, expire = remaining_time)
+    cache.delete(old_key)
+    return True
 
 
 class Gemini_client(LLM_client):
@@ -108,7 +180,7 @@ class Gemini_client(LLM_client):
         """
         try:
             # Generate cache key
-            key = f"LLM answer {cache_prefix} for the prompt: {prompt}" if cache_prefix else f"LLM answer for the prompt: {prompt}"
+            key = build_cache_key(prompt = prompt, model_name = self.model_name, cache_prefix = cache_prefix)
             
             # Check cache first
             cached_result = cache.get(key)
@@ -116,36 +188,77 @@ class Gemini_client(LLM_client):
                 log.info(f'Cache hit for LLM call for {cache_prefix}\n')
                 return {'status_code': 200, 'response_content': cached_result}
             
-            # Acquire rate limiter before making API call
-            rate_limiter.acquire()
+            # Only one caller sends the same prompt to the LLM, the others wait for its answer
+            with cache.single_flight(key, lease = LLM_SINGLE_FLIGHT_LEASE):
+                previously_stored_result = cache.get(key)
+                if previously_stored_result is not None:
+                    log.info(f'LLM answer already stored in the cache for the same LLM call {cache_prefix}\n')
+                    return {'status_code': 200, 'response_content': previously_stored_result}
+                
+                # Acquire rate limiter before making API call
+                rate_limiter.acquire()
             
-            # Make API call
-            response = self.client.models.generate_content(
-                model = self.model_name,
-                contents = prompt
-            )
+                # Make API call
+                try:
+                    response = self.client.models.generate_content(
+                        model = self.model_name,
+                        contents = prompt
+                    )
+                except errors.APIError as e:
+                    if e.code in THROTTLING_STATUS_CODES:
+                        rate_limiter.record_throttled()
+                    raise
+                rate_limiter.record_success()
             
-            # Get and clean response text
-            response_text = response.candidates[0].content.parts[0].text
-            log.info(f'LLM response text for {cache_prefix}: {response_text}\n')
+                # Get and clean response text
+                response_text = response.candidates[0].content.parts[0].text
+                log.info(f'LLM response text for {cache_prefix}: {response_text}\n')
             
-            # Clean and parse response
-            response_text = clean_text(response_text)
-            try:
-                response_content = json5.loads(response_text)
-            except Exception as e:
-                log.error(f'Failed to parse LLM response as JSON: {str(e)}\nResponse text: {response_text}')
-                raise
+                # Clean and parse response
+                response_text = clean_text(response_text)
+                try:
+                    response_content = json5.loads(response_text)
+                except Exception as e:
+                    log.error(f'Failed to parse LLM response as JSON: {str(e)}\nResponse text: {response_text}')
+                    raise
             
-            # Cache successful response
-            cache.set(key, response_content, expire = TTL)
-            log.info(f'Cache entry set for LLM call: {cache_prefix} of length {len(json.dumps(response_content))}\n')
+                # Cache successful response
+                cache.set(key, response_content)
+                log.info(f'Cache entry set for LLM call: {cache_prefix} of length {len(json.dumps(response_content))}\n')
             
-            return {'status_code': 200, 'response_content': response_content}
+                return {'status_code': 200, 'response_content': response_content}
             
         except Exception as e:
             log.error(f'An exception occurred during the LLM call for {cache_prefix}: {str(e)}\n')
-            return {'status_code': getattr(e, 'status_code', 500), 'response_content': ''}
+            return {'status_code': getattr(e, 'status_code', getattr(e, 'code', 500)), 'response_content': ''}
+
+    def migrate_legacy_cache_keys(self) -> int:
+        """
+        Moves all the LLM answers stored under legacy keys, which embed the full prompt, to hashed keys.
+        The legacy entries are assumed to have been answered by this client's model.
+        Meant to be run once when deploying, by running this module, since the lookups only use the hashed keys.
+        
+        Returns:
+            int: The number of migrated entries
+        """
+        legacy_keys = [
+            k for k in cache.iterkeys()
+            if isinstance(k, str) and k.startswith('LLM answer') and LEGACY_CACHE_KEY_SEPARATOR in k
+        ]
+        
+        migrated_count = 0
+        for legacy_key in legacy_keys:
+            cache_prefix, prompt = legacy_key[len('LLM answer'):].split(LEGACY_CACHE_KEY_SEPARATOR, 1)
+            new_key = build_cache_key(prompt = prompt, model_name = self.model_name, cache_prefix = cache_prefix.strip())
+            if _move_cache_entry(old_key = legacy_key, new_key = new_key):
+                migrated_count += 1
+        
+        log.info(f'Migrated {migrated_count} LLM cache entries out of {len(legacy_keys)} legacy entries to hashed keys\n')
+        return migrated_count
             
 
-llm_client = Gemini_client("gemini-2.0-flash-thinking-exp")
\ No newline at end of file
+llm_client = Gemini_client("gemini-2.0-flash-thinking-exp")
+
+
+if __name__ == "__main__":
+    llm_client.migrate_legacy_cache_keys()
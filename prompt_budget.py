@@ -0,0 +1,101 @@
+import math
+from typing import Any
+
+
+CHARACTERS_PER_TOKEN = 4 #Average length of a token of English text for the Gemini tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates locally the number of tokens of a text, without calling the tokenizer of the LLM API
+
+    Args:
+        text (str): The text
+
+    Returns:
+        int: The estimated number of tokens
+    """
+
+    return math.ceil(len(text) / CHARACTERS_PER_TOKEN)
+
+
+def truncate_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    Truncates a text to a number of tokens, keeping its beginning. Since the paragraphs of an article are in document order,
+    its lead paragraphs, which summarize the news, are kept first. The text is cut at a word boundary.
+
+    Args:
+        text (str): The text
+        max_tokens (int): The maximum number of tokens of the truncated text
+
+    Returns:
+        str: The truncated text
+    """
+
+    max_characters = max(0, max_tokens) * CHARACTERS_PER_TOKEN
+    if len(text) <= max_characters:
+        return text
+
+    truncated_text = text[:max_characters]
+    if not text[max_characters].isspace():
+        #Drop the word which was cut
+        words = truncated_text.rsplit(maxsplit=1)
+        truncated_text = words[0] if len(words) > 1 else ''
+    return truncated_text.rstrip()
+
+
+def allocate_token_budget(token_counts: list[int], budget: int) -> list[int]:
+    """
+    Shares a token budget fairly between texts (water-filling): texts shorter than an equal share are kept whole,
+    and the tokens they leave are shared equally among the longer texts
+
+    Args:
+        token_counts (list[int]): The number of tokens of each text
+        budget (int): The total number of tokens available
+
+    Returns:
+        list[int]: The number of tokens allocated to each text, in the order of the input
+    """
+
+    allocations = [0] * len(token_counts)
+    remaining_budget = max(0, budget)
+    order = sorted(range(len(token_counts)), key=lambda i: token_counts[i])
+
+    for position, i in enumerate(order):
+        share = remaining_budget // (len(order) - position)
+        allocations[i] = min(token_counts[i], share)
+        remaining_budget -= allocations[i]
+
+    return allocations
+
+
+def fit_texts_to_token_budget(texts: dict[str, str], budget: int) -> tuple[dict[str, str], dict[str, Any]]:
+    """
+    Truncates texts, such as the texts of the articles of a prompt, so that their total number of tokens fits into a budget
+
+    Args:
+        texts (dict[str, str]): A dictionary containing the texts, by key such as the URL of an article
+        budget (int): The total number of tokens available for the texts
+
+    Returns:
+        tuple[dict[str, str], dict[str, Any]]: The truncated texts by key, and statistics on the tokens kept and dropped
+    """
+
+    keys = list(texts)
+    token_counts = [count_tokens(text=texts[key]) for key in keys]
+    allocations = allocate_token_budget(token_counts=token_counts, budget=budget)
+
+    truncated_texts = {
+        key: texts[key] if allocation >= token_count else truncate_to_token_budget(text=texts[key], max_tokens=allocation)
+        for key, token_count, allocation in zip(keys, token_counts, allocations)
+    }
+
+    original_tokens = sum(token_counts)
+    kept_tokens = sum(count_tokens(text=text) for text in truncated_texts.values())
+    statistics = {
+        'original_tokens': original_tokens,
+        'kept_tokens': kept_tokens,
+        'dropped_tokens': original_tokens - kept_tokens,
+        'truncated_texts': sum(1 for token_count, allocation in zip(token_counts, allocations) if allocation < token_count)
+    }
+    return truncated_texts, statistics
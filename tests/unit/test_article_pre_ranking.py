@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from article_pre_ranking import BM25Index, pre_rank_articles, select_top_articles
+from generate_recent_news import GenerateRecentNews
+from progress_sink import ProgressSink
+
+
+ARTICLES = {
+    'https://a.com/bitcoin': 'Bitcoin rallied after the approval of a spot bitcoin fund. Bitcoin miners gained too.',
+    'https://b.com/wrap': 'Stocks closed higher as technology shares rose and oil prices fell. Bitcoin was little changed.',
+    'https://c.com/oil': 'Oil prices fell for a third session as inventories rose more than expected.',
+}
+
+TESLA_ARTICLE = (
+    'Tesla shares jumped 5% on Tuesday after the electric vehicle maker reported record deliveries for the quarter. '
+    'Chief executive Elon Musk said demand for the Model Y remained strong in China and Europe, '
+    'and analysts raised their price targets on the carmaker.'
+)
+MARKET_WRAP = (
+    'Stock market news today: stocks rallied on Wall Street as the S&P 500 and the Nasdaq hit record highs. '
+    'Technology stocks led the market higher, with shares of Apple, Nvidia and Tesla rising, while oil prices fell. '
+    'Treasury yields declined after the latest inflation report, and investors are now watching the Federal Reserve, '
+    'the jobs report and the earnings of the biggest US companies this week. The Dow rose, the S&P 500 gained, '
+    'the Nasdaq climbed and stocks in every sector of the US economy advanced. Here is the latest market news '
+    'for today, with the stock market updates of the day for stocks, bonds, oil and the dollar.'
+)
+SPORTS_ARTICLE = 'The home side won the game in the final minutes of the match, and the coach praised the defence after it was over.'
+# Search terms as generated for a ticker, about the company, its index, its country and its industries
+TESLA_SEARCH_TERMS = [
+    'TSLA stock news', 'Tesla latest news', 'Tesla stock price today', 'Tesla earnings', 'Tesla deliveries', 'Elon Musk Tesla',
+    'Tesla news today', 'Nasdaq 100 latest news', 'Nasdaq today', 'S&P 500 news', 'US stock market news today', 'Wall Street today',
+    'US economy latest news', 'Federal Reserve interest rates', 'US inflation report', 'automotive industry news',
+    'electric vehicle market news', 'EV sales latest', 'technology sector stocks', 'auto stocks today', 'battery technology news',
+    'autonomous driving news', 'clean energy stocks', 'China EV market', 'Tesla competitors BYD', 'Rivian stock news',
+]
+
+
+class TestBM25Index(unittest.TestCase):
+    def test_articles_about_the_query_score_higher(self):
+        """Test that the article mostly about the query terms scores highest and an unrelated article scores 0."""
+        scores = BM25Index(documents=ARTICLES).score(query='Bitcoin cryptocurrency')
+        self.assertGreater(scores['https://a.com/bitcoin'], scores['https://b.com/wrap'])
+        self.assertGreater(scores['https://b.com/wrap'], 0)
+        self.assertEqual(scores['https://c.com/oil'], 0)
+
+    def test_index_of_a_hundred_articles_is_fast(self):
+        """Test that indexing and scoring about a hundred articles takes milliseconds."""
+        articles = {f'https://example.com/{i}': ' '.join(f'word{j % 500} bitcoin' for j in range(i, i + 800)) for i in range(100)}
+        timestamp_start = time.perf_counter()
+        BM25Index(documents=articles).score(query='Bitcoin cryptocurrency BTC')
+        self.assertLess(time.perf_counter() - timestamp_start, 0.5)
+
+
+class TestSelectTopArticles(unittest.TestCase):
+    def test_top_articles_are_kept_in_the_input_order(self):
+        """Test that only the top-ranked articles containing query terms are kept."""
+        self.assertEqual(list(select_top_articles(articles=ARTICLES, query='Bitcoin', max_articles=5)), ['https://a.com/bitcoin', 'https://b.com/wrap'])
+        self.assertEqual(list(select_top_articles(articles=ARTICLES, query='Bitcoin', max_articles=1)), ['https://a.com/bitcoin'])
+
+    def test_articles_are_kept_when_none_matches(self):
+        """Test that articles are not all dropped when none of them contains a term of the query."""
+        self.assertEqual(len(select_top_articles(articles=ARTICLES, query='Ethereum', max_articles=2)), 2)
+
+
+class TestPreRankArticles(unittest.TestCase):
+    def test_off_topic_articles_are_dropped(self):
+        """Test that the stage keeps the relevant articles with their alternate URLs."""
+        recent_news = GenerateRecentNews(
+            query='BTC',
+            query_meaning='Cryptocurrency Bitcoin',
+            search_terms=['Bitcoin price'],
+            parsed_urls=ARTICLES,
+            alternate_urls={'https://a.com/bitcoin': ['https://d.com/bitcoin'], 'https://c.com/oil': ['https://e.com/oil']}
+        )
+
+        result = pre_rank_articles(recent_news=recent_news, sink=MagicMock(spec=ProgressSink), max_articles=10)
+
+        self.assertEqual(list(result.parsed_urls), ['https://a.com/bitcoin', 'https://b.com/wrap'])
+        self.assertEqual(result.alternate_urls, {'https://a.com/bitcoin': ['https://d.com/bitcoin']})
+
+    def test_article_about_the_query_outranks_a_market_wrap(self):
+        """Test that an article about the query outranks a market wrap matching many of the broad search terms,
+        and that an article sharing only stopwords with the query and the search terms is dropped."""
+        recent_news = GenerateRecentNews(
+            query='TSLA',
+            query_meaning='Tesla, Inc., the American maker of electric vehicles and clean energy products',
+            search_terms=TESLA_SEARCH_TERMS,
+            parsed_urls={'https://a.com/wrap': MARKET_WRAP, 'https://b.com/tesla': TESLA_ARTICLE, 'https://c.com/sports': SPORTS_ARTICLE}
+        )
+
+        self.assertEqual(list(pre_rank_articles(recent_news=recent_news, sink=MagicMock(spec=ProgressSink), max_articles=1).parsed_urls), ['https://b.com/tesla'])
+        self.assertEqual(
+            list(pre_rank_articles(recent_news=recent_news, sink=MagicMock(spec=ProgressSink), max_articles=10).parsed_urls),
+            ['https://a.com/wrap', 'https://b.com/tesla']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
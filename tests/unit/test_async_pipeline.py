@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from async_pipeline import CrawlingHandoff, perform_web_search_and_crawling_async
+from generate_recent_news import GenerateRecentNews
+from progress_sink import ProgressSink
+
+
+class TestPerformWebSearchAndCrawlingAsync(unittest.TestCase):
+    def setUp(self):
+        self.sink = MagicMock(spec=ProgressSink)
+        self.recent_news = GenerateRecentNews(
+            query="test query",
+            query_meaning="test meaning",
+            search_terms=["fast term", "slow term"]
+        )
+        self.search_results = {
+            "fast term": ["https://example.com/1", "https://example.com/2"],
+            "slow term": ["https://example.com/2", "https://example.com/3"]
+        }
+        self.events = []
+
+    def _search_web(self, search_term):
+        if search_term == "slow term":
+            time.sleep(0.3)
+        self.events.append(('search finished', search_term, time.monotonic()))
+        return {'status_code': 200, 'search_results': self.search_results[search_term]}
+
+    def _process_webpage(self, url, max_crawling_time=None):
+        self.events.append(('crawl started', url, time.monotonic()))
+        return {'status_code': 200, 'content': f'content of {url}'}
+
+    def test_crawling_starts_before_the_web_search_finishes(self):
+        """Test that the URLs of a search term are crawled while slower search terms are still being searched."""
+        with patch('async_pipeline.websearch_client.search_web', side_effect=self._search_web), \
+                patch('crawling._fetchWebpage', side_effect=self._process_webpage):
+            result = asyncio.run(perform_web_search_and_crawling_async(recent_news=self.recent_news, sink=self.sink))
+
+        slow_search_finished_at = next(t for event, arg, t in self.events if event == 'search finished' and arg == 'slow term')
+        first_crawl_started_at = min(t for event, _, t in self.events if event == 'crawl started')
+        self.assertLess(first_crawl_started_at, slow_search_finished_at)
+
+        self.assertEqual(result.retrieved_urls, ["https://example.com/1", "https://example.com/2", "https://example.com/3"])
+        self.assertEqual(result.parsed_urls, {url: f'content of {url}' for url in result.retrieved_urls})
+
+    def test_each_url_is_crawled_once(self):
+        """Test that URLs returned by several search terms are only crawled once."""
+        with patch('async_pipeline.websearch_client.search_web', side_effect=self._search_web), \
+                patch('crawling._fetchWebpage', side_effect=self._process_webpage):
+            asyncio.run(perform_web_search_and_crawling_async(recent_news=self.recent_news, sink=self.sink))
+
+        crawled_urls = [url for event, url, _ in self.events if event == 'crawl started']
+        self.assertEqual(sorted(crawled_urls), ["https://example.com/1", "https://example.com/2", "https://example.com/3"])
+
+    def test_overlap_is_reported_when_the_web_search_finishes(self):
+        """Test that the URLs of the fast search term are reported as crawled when the slow search term finishes."""
+        with patch('async_pipeline.websearch_client.search_web', side_effect=self._search_web), \
+                patch('crawling._fetchWebpage', side_effect=self._process_webpage):
+            asyncio.run(perform_web_search_and_crawling_async(recent_news=self.recent_news, sink=self.sink))
+
+        self.sink.send.assert_any_call(
+            message='When the web search finished, 2 URLs had already been crawled and 1 URLs were being crawled'
+        )
+
+    def test_empty_search_terms(self):
+        """Test that an exception is raised when search_terms is empty."""
+        recent_news = GenerateRecentNews(query="test query", query_meaning="test meaning", search_terms=[])
+
+        with self.assertRaises(Exception) as context:
+            asyncio.run(perform_web_search_and_crawling_async(recent_news=recent_news, sink=self.sink))
+        self.assertEqual(str(context.exception), "Search terms have not been generated")
+
+
+class TestCrawlingHandoff(unittest.TestCase):
+    def test_search_results_are_deduplicated_incrementally(self):
+        """Test that only the URLs not returned by a previous search term are put on the crawl queue."""
+        async def run_handoff():
+            crawled_urls = []
+
+            async def crawl(url):
+                crawled_urls.append(url)
+                return {'status_code': 200, 'content': url}
+
+            handoff = CrawlingHandoff(crawl=crawl)
+            counts = [
+                handoff.add_search_results(urls=["url1", "url2", "url1"]),
+                handoff.add_search_results(urls=["url2", "url3"])
+            ]
+            handoff.end_of_search()
+            results = await handoff.get_crawling_results()
+            return counts, crawled_urls, results
+
+        counts, crawled_urls, results = asyncio.run(run_handoff())
+
+        self.assertEqual(counts, [2, 1])
+        self.assertEqual(crawled_urls, ["url1", "url2", "url3"])
+        self.assertEqual(sorted(results.keys()), ["url1", "url2", "url3"])
+
+    def test_the_first_variant_of_each_article_is_crawled(self):
+        """Test that the URL crawled for an article is the first one returned, rather than its canonical form."""
+        async def run_handoff():
+            crawled_urls = []
+
+            async def crawl(url):
+                crawled_urls.append(url)
+                return {'status_code': 200, 'content': url}
+
+            handoff = CrawlingHandoff(crawl=crawl)
+            handoff.add_search_results(urls=["http://www.example.com/tag/amp", "https://www.example.com/story?utm_source=ddg"])
+            handoff.add_search_results(urls=["https://www.example.com/story", "https://www.example.com/tag/amp"])
+            handoff.end_of_search()
+            await handoff.get_crawling_results()
+            return crawled_urls
+
+        self.assertEqual(asyncio.run(run_handoff()), ["http://www.example.com/tag/amp", "https://www.example.com/story?utm_source=ddg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
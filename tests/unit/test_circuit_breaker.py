@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import diskcache as dc
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from cache import TieredCache
+from circuit_breaker import CircuitBreaker
+from crawling import _is_crawlable, crawling_circuit_breaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = TieredCache(disk_cache=dc.Cache(self.cache_dir.name))
+        self.patcher = patch('circuit_breaker.cache', self.cache)
+        self.patcher.start()
+        self.circuit_breaker = CircuitBreaker(name='test', failure_threshold=3, open_duration=0.2)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        """Test that the circuit of a key opens once the failure threshold is reached, without affecting other keys."""
+        for _ in range(2):
+            self.circuit_breaker.record_failure(key='example.com')
+        self.assertFalse(self.circuit_breaker.is_open(key='example.com'))
+
+        self.circuit_breaker.record_failure(key='example.com')
+        self.assertTrue(self.circuit_breaker.is_open(key='example.com'))
+        self.assertFalse(self.circuit_breaker.is_open(key='other.com'))
+
+    def test_success_resets_the_failures(self):
+        """Test that a success between failures prevents the circuit from opening."""
+        for _ in range(2):
+            self.circuit_breaker.record_failure(key='example.com')
+        self.circuit_breaker.record_success(key='example.com')
+        for _ in range(2):
+            self.circuit_breaker.record_failure(key='example.com')
+        self.assertFalse(self.circuit_breaker.is_open(key='example.com'))
+
+    def test_circuit_closes_after_the_open_duration(self):
+        """Test that the circuit closes again once its state has expired from the cache."""
+        for _ in range(3):
+            self.circuit_breaker.record_failure(key='example.com')
+        time.sleep(0.3)
+        self.assertFalse(self.circuit_breaker.is_open(key='example.com'))
+
+    def test_state_is_shared_through_the_cache(self):
+        """Test that another circuit breaker of the same name sees the open circuit, as another process would."""
+        for _ in range(3):
+            self.circuit_breaker.record_failure(key='example.com')
+        self.assertTrue(CircuitBreaker(name='test').is_open(key='example.com'))
+        self.assertFalse(CircuitBreaker(name='other').is_open(key='example.com'))
+
+    def test_domain_is_skipped_once_both_fetch_methods_keep_failing(self):
+        """Test that a URL is only skipped when the domain fails both when crawled directly and using Crawlbase."""
+        url = 'https://www.example.com/article'
+        with patch.object(crawling_circuit_breaker, 'failure_threshold', 1):
+            crawling_circuit_breaker.record_failure(key='direct example.com')
+            self.assertTrue(_is_crawlable(url=url))
+            crawling_circuit_breaker.record_failure(key='Crawlbase example.com')
+            self.assertFalse(_is_crawlable(url=url))
+            self.assertTrue(_is_crawlable(url='https://other.com/article'))
+
+
+if __name__ == '__main__':
+    unittest.main()
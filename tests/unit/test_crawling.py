@@ -1,17 +1,23 @@
 import os
 import sys
+import tempfile
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from dataclasses import asdict
 
+import diskcache as dc
+
 # Get the absolute path to the back_end directory
 back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if back_end_path not in sys.path:
     sys.path.insert(0, back_end_path)
 
-from crawling import perform_crawling
+from cache import TieredCache
+from crawling import PARSING_START_METHOD, perform_crawling, _fetchWebpage, _finishProcessingWebpage, parse_text_from_html, _processWebpage, _remove_paragraphs_repeated_across_pages, _get_crawl_cache_key
 from generate_recent_news import GenerateRecentNews
 from progress_sink import ProgressSink
+from utils import LOG_FILENAME, WorkerPool, log
 
 
 class TestCrawling(unittest.TestCase):
@@ -61,5 +67,283 @@ class TestCrawling(unittest.TestCase):
         self.assertEqual(str(context.exception), "No URLs have been returned by the web search")
 
 
+class TestParseTextFromUrl(unittest.TestCase):
+    def test_paragraphs_keep_the_document_order_without_duplicates(self):
+        """Test that duplicate paragraphs are removed and the others are kept in document order, one per line."""
+        html = ''.join(f'<p>This is the paragraph number {i} of the article.</p>' for i in [3, 1, 2, 1, 3])
+        self.assertEqual(
+            parse_text_from_html(text=html),
+            'This is the paragraph number 3 of the article.\n'
+            'This is the paragraph number 1 of the article.\n'
+            'This is the paragraph number 2 of the article.'
+        )
+
+    def test_short_paragraphs_and_link_lists_are_removed(self):
+        """Test that paragraphs which are too short or mostly made of links are dropped."""
+        html = (
+            '<p>By Jane Doe</p>'
+            '<p>The central bank kept its rates unchanged on Wednesday.</p>'
+            '<p><a href="/a">Markets news today</a> | <a href="/b">More business stories</a></p>'
+            '<p>Read the <a href="/report">full report</a> published by the statistics office this morning.</p>'
+        )
+        self.assertEqual(
+            parse_text_from_html(text=html),
+            'The central bank kept its rates unchanged on Wednesday.\n'
+            'Read the full report published by the statistics office this morning.'
+        )
+
+    def test_empty_page(self):
+        """Test that an empty page gives an empty text."""
+        self.assertEqual(parse_text_from_html(text='   '), '')
+
+
+class TestRemoveParagraphsRepeatedAcrossPages(unittest.TestCase):
+    def test_paragraphs_repeated_on_pages_of_the_same_domain_are_removed(self):
+        """Test that a paragraph found on several pages of a domain is removed from each of them, but not from other domains."""
+        banner = 'We use cookies to improve your experience on our website.'
+        crawling_results = {
+            'https://www.example.com/article-1': f'First article text.\n{banner}',
+            'https://example.com/article-2': f'{banner}\nSecond article text.',
+            'https://example.com/article-3': f'Third article text.\n{banner}',
+            'https://other.com/article': f'Other article text.\n{banner}',
+            'https://example.com/timed-out': ''
+        }
+
+        result = _remove_paragraphs_repeated_across_pages(crawling_results=crawling_results)
+
+        self.assertEqual(result, {
+            'https://www.example.com/article-1': 'First article text.',
+            'https://example.com/article-2': 'Second article text.',
+            'https://example.com/article-3': 'Third article text.',
+            'https://other.com/article': f'Other article text.\n{banner}',
+            'https://example.com/timed-out': ''
+        })
+
+    def test_paragraphs_shared_by_two_articles_are_kept(self):
+        """Test that two overlapping articles of a domain, such as a syndicated copy and its update, keep their shared text."""
+        shared_paragraphs = 'The central bank raised its benchmark rate on Wednesday.\nPolicymakers said further increases were possible.'
+        crawling_results = {
+            'https://example.com/rates': f'{shared_paragraphs}\nReporting by a staff writer.',
+            'https://example.com/rates-update': f'{shared_paragraphs}\nMarkets fell after the announcement.',
+        }
+        result = _remove_paragraphs_repeated_across_pages(crawling_results=dict(crawling_results))
+        self.assertEqual(result, crawling_results)
+
+    def test_long_paragraphs_repeated_across_pages_are_kept(self):
+        """Test that a paragraph too long to be boilerplate is kept even if it is found on many pages of a domain."""
+        long_paragraph = 'The central bank raised its benchmark rate on Wednesday, citing persistent inflation. ' * 5
+        crawling_results = {f'https://example.com/article-{i}': f'Article {i} text.\n{long_paragraph}' for i in range(3)}
+        result = _remove_paragraphs_repeated_across_pages(crawling_results=dict(crawling_results))
+        self.assertEqual(result, crawling_results)
+
+    def test_duplicate_pages_are_left_unchanged(self):
+        """Test that pages whose paragraphs are all repeated are not emptied."""
+        crawling_results = {
+            'https://example.com/article': 'Article text.',
+            'https://example.com/article?page=1': 'Article text.'
+        }
+        result = _remove_paragraphs_repeated_across_pages(crawling_results=dict(crawling_results))
+        self.assertEqual(result, crawling_results)
+
+
+class TestConditionalRevalidation(unittest.TestCase):
+    URL = 'https://example.com/article'
+    PAGE = '<html><body><p>This is the text of the article, long enough to be kept.</p></body></html>'
+    TEXT = 'This is the text of the article, long enough to be kept.'
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = TieredCache(disk_cache=dc.Cache(self.cache_dir.name))
+        self.patchers = [
+            patch('crawling.cache', self.cache),
+            patch('circuit_breaker.cache', self.cache),
+            patch('crawling.HEDGED_FETCH', False)
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.requests = []
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def _download_text(self, status_code, content, headers):
+        """Returns a fake download recording the headers of each request and answering with the given response."""
+        def download_text(url, on_response=None, headers=None, **kwargs):
+            self.requests.append(headers)
+            if on_response is not None:
+                on_response(MagicMock(headers=headers_of_response))
+            return status_code, content
+        headers_of_response = headers
+        return download_text
+
+    def _expire_cached_text(self):
+        """Makes the cached text stale, as it is after its TTL."""
+        key = _get_crawl_cache_key(url=self.URL)
+        self.cache.set(key=key, value=self.cache.get(key=key, stale=True), expire=0)
+
+    def test_unchanged_page_is_not_downloaded_again(self):
+        """Test that a stale page is revalidated with its validators and that a 304 response serves the cached text again."""
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Oct 2025 10:00:00 GMT'}
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(200, self.PAGE, validators)):
+            self.assertEqual(_processWebpage(url=self.URL)['content'], self.TEXT)
+        self.assertEqual(self.requests, [{}])
+
+        self._expire_cached_text()
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(304, '', {})), \
+                patch('crawling.parse_text_from_html') as parse_text:
+            result = _processWebpage(url=self.URL)
+
+        self.assertEqual(result, {'status_code': 200, 'content': self.TEXT})
+        self.assertEqual(self.requests[1], {'If-None-Match': '"v1"', 'If-Modified-Since': 'Wed, 01 Oct 2025 10:00:00 GMT'})
+        parse_text.assert_not_called()
+        self.assertEqual(self.cache.get(key=_get_crawl_cache_key(url=self.URL)), self.TEXT)
+
+    def test_changed_page_replaces_the_cached_text(self):
+        """Test that a page which changed is parsed again and that validators are dropped when the new response has none."""
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(200, self.PAGE, {'ETag': '"v1"'})):
+            _processWebpage(url=self.URL)
+
+        self._expire_cached_text()
+        new_page = self.PAGE.replace('text of the article', 'updated text of the article')
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(200, new_page, {})):
+            result = _processWebpage(url=self.URL)
+        self.assertEqual(result['content'], self.TEXT.replace('text of the article', 'updated text of the article'))
+
+        self._expire_cached_text()
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(200, new_page, {})):
+            _processWebpage(url=self.URL)
+        self.assertEqual(self.requests, [{}, {'If-None-Match': '"v1"'}, {}])
+
+
+    def test_failed_revalidation_keeps_the_stale_text(self):
+        """Test that a failed crawl of a stale page does not replace its stale text, which a later 304 response serves again."""
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(200, self.PAGE, {'ETag': '"v1"'})):
+            _processWebpage(url=self.URL)
+
+        self._expire_cached_text()
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(503, '', {})):
+            self.assertEqual(_processWebpage(url=self.URL)['content'], '')
+        self.assertEqual(self.cache.get(key=_get_crawl_cache_key(url=self.URL), stale=True), self.TEXT)
+
+        with patch('crawling.http_client.download_text', side_effect=self._download_text(304, '', {})):
+            result = _processWebpage(url=self.URL)
+        self.assertEqual(result, {'status_code': 200, 'content': self.TEXT})
+        self.assertEqual(self.requests[2], {'If-None-Match': '"v1"'})
+
+
+class TestParsingWorkerPool(unittest.TestCase):
+    PAGE = '<html><body><p>This is the text of the article, long enough to be kept.</p></body></html>'
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = TieredCache(disk_cache=dc.Cache(self.cache_dir.name))
+        self.patchers = [
+            patch('crawling.cache', self.cache),
+            patch('circuit_breaker.cache', self.cache),
+            patch('crawling._extract_text_from_url', return_value={'status_code': 200, 'content': self.PAGE, 'fetched_by': 'direct'})
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def test_pages_are_parsed_in_worker_processes(self):
+        """Test that a fetched page is parsed by the process pool and its text cached."""
+        result = _processWebpage(url='https://example.com/article')
+        self.assertEqual(result, {'status_code': 200, 'content': 'This is the text of the article, long enough to be kept.'})
+
+    def test_slow_parsing_does_not_count_against_the_crawling_time_limit(self):
+        """Test that pages which are fetched in time are kept even if parsing them takes longer than the crawling time limit."""
+        def parse_slowly(text):
+            time.sleep(0.5)
+            return parse_text_from_html(text=text)
+
+        recent_news = GenerateRecentNews(
+            query="test query",
+            query_meaning="test meaning",
+            search_terms=["term"],
+            retrieved_urls=["https://example.com/1", "https://other.com/2"]
+        )
+        with patch('crawling.MAX_TIME_WEBPAGE_CRAWLING', 0.2), \
+                patch('crawling.parsing_worker_pool', WorkerPool(name='test parsing', max_workers=2)), \
+                patch('crawling.parse_text_from_html', side_effect=parse_slowly):
+            result = perform_crawling(recent_news=recent_news, sink=MagicMock(spec=ProgressSink))
+
+        self.assertEqual(sorted(result.parsed_urls), ["https://example.com/1", "https://other.com/2"])
+
+    def test_parsing_of_all_pages_shares_a_single_time_limit(self):
+        """Test that the crawling waits for the parsing of all the pages at once, rather than for each page in turn."""
+        def parse_slowly(text):
+            time.sleep(1)
+            return parse_text_from_html(text=text)
+
+        recent_news = GenerateRecentNews(
+            query="test query",
+            query_meaning="test meaning",
+            search_terms=["term"],
+            retrieved_urls=["https://example.com/1", "https://other.com/2", "https://another.com/3"]
+        )
+        with patch('crawling.MAX_TIME_HTML_PARSING', 0.2), \
+                patch('crawling.parsing_worker_pool', WorkerPool(name='test parsing', max_workers=3)), \
+                patch('crawling.parse_text_from_html', side_effect=parse_slowly):
+            timestamp_start = time.monotonic()
+            result = perform_crawling(recent_news=recent_news, sink=MagicMock(spec=ProgressSink))
+
+        self.assertLess(time.monotonic() - timestamp_start, 0.5)
+        self.assertEqual(result.parsed_urls, {})
+
+    def test_page_whose_parsing_times_out_is_treated_as_failed(self):
+        """Test that a page whose parsing does not finish in time gets an empty text, which is cached as a failure."""
+        def parse_slowly(text):
+            time.sleep(0.5)
+            return parse_text_from_html(text=text)
+
+        url = 'https://example.com/article'
+        with patch('crawling.parsing_worker_pool', WorkerPool(name='test parsing', max_workers=1)), \
+                patch('crawling.parse_text_from_html', side_effect=parse_slowly):
+            timestamp_start = time.monotonic()
+            result = _finishProcessingWebpage(url=url, fetched_webpage=_fetchWebpage(url=url), max_parsing_time=0.1)
+
+        self.assertLess(time.monotonic() - timestamp_start, 0.4)
+        self.assertEqual(result, {'status_code': 200, 'content': ''})
+        self.assertEqual(self.cache.get(key=_get_crawl_cache_key(url=url)), '')
+
+    def test_page_fetched_after_the_crawling_time_limit_is_not_parsed(self):
+        """Test that no parsing is started for a page whose fetch finished after the time limit, since nobody waits for it."""
+        def extract_text_slowly(url, validators=None):
+            time.sleep(0.2)
+            return {'status_code': 200, 'content': self.PAGE, 'fetched_by': 'direct'}
+
+        parsing_worker_pool = MagicMock(spec=WorkerPool)
+        with patch('crawling._extract_text_from_url', side_effect=extract_text_slowly), \
+                patch('crawling.parsing_worker_pool', parsing_worker_pool):
+            result = _fetchWebpage(url='https://example.com/article', max_crawling_time=0.1)
+
+        self.assertEqual(result, {'status_code': 408, 'content': ''})
+        parsing_worker_pool.submit.assert_not_called()
+
+    def test_parsing_in_worker_processes_keeps_the_log(self):
+        """Test that starting the parsing processes does not truncate the log written so far by the main process."""
+        message = f'Log line written before parsing {time.time()}'
+        log.info(message)
+        parsing_worker_pool = WorkerPool(name='test parsing', max_workers=1, use_processes=True, start_method=PARSING_START_METHOD)
+        try:
+            with patch('crawling.parsing_worker_pool', parsing_worker_pool):
+                result = _processWebpage(url='https://example.com/article')
+        finally:
+            parsing_worker_pool.shutdown()
+
+        self.assertEqual(result['content'], 'This is the text of the article, long enough to be kept.')
+        with open(LOG_FILENAME, encoding='utf-8') as f:
+            self.assertIn(message, f.read())
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
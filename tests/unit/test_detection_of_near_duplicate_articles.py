@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from detection_of_near_duplicate_articles import SIGNATURE_SIZE, compute_minhash_signature, detect_near_duplicate_articles, estimate_similarity, group_near_duplicates
+from generate_recent_news import GenerateRecentNews
+from progress_sink import ProgressSink
+
+
+WIRE_STORY = (
+    'The central bank raised its benchmark interest rate by a quarter of a percentage point on Wednesday, '
+    'citing persistent inflation in services and a labour market that remains tighter than expected. '
+    'Policymakers signalled that further increases were possible if price pressures did not ease in the coming months, '
+    'while several members of the committee argued for a pause to assess the effect of the previous hikes on lending.'
+)
+OTHER_STORY = (
+    'Shares of the chipmaker fell sharply in early trading after the company cut its revenue forecast for the year, '
+    'blaming weaker demand for personal computers and a slower than expected recovery in its data centre business. '
+    'Analysts said the guidance raised doubts about the timing of the rebound the industry has been promising.'
+)
+
+
+class TestMinHash(unittest.TestCase):
+    def test_identical_texts_have_identical_signatures(self):
+        """Test that the signature is deterministic and ignores case and punctuation."""
+        self.assertEqual(compute_minhash_signature(text=WIRE_STORY), compute_minhash_signature(text=WIRE_STORY.upper().replace(',', '')))
+
+    def test_similarity_of_near_duplicates_and_distinct_texts(self):
+        """Test that a lightly edited copy is estimated as similar and an unrelated text as dissimilar."""
+        signature = compute_minhash_signature(text=WIRE_STORY)
+        copy_signature = compute_minhash_signature(text=WIRE_STORY + ' Reporting by a staff writer.')
+        other_signature = compute_minhash_signature(text=OTHER_STORY)
+        self.assertGreaterEqual(estimate_similarity(signature=signature, other_signature=copy_signature), 0.8)
+        self.assertLess(estimate_similarity(signature=signature, other_signature=other_signature), 0.2)
+
+    def test_signature_of_a_long_text_keeps_the_smallest_hashes(self):
+        """Test that the signature of a text with many shingles has a fixed size, and still detects a copy of the text."""
+        long_story = ' '.join([WIRE_STORY, OTHER_STORY] * 3)
+        signature = compute_minhash_signature(text=long_story)
+        self.assertEqual(len(signature), SIGNATURE_SIZE)
+        self.assertEqual(list(signature), sorted(signature))
+        copy_signature = compute_minhash_signature(text=long_story + ' Reporting by a staff writer.')
+        self.assertGreaterEqual(estimate_similarity(signature=signature, other_signature=copy_signature), 0.8)
+
+    def test_empty_text_is_never_similar(self):
+        """Test that texts without words are not grouped together."""
+        self.assertEqual(compute_minhash_signature(text=''), ())
+        self.assertEqual(estimate_similarity(signature=(), other_signature=()), 0.0)
+
+
+class TestGroupNearDuplicates(unittest.TestCase):
+    def test_copies_are_grouped_under_the_longest_article(self):
+        """Test that the copies of a story are grouped, with the longest one as representative."""
+        articles = {
+            'https://a.com/rates': WIRE_STORY,
+            'https://b.com/chips': OTHER_STORY,
+            'https://c.com/rates': WIRE_STORY + ' Reporting by a staff writer.',
+            'https://d.com/rates': WIRE_STORY,
+        }
+        self.assertEqual(group_near_duplicates(articles=articles), {
+            'https://c.com/rates': ['https://a.com/rates', 'https://d.com/rates'],
+            'https://b.com/chips': [],
+        })
+
+    def test_distinct_articles_are_kept(self):
+        """Test that articles without near-duplicates are their own representative."""
+        articles = {'https://a.com/rates': WIRE_STORY, 'https://b.com/chips': OTHER_STORY}
+        self.assertEqual(group_near_duplicates(articles=articles), {'https://a.com/rates': [], 'https://b.com/chips': []})
+
+
+class TestDetectNearDuplicateArticles(unittest.TestCase):
+    def test_near_duplicates_are_collapsed(self):
+        """Test that only the representatives are kept as parsed URLs, with the other copies as alternate URLs."""
+        recent_news = GenerateRecentNews(
+            query='interest rates',
+            query_meaning='Monetary policy',
+            search_terms=['interest rates'],
+            retrieved_urls=['https://a.com/rates', 'https://b.com/chips', 'https://c.com/rates'],
+            parsed_urls={
+                'https://a.com/rates': WIRE_STORY + ' Reporting by a staff writer.',
+                'https://b.com/chips': OTHER_STORY,
+                'https://c.com/rates': WIRE_STORY,
+            }
+        )
+
+        result = detect_near_duplicate_articles(recent_news=recent_news, sink=MagicMock(spec=ProgressSink))
+
+        self.assertEqual(list(result.parsed_urls), ['https://a.com/rates', 'https://b.com/chips'])
+        self.assertEqual(result.alternate_urls, {'https://a.com/rates': ['https://c.com/rates']})
+        self.assertEqual(result.retrieved_urls, recent_news.retrieved_urls)
+
+
+if __name__ == '__main__':
+    unittest.main()
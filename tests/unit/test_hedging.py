@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from crawling import DEFAULT_HEDGE_DELAY, _fetch_directly, _fetch_with_hedging
+from hedging import HedgingBudget, LatencyTracker
+from http_client import DownloadCancelled
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_default_is_used_until_enough_samples(self):
+        """Test that the default delay is returned while too few latencies have been recorded."""
+        tracker = LatencyTracker(min_samples=5)
+        for latency in [0.1, 0.2]:
+            tracker.record(latency)
+        self.assertEqual(tracker.get_percentile(percentile=0.9, default=1.0), 1.0)
+
+    def test_percentile_of_the_recent_latencies(self):
+        """Test that the percentile is computed over the sliding window of latencies."""
+        tracker = LatencyTracker(window_size=10, min_samples=5)
+        for latency in [10.0] * 5 + [i / 10 for i in range(1, 11)]:
+            tracker.record(latency)
+        self.assertEqual(tracker.get_percentile(percentile=0.9, default=1.0), 1.0)
+        self.assertEqual(tracker.get_percentile(percentile=0.5, default=1.0), 0.6)
+
+
+class TestHedgingBudget(unittest.TestCase):
+    def test_hedges_are_capped_to_a_share_of_the_requests(self):
+        """Test that the number of hedges stays below the minimum plus the allowed share of the requests."""
+        budget = HedgingBudget(max_hedge_ratio=0.1, min_hedges=2)
+        for _ in range(20):
+            budget.record_request()
+        granted = sum(budget.try_acquire() for _ in range(10))
+        self.assertEqual(granted, 4)
+        self.assertEqual(budget.get_statistics()['hedges_denied'], 6)
+
+
+class TestFetchWithHedging(unittest.TestCase):
+    def setUp(self):
+        self.cancelled = threading.Event()
+        self.crawlbase_calls = []
+
+    def _fetch_directly(self, delay):
+        def fetch_directly(url, on_response=None, cancel_event=None, validators=None):
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                if cancel_event.is_set():
+                    self.cancelled.set()
+                    raise DownloadCancelled('cancelled')
+                time.sleep(0.01)
+            on_response(None)
+            return {'status_code': 200, 'content': 'direct', 'fetched_by': 'direct'}
+        return fetch_directly
+
+    def _crawl_url_using_crawlbase(self, url, cancel_event=None):
+        self.crawlbase_calls.append(url)
+        time.sleep(0.05)
+        return {'status_code': 200, 'content': 'crawlbase', 'fetched_by': 'Crawlbase'}
+
+    def _fetch(self, direct_delay, hedge_delay=0.1, budget=None):
+        with patch('crawling._fetch_directly', side_effect=self._fetch_directly(direct_delay)), \
+                patch('crawling._crawl_url_using_crawlbase', side_effect=self._crawl_url_using_crawlbase), \
+                patch('crawling.direct_fetch_latency.get_percentile', return_value=hedge_delay), \
+                patch('crawling.hedging_budget', budget or HedgingBudget()):
+            return _fetch_with_hedging(url='https://example.com/article')
+
+    def test_fast_direct_fetch_is_not_hedged(self):
+        """Test that no Crawlbase request is sent when the direct fetch answers within the hedge delay."""
+        result = self._fetch(direct_delay=0.01)
+        self.assertEqual(result['content'], 'direct')
+        self.assertEqual(self.crawlbase_calls, [])
+
+    def test_slow_direct_fetch_loses_the_race_and_is_cancelled(self):
+        """Test that the Crawlbase response wins over a slow direct fetch, which is then cancelled."""
+        timestamp_start = time.monotonic()
+        result = self._fetch(direct_delay=2)
+        self.assertEqual(result['content'], 'crawlbase')
+        self.assertLess(time.monotonic() - timestamp_start, 1)
+        self.assertTrue(self.cancelled.wait(timeout=1))
+
+    def test_no_hedge_when_the_budget_is_exhausted(self):
+        """Test that the direct fetch is awaited without hedging once the hedging budget is spent."""
+        result = self._fetch(direct_delay=0.3, budget=HedgingBudget(max_hedge_ratio=0, min_hedges=0))
+        self.assertEqual(result['content'], 'direct')
+        self.assertEqual(self.crawlbase_calls, [])
+
+
+class TestDirectFetchLatency(unittest.TestCase):
+    def _fetch_directly(self, download_text):
+        tracker = LatencyTracker(min_samples=1)
+        with patch('crawling.http_client.download_text', side_effect=download_text), patch('crawling.direct_fetch_latency', tracker):
+            try:
+                _fetch_directly(url='https://example.com/article')
+            except requests.exceptions.RequestException:
+                pass
+        return tracker.get_percentile(percentile=0.5, default=None)
+
+    def test_latency_of_the_headers_is_recorded(self):
+        """Test that the time until the headers arrive is recorded for a successful fetch."""
+        def download_text(on_response, **kwargs):
+            on_response(requests.Response())
+            time.sleep(0.2)
+            return 200, 'text'
+
+        self.assertLess(self._fetch_directly(download_text=download_text), 0.1)
+
+    def test_failed_fetch_is_recorded_as_the_default_hedge_delay(self):
+        """Test that a fetch which times out before its headers arrive is recorded, with the default hedge delay as latency."""
+        def download_text(**kwargs):
+            raise requests.exceptions.Timeout('timed out')
+
+        self.assertEqual(self._fetch_directly(download_text=download_text), DEFAULT_HEDGE_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from http_client import DownloadDeadlineExceeded, HttpClient, UnsupportedContentTypeError
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        if self.path == '/slow':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(10 * 1024))
+            self.end_headers()
+            for _ in range(10):
+                self.wfile.write(b'x' * 1024)
+                self.wfile.flush()
+                time.sleep(0.1)
+            return
+
+        body = b'x' * 1024 * 1024 if self.path == '/large' else b'<p>content</p>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf' if self.path == '/document.pdf' else 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server.connections = 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        self.client = HttpClient(max_connections_per_host=2, connect_timeout=1, read_timeout=1)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_to_the_same_host_are_reused(self):
+        """Test that sequential requests to the same host go through a single kept-alive connection."""
+        for _ in range(5):
+            response = self.client.get(url=self.url)
+            self.assertEqual(response.text, '<p>content</p>')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_session_is_shared_across_threads(self):
+        """Test that all threads use the same session."""
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(self.client.get_session())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(session is sessions[0] for session in sessions))
+
+    def test_pool_size_per_host_is_configured(self):
+        """Test that the adapters of the session bound the number of connections kept per host."""
+        adapter = self.client.get_session().get_adapter(self.url)
+        self.assertEqual(adapter._pool_maxsize, 2)
+        self.assertEqual(self.client.timeout, (1, 1))
+
+    def test_download_stops_at_the_byte_limit(self):
+        """Test that only the first max_bytes bytes of a large body are returned."""
+        status_code, text = self.client.download_text(url=self.url + 'large', max_bytes=100 * 1024)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(text), 100 * 1024)
+
+    def test_other_content_types_are_rejected(self):
+        """Test that a response whose content type is not accepted raises an error."""
+        with self.assertRaises(UnsupportedContentTypeError):
+            self.client.download_text(url=self.url + 'document.pdf', max_bytes=1024, content_types=('text/html',))
+
+        status_code, text = self.client.download_text(url=self.url, max_bytes=1024, content_types=('text/html',))
+        self.assertEqual(text, '<p>content</p>')
+
+    def test_time_limit_applies_to_the_whole_download(self):
+        """Test that a body trickling in faster than the read timeout still stops at the total time limit."""
+        timestamp_start = time.monotonic()
+        with self.assertRaises(DownloadDeadlineExceeded):
+            self.client.download_text(url=self.url + 'slow', max_bytes=1024 * 1024, max_time=0.35)
+        self.assertLess(time.monotonic() - timestamp_start, 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
+import re
+import time
 import unittest
+import zlib
 from unittest.mock import patch, MagicMock
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from identification_of_relevant_articles import identify_relevant_articles
+from identification_of_relevant_articles import identify_relevant_articles, _split_into_shards
 from generate_recent_news import GenerateRecentNews, Article, ImpactType
 from progress_sink import ProgressSink
 
@@ -161,5 +164,143 @@ class TestIdentifyRelevantArticles(unittest.TestCase):
         self.assertEqual(str(context.exception), "No URLs have been parsed")
 
 
+class TestShardedIdentification(unittest.TestCase):
+    """Test cases for the sharded mode of identify_relevant_articles."""
+
+    def setUp(self):
+        self.parsed_urls = {f"https://example{i}.com": f"Bitcoin news number {i}." for i in range(1, 13)}
+        self.recent_news = GenerateRecentNews(query="Bitcoin", query_meaning="Cryptocurrency Bitcoin", parsed_urls=self.parsed_urls)
+
+    def _ask_llm(self, prompt, cache_prefix=''):
+        """Answers with the first article of the prompt, referred to by its number only."""
+        return {
+            'status_code': 200,
+            'response_content': {'items': [
+                {'article_number': '1', 'article_url': '', 'impact_on_term_of_interest': 'Up', 'impact_type': 'positive'}
+            ]}
+        }
+
+    def test_new_article_only_changes_its_own_shard(self):
+        """Test that adding an article leaves the other shards, and therefore their cached answers, unchanged."""
+        urls = list(self.parsed_urls)
+        shards = _split_into_shards(urls=urls[:-1], number_of_shards=3)
+        new_shards = _split_into_shards(urls=urls, number_of_shards=3)
+
+        self.assertEqual(sorted(url for shard in new_shards.values() for url in shard), sorted(urls))
+        self.assertEqual([shard_number for shard_number, shard in new_shards.items() if shard != shards.get(shard_number)], [zlib.crc32(urls[-1].encode()) % 3])
+
+    def test_shard_numbers_do_not_depend_on_the_empty_shards(self):
+        """Test that a shard keeps its number, and therefore its cache prefix, when another shard becomes empty."""
+        urls = list(self.parsed_urls)
+        shards = _split_into_shards(urls=urls, number_of_shards=3)
+        first_shard_number = min(shards)
+        remaining_shards = _split_into_shards(urls=[url for url in urls if url not in shards[first_shard_number]], number_of_shards=3)
+
+        self.assertEqual(remaining_shards, {shard_number: shard for shard_number, shard in shards.items() if shard_number != first_shard_number})
+
+    def test_shard_results_are_merged_and_renumbered(self):
+        """Test that each shard is sent in its own prompt and that the articles are renumbered among all the articles."""
+        with patch('identification_of_relevant_articles.llm_client.ask_LLM', side_effect=self._ask_llm) as mock_ask_llm:
+            result = identify_relevant_articles(
+                recent_news=self.recent_news,
+                sink=MagicMock(spec=ProgressSink),
+                number_of_completions=2,
+                number_of_shards=3
+            )
+
+        shards = _split_into_shards(urls=list(self.parsed_urls), number_of_shards=3)
+        self.assertEqual(mock_ask_llm.call_count, 2 * len(shards))
+        for call in mock_ask_llm.call_args_list:
+            self.assertLessEqual(len(re.findall(r'URL: ', call.kwargs['prompt'])), max(len(shard) for shard in shards.values()))
+
+        self.assertEqual(len(result.relevant_articles), 2)
+        article_numbers = {url: str(idx) for idx, url in enumerate(sorted(self.parsed_urls), 1)}
+        for list_articles in result.relevant_articles:
+            self.assertEqual(sorted(article.article_url for article in list_articles), sorted(shard[0] for shard in shards.values()))
+            for article in list_articles:
+                self.assertEqual(article.article_number, article_numbers[article.article_url])
+
+    def test_votes_are_counted_on_the_urls_of_the_articles_referred_to_by_number(self):
+        """Test that ties between shards are broken by the votes for the articles identified by their number only."""
+        shards = _split_into_shards(urls=list(self.parsed_urls), number_of_shards=2)
+        self.assertEqual(len(shards), 2)
+
+        def ask_llm(prompt, cache_prefix=''):
+            completion_number, shard_number = int(cache_prefix[1].split()[-1]), int(cache_prefix[2].split()[-1]) - 1
+            # The second completion only identifies the first article of the last shard
+            if completion_number == 2 and shard_number == min(shards):
+                return {'status_code': 200, 'response_content': {'items': []}}
+            return self._ask_llm(prompt=prompt, cache_prefix=cache_prefix)
+
+        with patch('identification_of_relevant_articles.llm_client.ask_LLM', side_effect=ask_llm):
+            result = identify_relevant_articles(
+                recent_news=self.recent_news,
+                sink=MagicMock(spec=ProgressSink),
+                number_of_completions=2,
+                number_of_shards=2
+            )
+
+        self.assertEqual(
+            [article.article_url for article in result.relevant_articles[0]],
+            [shards[max(shards)][0], shards[min(shards)][0]]
+        )
+
+
+class TestConsensusIdentification(unittest.TestCase):
+    """Test cases for the consensus mode of identify_relevant_articles."""
+
+    def setUp(self):
+        self.parsed_urls = {f"https://example{i}.com": f"Bitcoin news number {i}." for i in range(1, 6)}
+        self.recent_news = GenerateRecentNews(query="Bitcoin", query_meaning="Cryptocurrency Bitcoin", parsed_urls=self.parsed_urls)
+
+    def _response(self, article_numbers):
+        return {
+            'status_code': 200,
+            'response_content': {'items': [
+                {'article_number': str(i), 'article_url': f"https://example{i}.com", 'impact_on_term_of_interest': 'Up', 'impact_type': 'positive'}
+                for i in article_numbers
+            ]}
+        }
+
+    def _identify(self, responses):
+        """Runs the identification in consensus mode, answering the completions in turn with the given article numbers."""
+        def ask_llm(prompt, cache_prefix=''):
+            completion_number = int(cache_prefix[1].split()[-1])
+            delay, article_numbers = responses[completion_number - 1]
+            time.sleep(delay)
+            return self._response(article_numbers)
+
+        with patch('identification_of_relevant_articles.llm_client.ask_LLM', side_effect=ask_llm) as mock_ask_llm:
+            result = identify_relevant_articles(recent_news=self.recent_news, sink=MagicMock(spec=ProgressSink), consensus=True)
+        return result, mock_ask_llm.call_count
+
+    def test_agreeing_completions_stop_early(self):
+        """Test that no third completion is generated when the first two agree on their top URLs."""
+        result, call_count = self._identify(responses=[(0, [1, 2, 3]), (0, [2, 1, 4]), (0, [5])])
+
+        self.assertEqual(call_count, 2)
+        self.assertEqual(len(result.relevant_articles), 1)
+        self.assertEqual([article.article_url for article in result.relevant_articles[0]][:2], ["https://example1.com", "https://example2.com"])
+
+    def test_disagreeing_completions_are_merged_by_vote(self):
+        """Test that a further completion is generated when the completions disagree, and that the URLs are ranked by votes."""
+        result, call_count = self._identify(responses=[(0, [1, 2, 3]), (0, [4, 5, 3]), (0, [5, 4, 1])])
+
+        self.assertEqual(call_count, 3)
+        self.assertEqual(
+            [article.article_url for article in result.relevant_articles[0]],
+            [f"https://example{i}.com" for i in [1, 4, 5, 3, 2]]
+        )
+
+    def test_deadline_stops_waiting_for_slow_completions(self):
+        """Test that once the deadline has passed, the completions which already finished are used."""
+        with patch('identification_of_relevant_articles.MAX_TIME_CONSENSUS', 0.2):
+            timestamp_start = time.monotonic()
+            result, _ = self._identify(responses=[(0, [1, 2, 3]), (0.4, [1, 2, 3]), (0.4, [1, 2, 3])])
+
+        self.assertLess(time.monotonic() - timestamp_start, 0.4)
+        self.assertEqual([article.article_url for article in result.relevant_articles[0]][:1], ["https://example1.com"])
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,108 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import diskcache as dc
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from benchmark_clean_text import clean_text_with_sequential_replacements
+from cache import TieredCache
+from llm_client import QUOTE_REPLACEMENTS, build_cache_key, build_legacy_cache_key, clean_text, llm_client
+
+
+class TestCacheKeys(unittest.TestCase):
+    def test_cache_key_has_a_fixed_size(self):
+        """Test that the cache key does not grow with the prompt."""
+        short_key = build_cache_key(prompt='short prompt', model_name='model', cache_prefix=('query', 'relevant articles 1'))
+        long_key = build_cache_key(prompt='long prompt ' * 100000, model_name='model', cache_prefix=('query', 'relevant articles 1'))
+        self.assertEqual(len(short_key), len(long_key))
+        self.assertIn("('query', 'relevant articles 1')", long_key)
+
+    def test_cache_key_depends_on_the_canonical_prompt_model_and_prefix(self):
+        """Test that the cache key identifies the canonical prompt, the model name and the cache prefix."""
+        key = build_cache_key(prompt='prompt\r\ntext', model_name='model', cache_prefix='prefix')
+        self.assertEqual(key, build_cache_key(prompt='  prompt\ntext\n', model_name='model', cache_prefix='prefix'))
+        self.assertNotEqual(key, build_cache_key(prompt='prompt\ntext', model_name='other model', cache_prefix='prefix'))
+        self.assertNotEqual(key, build_cache_key(prompt='prompt\ntext', model_name='model', cache_prefix='other prefix'))
+        self.assertNotEqual(key, build_cache_key(prompt='other prompt', model_name='model', cache_prefix='prefix'))
+
+
+class TestLegacyCacheKeyMigration(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = TieredCache(disk_cache=dc.Cache(self.cache_dir.name))
+        self.patcher = patch('llm_client.cache', self.cache)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def test_migrated_entry_is_served_by_the_lookup(self):
+        """Test that an answer stored under a legacy key is served from its hashed key once migrated."""
+        cache_prefix = ('query', 'search terms')
+        legacy_key = build_legacy_cache_key(prompt='prompt', cache_prefix=cache_prefix)
+        self.cache.set(legacy_key, {'items': []}, expire=3600)
+        llm_client.migrate_legacy_cache_keys()
+
+        with patch.object(llm_client.client.models, 'generate_content') as mock_generate_content:
+            response = llm_client.ask_LLM(prompt='prompt', cache_prefix=cache_prefix)
+
+        mock_generate_content.assert_not_called()
+        self.assertEqual(response, {'status_code': 200, 'response_content': {'items': []}})
+        self.assertNotIn(legacy_key, self.cache)
+
+    def test_bulk_migration_of_legacy_entries(self):
+        """Test that all legacy entries are moved to the keys used for the lookups."""
+        cache_prefixes = [('query', 'relevant articles 1'), '']
+        for cache_prefix in cache_prefixes:
+            self.cache.set(build_legacy_cache_key(prompt='prompt', cache_prefix=cache_prefix), {'items': []}, expire=3600)
+        self.cache.set('Search results for: query', ['url'], expire=3600)
+
+        self.assertEqual(llm_client.migrate_legacy_cache_keys(), 2)
+
+        for cache_prefix in cache_prefixes:
+            self.assertEqual(self.cache.get(build_cache_key(prompt='prompt', model_name=llm_client.model_name, cache_prefix=cache_prefix)), {'items': []})
+        self.assertEqual(self.cache.get('Search results for: query'), ['url'])
+
+
+class TestCleanText(unittest.TestCase):
+    GOLDEN_CORPUS = [
+        ('```json\n{"items": [{"news": "The Fed\u2019s decision"}]}\n```', '{"items": [{"news": "The Fed\\\'s decision"}]}'),
+        ('```\n{"a": "It\u2019s a \u201cbig\u201d day"}```', '{"a": "It\\\'s a "big" day"}'),
+        ("  {\"a\": \"We're sure they'll say you've won, I'm told, he'd agree, don't\"}  ",
+         "{\"a\": \"We\\'re sure they\\'ll say you\\'ve won, I\\'m told, he\\'d agree, don\\'t\"}"),
+        ('{"a": "\u2032 \u2033 \u2035 \u2036 \u2039 \u203a \u275b \u275c \u275d \u275e \u201a \u201b \u201e \u201f"}',
+         '{"a": "\' " \' " \' \' " " " " \' \' " ""}'),
+        ("{\"a\": \"`code` and \u2018quoted\u2019 'rest 'red 'v 'l 'll\"}", "{\"a\": \"code and 'quoted' \\'rest \\'red 'v 'l \\'ll\"}"),
+        ('` {"a": 1} `', ' {"a": 1} '),
+        ("{\"a\": \"already escaped \\'s here\"}", "{\"a\": \"already escaped \\\\'s here\"}"),
+        ('', ''),
+    ]
+
+    def test_golden_corpus(self):
+        """Test that the responses of the golden corpus are cleaned as they were by the former implementation."""
+        for text, expected_text in self.GOLDEN_CORPUS:
+            with self.subTest(text=text):
+                self.assertEqual(clean_text(text), expected_text)
+                self.assertEqual(clean_text_with_sequential_replacements(text), expected_text)
+
+    def test_same_output_as_the_sequential_replacements(self):
+        """Test that random texts mixing quotes, apostrophes, backticks and code fences are cleaned as by the former implementation."""
+        alphabet = list(QUOTE_REPLACEMENTS) + list("'`\\ stmrevld\"{}:,\n") + ['```', '```json']
+        generator = random.Random(0)
+        for _ in range(2000):
+            text = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 30)))
+            self.assertEqual(clean_text(text), clean_text_with_sequential_replacements(text), repr(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
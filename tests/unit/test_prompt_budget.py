@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from generate_recent_news import GenerateRecentNews
+from identification_of_relevant_articles import _build_identification_of_relevant_articles_prompt
+from progress_sink import ProgressSink
+from prompt_budget import allocate_token_budget, count_tokens, fit_texts_to_token_budget, truncate_to_token_budget
+
+
+class TestTruncateToTokenBudget(unittest.TestCase):
+    def test_short_text_is_unchanged(self):
+        """Test that a text within the budget is returned as is."""
+        self.assertEqual(truncate_to_token_budget(text='Short text.', max_tokens=10), 'Short text.')
+
+    def test_lead_paragraphs_are_kept_and_cut_at_a_word_boundary(self):
+        """Test that the beginning of a text is kept, without a partial word at the end."""
+        text = 'Lead paragraph of the article.\nSecond paragraph with details.'
+        truncated_text = truncate_to_token_budget(text=text, max_tokens=10)
+        self.assertEqual(truncated_text, 'Lead paragraph of the article.\nSecond')
+        self.assertLessEqual(count_tokens(text=truncated_text), 10)
+
+    def test_zero_budget(self):
+        """Test that no text is kept without any token."""
+        self.assertEqual(truncate_to_token_budget(text='Some text.', max_tokens=0), '')
+
+
+class TestAllocateTokenBudget(unittest.TestCase):
+    def test_budget_is_shared_fairly(self):
+        """Test that short texts are kept whole and that the longer ones share the rest of the budget equally."""
+        self.assertEqual(allocate_token_budget(token_counts=[1000, 10, 500, 20], budget=330), [150, 10, 150, 20])
+
+    def test_everything_fits(self):
+        """Test that all the texts are kept whole when they fit into the budget."""
+        self.assertEqual(allocate_token_budget(token_counts=[10, 20], budget=100), [10, 20])
+
+    def test_negative_budget(self):
+        """Test that no tokens are allocated when the budget is exhausted by the rest of the prompt."""
+        self.assertEqual(allocate_token_budget(token_counts=[10, 20], budget=-5), [0, 0])
+
+
+class TestFitTextsToTokenBudget(unittest.TestCase):
+    def test_texts_fit_into_the_budget(self):
+        """Test that the total size of the truncated texts fits into the budget and that the dropped tokens are reported."""
+        texts = {'a': 'word ' * 400, 'b': 'Short text.', 'c': 'other ' * 300}
+        truncated_texts, statistics = fit_texts_to_token_budget(texts=texts, budget=200)
+
+        self.assertEqual(truncated_texts['b'], 'Short text.')
+        self.assertLessEqual(sum(count_tokens(text=text) for text in truncated_texts.values()), 200)
+        self.assertEqual(statistics['truncated_texts'], 2)
+        self.assertEqual(statistics['dropped_tokens'], statistics['original_tokens'] - statistics['kept_tokens'])
+
+
+class TestIdentificationPromptBudget(unittest.TestCase):
+    def test_prompt_fits_into_the_budget(self):
+        """Test that the prompt stays within its token budget and that truncation is reported to the sink."""
+        recent_news = GenerateRecentNews(
+            query="Bitcoin",
+            query_meaning="Cryptocurrency Bitcoin",
+            parsed_urls={f"https://example{i}.com": "Bitcoin price surged today. " * 2000 for i in range(5)}
+        )
+        sink = MagicMock(spec=ProgressSink)
+
+        prompt = _build_identification_of_relevant_articles_prompt(recent_news=recent_news, sink=sink, max_tokens=5000)
+
+        self.assertLessEqual(count_tokens(text=prompt), 5000)
+        for i in range(5):
+            self.assertIn(f"URL: https://example{i}.com \n TEXT: Bitcoin price surged today.", prompt)
+        sink.send.assert_called_once()
+
+    def test_small_prompt_is_unchanged(self):
+        """Test that the articles are not truncated when the prompt fits into the budget."""
+        recent_news = GenerateRecentNews(
+            query="Bitcoin",
+            query_meaning="Cryptocurrency Bitcoin",
+            parsed_urls={"https://example1.com": "Bitcoin price surged to $50,000 today."}
+        )
+        sink = MagicMock(spec=ProgressSink)
+
+        prompt = _build_identification_of_relevant_articles_prompt(recent_news=recent_news, sink=sink)
+
+        self.assertIn("TEXT: Bitcoin price surged to $50,000 today. \n", prompt)
+        sink.send.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from text_extraction import EXTRACTION_ENGINES, get_extraction_engine
+
+
+SAMPLE_PAGE = """<?xml version="1.0" encoding="iso-8859-1"?>
+<html>
+<head><title>Title</title><script>var p = "<p>not a paragraph</p>";</script></head>
+<body>
+    <nav><a href="/">Home</a></nav>
+    <article>
+        <p>Stocks   fell on <b>Tuesday</b>
+        after the announcement.</p>
+        <div><p>Analysts expect <a href="/rates">rate cuts</a> &amp; lower yields.</p></div>
+        <p>Café prices rose <!-- comment --> by 5%.</p>
+        <p>   </p>
+    </article>
+</body>
+</html>"""
+
+
+class TestTextExtractionEngines(unittest.TestCase):
+    def test_engines_extract_the_same_paragraphs(self):
+        """Test that all engines honour the same output contract on a sample page."""
+        expected_paragraphs = [
+            'Stocks fell on Tuesday after the announcement.',
+            'Analysts expect rate cuts & lower yields.',
+            'Café prices rose by 5%.',
+            ''
+        ]
+        for name in EXTRACTION_ENGINES:
+            with self.subTest(engine=name):
+                self.assertEqual(get_extraction_engine(name).extract_paragraphs(html=SAMPLE_PAGE), expected_paragraphs)
+
+    def test_page_without_elements(self):
+        """Test that a page without any element yields no paragraphs."""
+        for name in EXTRACTION_ENGINES:
+            with self.subTest(engine=name):
+                self.assertEqual(get_extraction_engine(name).extract_paragraphs(html='<!-- empty -->'), [])
+
+    def test_unknown_engine(self):
+        """Test that an error is raised for an unknown engine name."""
+        with self.assertRaises(ValueError):
+            get_extraction_engine('unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import diskcache as dc
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from cache import CompressedValue, TieredCache, get_cache_namespace
+
+
+class TestTieredCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.disk_cache = dc.Cache(self.cache_dir.name)
+        self.cache = TieredCache(disk_cache=self.disk_cache, max_memory_size=1000)
+
+    def tearDown(self):
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def test_read_after_write_is_served_from_memory(self):
+        """Test that an entry which has just been set is read from the memory tier."""
+        self.cache.set('key', 'value', expire=60)
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_statistics()['memory']['hits'], 1)
+        self.assertEqual(self.cache.get_statistics()['disk']['hits'], 0)
+
+    def test_disk_hits_are_promoted_to_memory(self):
+        """Test that an entry only found on disk is served from memory on the next lookup."""
+        self.disk_cache.set('key', ['url1', 'url2'], expire=60)
+
+        self.assertEqual(self.cache.get('key'), ['url1', 'url2'])
+        self.assertEqual(self.cache.get('key'), ['url1', 'url2'])
+        self.assertEqual(self.cache.get('missing key', default='default'), 'default')
+
+        statistics = self.cache.get_statistics()
+        self.assertEqual((statistics['memory']['hits'], statistics['memory']['misses']), (1, 2))
+        self.assertEqual((statistics['disk']['hits'], statistics['disk']['misses']), (1, 1))
+
+    def test_callers_get_their_own_copy_of_values(self):
+        """Test that mutating a value returned by the cache does not change the cached entry."""
+        self.cache.set('key', ['url1'], expire=60)
+        self.cache.get('key').append('url2')
+        self.assertEqual(self.cache.get('key'), ['url1'])
+
+    def test_expired_entries_are_not_served(self):
+        """Test that the memory tier honors the expiration time of the entries."""
+        self.cache.set('key', 'value', expire=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_least_recently_used_entries_are_evicted_beyond_the_size_bound(self):
+        """Test that the memory tier stays within its size bound, while the disk tier keeps all the entries."""
+        self.cache.set('key1', 'a' * 400)
+        self.cache.set('key2', 'b' * 400)
+        self.cache.get('key1')
+        self.cache.set('key3', 'c' * 400)
+
+        statistics = self.cache.get_statistics()
+        self.assertLessEqual(statistics['memory']['size'], 1000)
+        self.assertEqual(statistics['memory']['entries'], 2)
+
+        self.assertEqual(self.cache.get('key2'), 'b' * 400)
+        self.assertEqual(self.cache.get_statistics()['disk']['hits'], 1)
+
+    def test_large_values_of_compressed_namespaces_are_compressed_on_disk(self):
+        """Test that large crawled contents are stored compressed on disk and read back transparently."""
+        key = 'Crawled content of the website: https://example.com'
+        content = 'Stocks rallied on Tuesday. ' * 200
+        self.cache.set(key, content)
+
+        self.assertIsInstance(self.disk_cache.get(key), CompressedValue)
+        self.assertEqual(TieredCache(disk_cache=self.disk_cache).get(key), content)
+
+        compression_statistics = self.cache.get_statistics()['compression']['crawled content']
+        self.assertEqual(compression_statistics['compressed_entries'], 1)
+        self.assertGreater(compression_statistics['bytes_saved'], 0)
+
+    def test_small_values_and_other_namespaces_are_not_compressed(self):
+        """Test that values below the threshold or outside of the compressed namespaces are stored as they are."""
+        self.cache.set('Crawled content of the website: https://example.com', 'short text')
+        self.cache.set('Search results for: term', ['https://example.com/' + str(i) for i in range(200)])
+
+        self.assertEqual(self.disk_cache.get('Crawled content of the website: https://example.com'), 'short text')
+        self.assertIsInstance(self.disk_cache.get('Search results for: term'), list)
+
+    def test_single_flight_coalesces_concurrent_computations(self):
+        """Test that concurrent callers of the same key make a single outbound call and share its result."""
+        outbound_calls = []
+        results = []
+
+        def get_or_compute():
+            with self.cache.single_flight('key'):
+                value = self.cache.get('key')
+                if value is None:
+                    outbound_calls.append(1)
+                    time.sleep(0.1)
+                    value = 'computed value'
+                    self.cache.set('key', value)
+            results.append(value)
+
+        threads = [threading.Thread(target=get_or_compute) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(outbound_calls), 1)
+        self.assertEqual(results, ['computed value'] * 5)
+        self.assertEqual(self.cache.get_statistics()['single_flight']['waits'], 4)
+
+    def test_single_flight_waits_for_the_lock_of_another_process(self):
+        """Test that a caller waits while another process holds the lock of the key, until the lease expires."""
+        self.disk_cache.add('Single flight lock for: key', 12345, expire=0.3)
+
+        timestamp_start = time.monotonic()
+        with self.cache.single_flight('key', lease=5):
+            waited_for = time.monotonic() - timestamp_start
+
+        self.assertGreaterEqual(waited_for, 0.25)
+        self.assertNotIn('Single flight lock for: key', self.disk_cache)
+
+    def test_single_flight_computes_the_value_when_the_lock_is_held_beyond_the_lease(self):
+        """Test that a thread does not wait forever for a lock which another thread of the process holds beyond the lease."""
+        holder_entered = threading.Event()
+        holder_release = threading.Event()
+
+        def hold_the_lock():
+            with self.cache.single_flight('key', lease=5):
+                holder_entered.set()
+                holder_release.wait(timeout=5)
+
+        holder = threading.Thread(target=hold_the_lock)
+        holder.start()
+        holder_entered.wait(timeout=5)
+
+        timestamp_start = time.monotonic()
+        with self.cache.single_flight('key', lease=0.2):
+            waited_for = time.monotonic() - timestamp_start
+        holder_release.set()
+        holder.join()
+
+        self.assertLess(waited_for, 1)
+        self.assertEqual(self.cache.get_statistics()['single_flight']['timeouts'], 1)
+        self.assertEqual(self.cache._key_locks, {})
+
+    def test_delete_removes_the_entry_from_both_tiers(self):
+        """Test that a deleted entry is neither served from memory nor from disk."""
+        self.cache.set('key', 'value')
+        self.cache.delete('key')
+        self.assertNotIn('key', self.cache)
+        self.assertNotIn('key', self.disk_cache)
+
+    def test_membership_tests_are_not_counted(self):
+        """Test that checking whether a key is cached does not change the hit and miss statistics."""
+        self.cache.set('key', 'value', expire=60)
+        self.disk_cache.set('disk key', 'value', expire=60)
+
+        self.assertIn('key', self.cache)
+        self.assertIn('disk key', self.cache)
+        self.assertNotIn('missing key', self.cache)
+
+        statistics = self.cache.get_statistics()
+        self.assertEqual(statistics['memory']['hits'] + statistics['memory']['misses'], 0)
+        self.assertEqual(statistics['disk']['hits'] + statistics['disk']['misses'], 0)
+
+    def test_circuit_breaker_entries_are_shared_across_processes(self):
+        """Test that the writes of another process to a namespace which is not kept in memory are seen at once."""
+        other_process_cache = TieredCache(disk_cache=dc.Cache(self.cache_dir.name))
+        key = 'Circuit breaker crawling for: example.com'
+
+        self.cache.set(key, {'failures': 1})
+        self.assertEqual(self.cache.get(key), {'failures': 1})
+        other_process_cache.set(key, {'failures': 2})
+
+        self.assertEqual(self.cache.get(key), {'failures': 2})
+        self.assertEqual(self.cache.get_statistics()['memory']['entries'], 0)
+        other_process_cache.close()
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.disk_cache = dc.Cache(self.cache_dir.name)
+        self.cache = TieredCache(disk_cache=self.disk_cache, max_memory_size=1000)
+        self.key = 'Search results for: query'
+
+    def tearDown(self):
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def test_namespace_ttl_is_applied_by_default(self):
+        """Test that entries without an explicit expiry get the TTL of their namespace, plus its stale TTL on disk."""
+        namespace = get_cache_namespace(self.key)
+        timestamp_before = time.time()
+        self.cache.set(self.key, ['url'])
+
+        _, expire_time, fresh_until = self.disk_cache.get(self.key, expire_time=True, tag=True)
+        self.assertAlmostEqual(fresh_until - timestamp_before, namespace.ttl, delta=1)
+        self.assertAlmostEqual(expire_time - timestamp_before, namespace.ttl + namespace.stale_ttl, delta=1)
+
+    def test_stale_entries_are_not_served_by_get(self):
+        """Test that get treats an entry past its freshness as missing, although it is still stored."""
+        self.cache.set(self.key, ['url'], expire=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get(self.key))
+        self.assertIn(self.key, self.disk_cache)
+
+    def test_stale_entry_is_served_and_revalidated_once(self):
+        """Test that a stale entry is returned at once while a single background revalidation stores a fresh value."""
+        self.cache.set(self.key, ['stale url'], expire=0.05)
+        time.sleep(0.1)
+        revalidation_started = threading.Event()
+        revalidation_may_finish = threading.Event()
+        revalidations = []
+
+        def revalidate():
+            revalidations.append(1)
+            revalidation_started.set()
+            revalidation_may_finish.wait(timeout=5)
+            self.cache.set(self.key, ['fresh url'])
+
+        first_value = self.cache.get_stale_while_revalidate(self.key, revalidate=revalidate)
+        revalidation_started.wait(timeout=5)
+        second_value = self.cache.get_stale_while_revalidate(self.key, revalidate=revalidate)
+        revalidation_may_finish.set()
+        self.cache.close()
+
+        self.assertEqual(first_value, ['stale url'])
+        self.assertEqual(second_value, ['stale url'])
+        self.assertEqual(len(revalidations), 1)
+        self.assertEqual(self.cache.get(self.key), ['fresh url'])
+        self.assertEqual(self.cache.get_statistics()['stale_while_revalidate']['stale_hits'], 2)
+
+    def test_entry_set_without_stale_ttl_is_not_kept_stale(self):
+        """Test that an entry set with a stale TTL of 0, as failure markers are, is removed once it is no longer fresh."""
+        self.cache.set(self.key, [], expire=0.05, stale_ttl=0)
+        time.sleep(0.1)
+        value = self.cache.get_stale_while_revalidate(self.key, revalidate=lambda: None, default='default')
+        self.assertEqual(value, 'default')
+        self.assertNotIn(self.key, self.disk_cache)
+
+    def test_fresh_entry_is_not_revalidated(self):
+        """Test that no revalidation is scheduled for a fresh entry."""
+        self.cache.set(self.key, ['url'])
+        value = self.cache.get_stale_while_revalidate(self.key, revalidate=lambda: self.fail('revalidated a fresh entry'))
+        self.assertEqual(value, ['url'])
+
+    def test_missing_entry_returns_the_default(self):
+        """Test that the default value is returned when there is no entry at all."""
+        self.assertEqual(self.cache.get_stale_while_revalidate(self.key, revalidate=lambda: None, default='default'), 'default')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from url_canonicalization import canonicalize_url
+from websearch import _aggregate_search_results
+
+
+class TestCanonicalizeUrl(unittest.TestCase):
+    def test_tracking_parameters_and_fragment_are_removed(self):
+        """Test that tracking parameters and the fragment are dropped while the other parameters are kept sorted."""
+        self.assertEqual(
+            canonicalize_url(url='https://www.example.com/news/story?utm_source=rss&page=2&fbclid=abc&id=7#comments'),
+            'https://www.example.com/news/story?id=7&page=2'
+        )
+
+    def test_scheme_host_and_port_are_normalized(self):
+        """Test that http becomes https, the host is lowercased and the default port and trailing slash are dropped."""
+        self.assertEqual(canonicalize_url(url=' http://WWW.Example.COM:80/News/Story/ '), 'https://www.example.com/News/Story')
+        self.assertEqual(canonicalize_url(url='https://example.com'), 'https://example.com/')
+        self.assertEqual(canonicalize_url(url='https://example.com:8443/a'), 'https://example.com:8443/a')
+
+    def test_amp_variants_map_to_the_article(self):
+        """Test that the AMP variants of an article have the canonical URL of the article."""
+        expected_url = 'https://www.example.com/news/story'
+        for url in [
+            'https://www.example.com/news/story/amp',
+            'https://www.example.com/amp/news/story',
+            'https://www.example.com/news/story.amp',
+            'https://www.example.com/news/story?amp=1',
+            'https://www.example.com/news/story?outputType=amp',
+            'https://www-example-com.cdn.ampproject.org/c/s/www.example.com/news/story/amp/'
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(canonicalize_url(url=url), expected_url)
+
+    def test_redirect_wrappers_are_resolved(self):
+        """Test that the target URL of known redirect wrappers is extracted and canonicalized."""
+        self.assertEqual(
+            canonicalize_url(url='https://duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.reuters.com%2Fmarkets%2F%3Futm_medium%3Drss&rut=abc'),
+            'https://www.reuters.com/markets'
+        )
+        self.assertEqual(canonicalize_url(url='https://www.google.com/url?q=https://www.cnbc.com/story&sa=D'), 'https://www.cnbc.com/story')
+
+    def test_strings_which_are_not_web_urls_are_unchanged(self):
+        """Test that strings without an http or https scheme are returned unchanged."""
+        for url in ['url1', 'mailto:someone@example.com', 'https://example.com:port/']:
+            with self.subTest(url=url):
+                self.assertEqual(canonicalize_url(url=url), url)
+
+    def test_search_results_are_deduplicated_by_canonical_url(self):
+        """Test that variants of the same article returned by different search terms are aggregated once, as the first URL returned."""
+        search_results = {
+            'term1': ['https://www.example.com/story?utm_source=ddg', 'http://www.example.com/other?id'],
+            'term2': ['http://www.example.com/story/amp/', 'https://www.example.com/other?id=']
+        }
+        self.assertEqual(
+            _aggregate_search_results(search_results=search_results),
+            ['http://www.example.com/other?id', 'https://www.example.com/story?utm_source=ddg']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Get the absolute path to the back_end directory
+back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if back_end_path not in sys.path:
+    sys.path.insert(0, back_end_path)
+
+from utils import AdaptiveRateLimiter, RateLimiter, WorkerPool, run_multiple_with_limited_time
+
+
+class TestRunMultipleWithLimitedTime(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(name='test', max_workers=4)
+
+    def tearDown(self):
+        self.pool.shutdown(wait=False)
+
+    def test_results_are_returned_in_the_order_of_the_arguments(self):
+        """Test that the return values of the calls are collected in the order of the arguments."""
+        def square(x):
+            time.sleep(0.01 * (5 - x))
+            return x * x
+
+        results = run_multiple_with_limited_time(func=square, args=[1, 2, 3, 4], max_time=None, pool=self.pool)
+        self.assertEqual(results, [1, 4, 9, 16])
+
+    def test_calls_exceeding_the_time_limit_are_dropped(self):
+        """Test that the calls which run longer than max_time are dropped from the results."""
+        def sleep_for(duration):
+            time.sleep(duration)
+            return duration
+
+        results = run_multiple_with_limited_time(func=sleep_for, args=[0.01, 1.0, 0.02], max_time=0.3, pool=self.pool)
+        self.assertEqual(results, [0.01, 0.02])
+
+    def test_calls_which_timed_out_are_dropped_even_if_they_end_before_the_others(self):
+        """Test that a call which timed out, but kept its worker until it ended before the other calls, is dropped."""
+        def sleep_for(duration):
+            time.sleep(duration)
+            return duration
+
+        pool = WorkerPool(name='test single worker', max_workers=1)
+        try:
+            results = run_multiple_with_limited_time(func=sleep_for, args=[0.3, 0.1], max_time=0.2, pool=pool)
+        finally:
+            pool.shutdown(wait=False)
+
+        self.assertEqual(results, [0.1])
+
+    def test_time_limit_starts_when_a_worker_picks_up_the_call(self):
+        """Test that calls queued behind busy workers get their full time limit once they start."""
+        def sleep_for(duration):
+            time.sleep(duration)
+            return duration
+
+        pool = WorkerPool(name='test single worker', max_workers=1)
+        try:
+            results = run_multiple_with_limited_time(func=sleep_for, args=[0.2, 0.2, 0.2], max_time=0.5, pool=pool)
+        finally:
+            pool.shutdown(wait=False)
+
+        self.assertEqual(results, [0.2, 0.2, 0.2])
+
+    def test_worker_processes_use_the_start_method_of_the_pool(self):
+        """Test that a process-based pool runs its calls in worker processes started with its start method."""
+        pool = WorkerPool(name='test spawned processes', max_workers=1, use_processes=True, start_method='spawn')
+        try:
+            self.assertEqual(pool.submit(pow, 2, 10).result(timeout=30), 1024)
+            self.assertEqual(pool.get_executor()._mp_context.get_start_method(), 'spawn')
+        finally:
+            pool.shutdown(wait=True)
+
+    def test_calls_raising_an_exception_are_dropped(self):
+        """Test that the calls which raise an exception are dropped from the results."""
+        def invert(x):
+            return 1 / x
+
+        results = run_multiple_with_limited_time(func=invert, args=[1, 0, 2], max_time=None, pool=self.pool)
+        self.assertEqual(results, [1.0, 0.5])
+
+    def test_concurrency_is_limited_per_key(self):
+        """Test that no more than max_concurrent_per_key calls with the same key run at once."""
+        lock = threading.Lock()
+        running = {'a': 0, 'b': 0}
+        max_running = {'a': 0, 'b': 0}
+
+        def crawl(url):
+            domain = url.split('/')[0]
+            with lock:
+                running[domain] += 1
+                max_running[domain] = max(max_running[domain], running[domain])
+            time.sleep(0.05)
+            with lock:
+                running[domain] -= 1
+            return url
+
+        urls = [f'{domain}/{i}' for i in range(6) for domain in ['a', 'b']]
+        results = run_multiple_with_limited_time(
+            func=crawl, args=urls, max_time=1, pool=self.pool, key=lambda url: url.split('/')[0], max_concurrent_per_key=2
+        )
+
+        self.assertEqual(results, urls)
+        self.assertEqual(max_running, {'a': 2, 'b': 2})
+
+    def test_pool_is_reused_across_calls(self):
+        """Test that the executor of a pool is created once and reused by subsequent calls."""
+        run_multiple_with_limited_time(func=abs, args=[-1], pool=self.pool)
+        executor = self.pool.get_executor()
+        run_multiple_with_limited_time(func=abs, args=[-2], pool=self.pool)
+        self.assertIs(self.pool.get_executor(), executor)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_up_to_the_rate_does_not_wait(self):
+        """Test that a full bucket serves one second worth of requests at once."""
+        rate_limiter = RateLimiter(max_requests_per_sec=20)
+        wait_times = [rate_limiter.acquire() for _ in range(20)]
+        self.assertEqual(wait_times, [0.0] * 20)
+
+    def test_requests_beyond_the_burst_are_spaced_by_the_rate(self):
+        """Test that once the bucket is empty, each request waits for the refill of one token."""
+        rate_limiter = RateLimiter(max_requests_per_sec=20)
+        for _ in range(20):
+            rate_limiter.acquire()
+
+        timestamp_start = time.monotonic()
+        for _ in range(4):
+            rate_limiter.acquire()
+        elapsed = time.monotonic() - timestamp_start
+
+        self.assertAlmostEqual(elapsed, 4 / 20, delta=0.05)
+        statistics = rate_limiter.get_statistics()
+        self.assertEqual(statistics['acquisitions'], 24)
+        self.assertEqual(statistics['waits'], 4)
+        self.assertGreater(statistics['max_wait_time'], 0)
+
+    def test_concurrent_waiters_reserve_distinct_tokens(self):
+        """Test that threads waiting on an empty bucket are released one refill interval apart."""
+        rate_limiter = RateLimiter(max_requests_per_sec=10)
+        for _ in range(10):
+            rate_limiter.acquire()
+
+        wait_times = []
+        threads = [threading.Thread(target=lambda: wait_times.append(rate_limiter.acquire())) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for wait_time, expected_wait_time in zip(sorted(wait_times), [0.1, 0.2, 0.3]):
+            self.assertAlmostEqual(wait_time, expected_wait_time, delta=0.03)
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.rate_limiter = AdaptiveRateLimiter(name='test', max_requests_per_sec=10, min_requests_per_sec=1, decrease_cooldown=60)
+
+    def test_throttling_halves_the_rate_once_per_cooldown(self):
+        """Test that a burst of throttling responses only cuts the rate once."""
+        for _ in range(5):
+            self.rate_limiter.record_response(status_code=429)
+        self.assertEqual(self.rate_limiter.get_current_requests_per_sec(), 5)
+        self.assertEqual(self.rate_limiter.get_statistics()['throttles'], 5)
+        self.assertEqual(self.rate_limiter.get_statistics()['decreases'], 1)
+
+    def test_successes_probe_upward_up_to_the_maximum(self):
+        """Test that successful responses increase the rate additively without exceeding the maximum rate."""
+        self.rate_limiter.record_throttled()
+        for _ in range(5):
+            self.rate_limiter.record_success()
+        self.assertAlmostEqual(self.rate_limiter.get_current_requests_per_sec(), 5.9, delta=0.1)
+
+        for _ in range(100):
+            self.rate_limiter.record_response(status_code=200)
+        self.assertEqual(self.rate_limiter.get_current_requests_per_sec(), 10)
+
+    def test_rate_does_not_drop_below_the_minimum(self):
+        """Test that repeated throttling does not cut the rate below the minimum rate."""
+        rate_limiter = AdaptiveRateLimiter(name='test', max_requests_per_sec=4, min_requests_per_sec=1, decrease_cooldown=0)
+        for _ in range(10):
+            rate_limiter.record_throttled()
+        self.assertEqual(rate_limiter.get_current_requests_per_sec(), 1)
+
+    def test_other_status_codes_do_not_change_the_rate(self):
+        """Test that errors which are not throttling responses leave the rate unchanged."""
+        self.rate_limiter.record_throttled()
+        self.rate_limiter.record_response(status_code=404)
+        self.rate_limiter.record_response(status_code=500)
+        self.assertEqual(self.rate_limiter.get_current_requests_per_sec(), 5)
+
+    def test_lowering_the_maximum_lowers_the_current_rate(self):
+        """Test that a lower maximum rate caps the current rate."""
+        self.rate_limiter.update_max_requests_per_sec(max_requests_per_sec=3)
+        self.assertEqual(self.rate_limiter.get_max_requests_per_sec(), 3)
+        self.assertEqual(self.rate_limiter.get_current_requests_per_sec(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,20 @@
 import os
 import sys
+import tempfile
+import time
 import unittest
 from multiprocessing import Queue
 from unittest.mock import patch
 
+import diskcache as dc
+
 # Get the absolute path to the back_end directory
 back_end_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if back_end_path not in sys.path:
     sys.path.insert(0, back_end_path)
 
-from websearch import perform_web_search
+from cache import TieredCache
+from websearch import TIMED_OUT_SEARCH_TTL, _set_entry_for_timed_out_searches, perform_web_search
 from progress_sink import ProgressSink
 from generate_recent_news import GenerateRecentNews
 
@@ -101,5 +106,35 @@ class TestWebSearch(unittest.TestCase):
             self.assertIsInstance(result, GenerateRecentNews)
             self.assertEqual(result.retrieved_urls, ["url1", "url2"])
 
+    def test_timed_out_searches_are_cached_briefly(self):
+        """Test that the empty entry of a search which timed out only lives for a short time, without being kept stale."""
+        cache_dir = tempfile.TemporaryDirectory()
+        cache = TieredCache(disk_cache=dc.Cache(cache_dir.name))
+
+        with patch('websearch.cache', cache):
+            search_results = _set_entry_for_timed_out_searches(search_terms=["term1", "term2"], search_results={"term1": ["url1"]})
+
+        self.assertEqual(search_results, {"term1": ["url1"], "term2": []})
+        self.assertNotIn("Search results for: term1", cache)
+        value, expire_time, fresh_until = cache.disk_cache.get("Search results for: term2", expire_time=True, tag=True)
+        self.assertEqual(value, [])
+        self.assertLessEqual(expire_time, time.time() + TIMED_OUT_SEARCH_TTL)
+        self.assertIsNone(fresh_until)
+        cache.close()
+        cache_dir.cleanup()
+
+    def test_timed_out_searches_keep_stale_results(self):
+        """Test that a search which timed out does not replace the stale results of the search term, which are still served."""
+        cache_dir = tempfile.TemporaryDirectory()
+        cache = TieredCache(disk_cache=dc.Cache(cache_dir.name))
+        cache.set("Search results for: term1", ["stale url"], expire=0)
+
+        with patch('websearch.cache', cache):
+            _set_entry_for_timed_out_searches(search_terms=["term1"], search_results={})
+
+        self.assertEqual(cache.get_stale_while_revalidate("Search results for: term1", revalidate=lambda: None), ["stale url"])
+        cache.close()
+        cache_dir.cleanup()
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
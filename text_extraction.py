@@ -0,0 +1,173 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import lxml.etree
+import lxml.html
+from bs4 import BeautifulSoup
+
+
+# This module is imported by the HTML parsing worker processes, so it must not import modules with side effects such as utils
+MIN_PARAGRAPH_LENGTH = 30 #Characters, shorter paragraphs are mostly bylines, captions and buttons
+MAX_LINK_DENSITY = 0.5 #Paragraphs mostly made of links are navigation, related articles or sharing links
+PARAGRAPH_SEPARATOR = '\n'
+
+
+@dataclass(frozen=True)
+class Paragraph:
+    """The text of a <p> element, with the length of the text of the links it contains."""
+    text: str
+    link_text_length: int = 0
+
+    @property
+    def link_density(self) -> float:
+        """The share of the text of the paragraph which is the text of links."""
+        return self.link_text_length / len(self.text) if self.text else 0.0
+
+
+def _normalize_whitespace(text: str) -> str:
+    return ' '.join(text.split())
+
+
+class TextExtractionEngine(ABC):
+    """Abstract base class for an engine extracting the paragraphs of an HTML page."""
+
+    name = ''
+
+    @abstractmethod
+    def extract_paragraphs_with_links(self, html: str) -> list[Paragraph]:
+        """
+        Extracts the <p> elements of an HTML page, in document order.
+        The whitespace of the text of each paragraph and of each link is collapsed into single spaces.
+
+        Args:
+            html (str): The HTML page, which must not be empty
+
+        Returns:
+            list[Paragraph]: The text of each paragraph and the length of the text of its links
+        """
+        pass
+
+    def extract_paragraphs(self, html: str) -> list[str]:
+        """
+        Extracts the text of the <p> elements of an HTML page, in document order.
+        The whitespace of each paragraph is collapsed into single spaces.
+
+        Args:
+            html (str): The HTML page, which must not be empty
+
+        Returns:
+            list[str]: The text of each paragraph
+        """
+        return [paragraph.text for paragraph in self.extract_paragraphs_with_links(html=html)]
+
+
+class BeautifulSoupEngine(TextExtractionEngine):
+    """Extracts paragraphs from the tree built by BeautifulSoup with the pure Python html.parser."""
+
+    name = 'beautifulsoup'
+
+    def extract_paragraphs_with_links(self, html: str) -> list[Paragraph]:
+        soup = BeautifulSoup(html, 'html.parser')
+        return [
+            Paragraph(
+                text=_normalize_whitespace(p.get_text()),
+                link_text_length=sum(len(_normalize_whitespace(a.get_text())) for a in p.find_all('a'))
+            )
+            for p in soup.find_all('p')
+        ]
+
+
+class LxmlEngine(TextExtractionEngine):
+    """Extracts paragraphs from the tree built by the libxml2 HTML parser, which is several times faster than html.parser."""
+
+    name = 'lxml'
+
+    def __init__(self) -> None:
+        self._thread_local = threading.local()
+
+    def _get_parser(self) -> lxml.html.HTMLParser:
+        """Returns the parser of the current thread, since a parser must not be used by several threads at once."""
+        parser = getattr(self._thread_local, 'parser', None)
+        if parser is None:
+            # The page is passed as UTF-8 bytes, since lxml rejects strings carrying an XML encoding declaration
+            parser = self._thread_local.parser = lxml.html.HTMLParser(encoding='utf-8')
+        return parser
+
+    def extract_paragraphs_with_links(self, html: str) -> list[Paragraph]:
+        try:
+            root = lxml.html.document_fromstring(html.encode('utf-8', errors='replace'), parser=self._get_parser())
+        except lxml.etree.ParserError:
+            # Raised for documents without any element, such as a page made of comments only
+            return []
+        return [
+            Paragraph(
+                text=_normalize_whitespace(p.text_content()),
+                link_text_length=sum(len(_normalize_whitespace(a.text_content())) for a in p.iter('a'))
+            )
+            for p in root.iter('p')
+        ]
+
+
+EXTRACTION_ENGINES = {engine.name: engine for engine in [LxmlEngine, BeautifulSoupEngine]}
+DEFAULT_EXTRACTION_ENGINE = os.environ.get('TEXT_EXTRACTION_ENGINE', LxmlEngine.name)
+
+
+def get_extraction_engine(name: str = DEFAULT_EXTRACTION_ENGINE) -> TextExtractionEngine:
+    """
+    Creates the text extraction engine of the given name.
+
+    Args:
+        name (str): The name of the engine, one of the keys of EXTRACTION_ENGINES
+
+    Returns:
+        TextExtractionEngine: The engine
+
+    Raises:
+        ValueError: If there is no engine of that name
+    """
+
+    if name not in EXTRACTION_ENGINES:
+        raise ValueError(f"Unknown text extraction engine {name}, available engines: {', '.join(EXTRACTION_ENGINES)}")
+    return EXTRACTION_ENGINES[name]()
+
+
+extraction_engine = get_extraction_engine()
+
+
+def is_boilerplate(paragraph: Paragraph) -> bool:
+    """
+    Checks whether a paragraph is boilerplate rather than article text, based on its length and on its link density
+    
+    Args:
+        paragraph (Paragraph): The paragraph to check
+        
+    Returns:
+        bool: True if the paragraph is too short or mostly made of links
+    """
+
+    return len(paragraph.text) < MIN_PARAGRAPH_LENGTH or paragraph.link_density > MAX_LINK_DENSITY
+
+
+def parse_text_from_html(text: str) -> str:
+    """
+    Parses HTML text to extract clean paragraph content, using the configured text extraction engine.
+    
+    Args:
+        text (str): The HTML text to parse
+        
+    Returns:
+        str: The paragraphs which are not boilerplate, in document order and without duplicates, one per line.
+            Returns empty string if input is empty, None, or contains only whitespace.
+    """
+
+    if not text or not text.strip():
+        return ''
+        
+    paragraphs = extraction_engine.extract_paragraphs_with_links(html=text)
+    
+    # Deduplicate while keeping the document order, so that the same page always gives the same text
+    unique_paragraphs = dict.fromkeys(paragraph.text for paragraph in paragraphs if not is_boilerplate(paragraph))
+    
+    return PARAGRAPH_SEPARATOR.join(unique_paragraphs).strip()
@@ -0,0 +1,107 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Query parameters which only track the origin of a visit and do not change the page
+TRACKING_PARAMETERS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl',
+    'ocid', 'cmpid', 'taid', 'guccounter', 'guce_referrer', 'guce_referrer_sig', 'ref_src', 'smid', 'sr_share'
+}
+TRACKING_PARAMETER_PREFIXES = ('utm_', 'at_', 'pk_')
+
+# Redirect wrappers of search engines and social networks, with the query parameter carrying the target URL
+REDIRECT_WRAPPERS = {
+    ('google.com', '/url'): ('q', 'url'),
+    ('duckduckgo.com', '/l/'): ('uddg',),
+    ('l.facebook.com', '/l.php'): ('u',),
+    ('lm.facebook.com', '/l.php'): ('u',),
+    ('out.reddit.com', ''): ('url',),
+}
+
+AMP_CACHE_HOST_SUFFIX = '.cdn.ampproject.org'
+AMP_PATH_SUFFIX = re.compile(r'(/amp|\.amp|/amp\.html)/?$', re.IGNORECASE)
+AMP_PATH_PREFIX = re.compile(r'^/amp(/|$)', re.IGNORECASE)
+
+
+def _is_tracking_parameter(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PARAMETER_PREFIXES)
+
+
+def _is_amp_parameter(name: str, value: str) -> bool:
+    """Checks whether a query parameter selects the AMP version of a page, as in ?amp, ?amp=1 or ?outputType=amp."""
+    name = name.lower()
+    return name == 'amp' or (name == 'outputtype' and value.lower() == 'amp')
+
+
+def _resolve_redirect_wrapper(url: str) -> str:
+    """Returns the target URL of a known redirect wrapper, or the URL itself if it is not a redirect wrapper."""
+    for _ in range(3): #Wrappers can be nested
+        parts = urlsplit(url)
+        host = parts.hostname.removeprefix('www.') if parts.hostname else ''
+        parameters = dict(parse_qsl(parts.query))
+        target = None
+        for (wrapper_host, wrapper_path), parameter_names in REDIRECT_WRAPPERS.items():
+            if host == wrapper_host and parts.path.startswith(wrapper_path):
+                target = next((parameters[name] for name in parameter_names if name in parameters), None)
+                break
+        if not target or not target.startswith(('http://', 'https://')):
+            return url
+        url = target
+    return url
+
+
+def _resolve_amp_cache(host: str, path: str) -> tuple[str, str]:
+    """Maps a page served by the Google AMP cache, such as www-example-com.cdn.ampproject.org/c/s/www.example.com/article, to its origin."""
+    if not host.endswith(AMP_CACHE_HOST_SUFFIX):
+        return host, path
+    match = re.match(r'^/[a-z]+(?:/s)?/([^/]+)(/.*)?$', path)
+    if match is None:
+        return host, path
+    return match.group(1).lower(), match.group(2) or '/'
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonicalizes a URL, so that the variants of the URL of the same article are identical. The canonical URL:
+    resolves known redirect wrappers, uses https, has a lowercase host without default port,
+    points to the non-AMP version of the page, has no tracking parameters, fragment or trailing slash,
+    and has its remaining query parameters sorted.
+    Strings which are not http or https URLs are returned unchanged, apart from surrounding whitespace.
+
+    Args:
+        url (str): The URL to canonicalize
+
+    Returns:
+        str: The canonical URL
+    """
+
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+            return url
+
+        parts = urlsplit(_resolve_redirect_wrapper(url))
+        port = parts.port
+    except ValueError:
+        #Malformed URL, such as one with an invalid port
+        return url
+
+    host = parts.hostname.rstrip('.')
+    if port is not None and port not in (80, 443):
+        host = f'{host}:{port}'
+
+    host, path = _resolve_amp_cache(host=host, path=parts.path)
+    path = AMP_PATH_PREFIX.sub('/', AMP_PATH_SUFFIX.sub('', path)) or '/'
+    path = re.sub(r'/{2,}', '/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    parameters = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_parameter(name) and not _is_amp_parameter(name, value)
+    )
+
+    return urlunsplit(('https', host, path, urlencode(parameters), ''))
@@ -1,10 +1,15 @@
 # Standard library imports
+import asyncio
 import datetime
 import logging
 import os
+import threading
 import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from functools import wraps
-from multiprocessing import Lock, Manager, Process
+from multiprocessing import Lock, Value, current_process, get_context, parent_process
 from typing import Any, Callable, Optional
 
 # Third-party imports
@@ -26,7 +31,10 @@ log.propagate = True
 log.setLevel(logging.DEBUG)
 formatter = logging.Formatter('%(message)s')
 
-file_handler = logging.FileHandler(LOG_FILENAME, mode = 'w', encoding = 'utf-8')
+# The log is only started afresh by the main process: worker processes import the modules of the app again,
+# and would otherwise truncate what the main process has already logged
+is_main_process = current_process().name == 'MainProcess' and parent_process() is None
+file_handler = logging.FileHandler(LOG_FILENAME, mode = 'w' if is_main_process else 'a', encoding = 'utf-8')
 file_handler.setLevel(logging.DEBUG)
 file_handler.setFormatter(formatter)
 log.addHandler(file_handler)
@@ -93,33 +101,164 @@ def log_processing_duration(timestamp_start: datetime.datetime, timestamp_end: d
         sink.send(complete_message)
 
 
-def run_multiple_with_limited_time(func: Callable, args: list[Any], max_time: Optional[float] = None) -> list[Any]:
+class WorkerPool:
     """
-    Runs multiple processes in parallel with a time limit.
+    A long-lived, bounded pool of workers, shared by all the calls made for the same workload.
+    The underlying executor is only created on first use, so that importing a module does not start any worker.
+    Thread-based pools suit I/O-bound workloads (web search, crawling, LLM calls), while process-based pools suit
+    CPU-bound workloads and require the submitted functions and their arguments to be picklable.
+    The worker processes are started with the given start method, such as 'forkserver' or 'spawn', or else with the default one of the platform.
+    """
+
+    def __init__(self, name: str, max_workers: int, use_processes: bool = False, start_method: Optional[str] = None) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _create_executor(self) -> Executor:
+        if self.use_processes:
+            mp_context = get_context(self.start_method) if self.start_method is not None else None
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name.replace(' ', '_'))
+
+    def get_executor(self) -> Executor:
+        """Returns the executor of the pool, creating it if needed."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+                log.info(f'Started the {self.name} worker pool with at most {self.max_workers} {"processes" if self.use_processes else "threads"}\n')
+            return self._executor
+
+    def submit(self, func: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Submits a function call to the pool, replacing the executor if one of its worker processes died."""
+        try:
+            return self.get_executor().submit(func, *args, **kwargs)
+        except BrokenProcessPool:
+            log.info(f'The {self.name} worker pool is broken, restarting it\n')
+            with self._lock:
+                self._executor = self._create_executor()
+            return self._executor.submit(func, *args, **kwargs)
+
+    async def run_async(self, func: Callable, *args: Any, max_time: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Runs a function call on the pool and awaits its result, so that blocking calls can be used as coroutines.
+        
+        Args:
+            func (Callable): The function to run
+            *args (Any): Positional arguments to pass to the function
+            max_time (Optional[float]): Maximum time to wait for the call in seconds, starting when a worker picks it up
+            **kwargs (Any): Keyword arguments to pass to the function
+        
+        Returns:
+            Any: The result of the function call
+        
+        Raises:
+            asyncio.TimeoutError: If the call did not finish within max_time
+        """
+
+        future = self.submit(func, *args, **kwargs)
+        if max_time is not None:
+            while not future.running() and not future.done():
+                await asyncio.sleep(DEADLINE_POLL_INTERVAL)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=max_time)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shuts down the executor of the pool, if it has been started."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+DEFAULT_WORKER_POOL_SIZE = 32
+DEADLINE_POLL_INTERVAL = 0.05
+
+default_worker_pool = WorkerPool(name='default', max_workers=DEFAULT_WORKER_POOL_SIZE)
+
+
+def run_multiple_with_limited_time(
+    func: Callable,
+    args: list[Any],
+    max_time: Optional[float] = None,
+    pool: Optional[WorkerPool] = None,
+    key: Optional[Callable[[Any], Any]] = None,
+    max_concurrent_per_key: Optional[int] = None
+) -> list[Any]:
+    """
+    Runs a function for multiple arguments in parallel on a worker pool, with a time limit for each call.
+    The time limit of a call starts when a worker picks it up, so that calls waiting for a free worker are not penalized.
+    The results of the calls which timed out or raised an exception are dropped. A call which timed out cannot be stopped:
+    it keeps its worker until it ends, and its result is dropped even if it ends before the other calls.
+    If a key function and a maximum concurrency per key are given, at most max_concurrent_per_key calls whose arguments
+    have the same key run at once, the others being submitted when one of them finishes.
     
     Args:
-        func (Callable): The function to run in parallel
+        func (Callable): The function to run in parallel, called with a single argument
         args (list[Any]): List of arguments to pass to the function
-        max_time (Optional[float]): Maximum time to wait for each process in seconds
+        max_time (Optional[float]): Maximum time to wait for each call in seconds
+        pool (Optional[WorkerPool]): The worker pool to run the calls on. Defaults to the default thread pool
+        key (Optional[Callable[[Any], Any]]): Function giving the key of an argument, such as the domain of a URL
+        max_concurrent_per_key (Optional[int]): Maximum number of calls running at once for the same key
     
     Returns:
-        list[Any]: List of results from the function calls
+        list[Any]: List of results from the function calls which finished in time, in the order of the arguments
     """
 
-    manager = Manager()
-    results = manager.list()
-
-    jobs = []
-
-    for arg in args:
-        p = Process(target=func, args=(arg, results,))
-        jobs.append(p)
-        p.start()
-
-    for p in jobs:
-        p.join(max_time)
-        if p.is_alive():
-            p.terminate()
+    pool = pool or default_worker_pool
+    keys = [key(arg) for arg in args] if key is not None and max_concurrent_per_key is not None else None
+    futures = [None] * len(args)
+    unsubmitted = list(range(len(args)))
+    running_per_key = Counter()
+    # Calls count against the concurrency of their key until they finish, even once they have timed out
+    key_of_running_calls = {}
+    pending = set()
+    started_at = {}
+    timed_out_futures = set()
+
+    while pending or unsubmitted:
+        for future in [future for future in key_of_running_calls if future.done()]:
+            running_per_key[key_of_running_calls.pop(future)] -= 1
+
+        waiting_for_key = []
+        for index in unsubmitted:
+            if keys is not None and running_per_key[keys[index]] >= max_concurrent_per_key:
+                waiting_for_key.append(index)
+                continue
+            future = futures[index] = pool.submit(func, args[index])
+            pending.add(future)
+            if keys is not None:
+                key_of_running_calls[future] = keys[index]
+                running_per_key[keys[index]] += 1
+        unsubmitted = waiting_for_key
+
+        if max_time is not None:
+            now = time.monotonic()
+            for future in pending:
+                if future not in started_at and future.running():
+                    started_at[future] = now
+
+            timed_out = {future for future in pending if future in started_at and now - started_at[future] >= max_time}
+            timed_out_futures |= timed_out
+            pending -= timed_out
+
+        poll_interval = DEADLINE_POLL_INTERVAL if max_time is not None or unsubmitted else None
+        if pending:
+            _, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+        elif unsubmitted:
+            # Only calls which timed out are holding the keys of the calls left to submit
+            wait(key_of_running_calls, timeout=poll_interval, return_when=FIRST_COMPLETED)
+
+    results = []
+    for future in futures:
+        if future is None or future in timed_out_futures or not future.done() or future.cancelled():
+            continue
+        if future.exception() is not None:
+            log.info(f'A call in the {pool.name} worker pool raised an exception: {future.exception()}\n')
+            continue
+        results.append(future.result())
 
     return results
 
@@ -223,36 +362,170 @@ def upload_to_gcs(source_filename: str, bucket_name: str = STORAGE_BUCKET_NAME,
 
 
 class RateLimiter:
-    def __init__(self, max_requests_per_sec: int) -> None:
-        self.max_requests = max_requests_per_sec
-        self.request_count = Manager().Value("i", 0)
-        self.lock = Lock()
-
-    def update_max_requests_per_sec(self, max_requests_per_sec: int) -> None:
-        self.max_requests = max_requests_per_sec
-
-    def get_max_requests_per_sec(self) -> int:
-        return self.max_requests
-
-    def reset_count(self) -> None:
-        """Runs in a background process to reset the request count every second."""
-        while True:
-            time.sleep(2)  # Reset every 2 seconds
-            with self.lock:
-                self.request_count.value = 0
-
-    def acquire(self) -> None:
-        """Blocks if the request limit is reached and waits until allowed."""
-        while True:
-            with self.lock:
-                if self.request_count.value < self.max_requests:
-                    self.request_count.value += 1
-                    return  # Proceed with the request
-            time.sleep(0.1)  # Check again in 0.1 seconds
+    """
+    Token-bucket rate limiter, shared across threads and forked processes through shared memory.
+    The bucket refills continuously at max_requests_per_sec tokens per second and holds at most one second of tokens.
+    A caller finding the bucket empty reserves the next token and sleeps exactly until it is refilled,
+    so waiters are served in the order in which they arrived, without polling and without a background process.
+    """
 
+    def __init__(self, max_requests_per_sec: float) -> None:
+        self.lock = Lock()
+        self.rate = Value('d', float(max_requests_per_sec), lock=False)
+        self.tokens = Value('d', float(max_requests_per_sec), lock=False)
+        self.last_refill = Value('d', time.monotonic(), lock=False)
+        self.acquisitions = Value('l', 0, lock=False)
+        self.waits = Value('l', 0, lock=False)
+        self.total_wait_time = Value('d', 0.0, lock=False)
+        self.max_wait_time = Value('d', 0.0, lock=False)
+
+    def update_max_requests_per_sec(self, max_requests_per_sec: float) -> None:
+        with self.lock:
+            self._refill()
+            self.rate.value = float(max_requests_per_sec)
+            self.tokens.value = min(self.tokens.value, self.rate.value)
+
+    def get_max_requests_per_sec(self) -> float:
+        return self.rate.value
+
+    def _refill(self) -> None:
+        """Adds the tokens accumulated since the last refill, up to the capacity of the bucket. Must be called holding the lock."""
+        now = time.monotonic()
+        self.tokens.value = min(self.rate.value, self.tokens.value + (now - self.last_refill.value) * self.rate.value)
+        self.last_refill.value = now
+
+    def acquire(self) -> float:
+        """
+        Takes a token from the bucket, blocking until one is available.
+
+        Returns:
+            float: The time in seconds spent waiting for the token
+        """
+
+        with self.lock:
+            self._refill()
+            self.tokens.value -= 1
+            wait_time = max(0.0, -self.tokens.value / self.rate.value)
+            self.acquisitions.value += 1
+            if wait_time > 0:
+                self.waits.value += 1
+                self.total_wait_time.value += wait_time
+                self.max_wait_time.value = max(self.max_wait_time.value, wait_time)
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    def get_statistics(self) -> dict[str, float]:
+        """Returns the configured rate and how often and how long callers had to wait for a token."""
+        with self.lock:
+            return {
+                'max_requests_per_sec': self.rate.value,
+                'acquisitions': self.acquisitions.value,
+                'waits': self.waits.value,
+                'total_wait_time': self.total_wait_time.value,
+                'average_wait_time': self.total_wait_time.value / self.acquisitions.value if self.acquisitions.value else 0.0,
+                'max_wait_time': self.max_wait_time.value
+            }
+
+
+THROTTLING_STATUS_CODES = (429, 503)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token-bucket rate limiter whose rate adapts to the feedback of the upstream service (AIMD).
+    Each successful response increases the rate additively, by increase_step requests per second for each second
+    worth of successful requests, up to the configured maximum. Each throttling response (429 or 503) cuts the rate
+    multiplicatively, down to the minimum, at most once per decrease_cooldown seconds, since the requests
+    already in flight when the quota is exceeded are all throttled together.
+    """
 
-rate_limiter_search_requests = RateLimiter(max_requests_per_sec=30)
-rate_limiter_llm_calls = RateLimiter(max_requests_per_sec=5)
+    def __init__(
+        self,
+        name: str,
+        max_requests_per_sec: float,
+        min_requests_per_sec: float = 1.0,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0
+    ) -> None:
+        super().__init__(max_requests_per_sec=max_requests_per_sec)
+        self.name = name
+        self.max_rate = Value('d', float(max_requests_per_sec), lock=False)
+        self.min_rate = float(min_requests_per_sec)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.last_decrease = Value('d', 0.0, lock=False)
+        self.successes = Value('l', 0, lock=False)
+        self.throttles = Value('l', 0, lock=False)
+        self.decreases = Value('l', 0, lock=False)
+
+    def update_max_requests_per_sec(self, max_requests_per_sec: float) -> None:
+        """Sets the maximum rate, up to which the rate is probed, and lowers the current rate if it exceeds it."""
+        with self.lock:
+            self._refill()
+            self.max_rate.value = float(max_requests_per_sec)
+            self._set_rate(min(self.rate.value, self.max_rate.value))
+
+    def get_max_requests_per_sec(self) -> float:
+        return self.max_rate.value
+
+    def get_current_requests_per_sec(self) -> float:
+        return self.rate.value
+
+    def _set_rate(self, rate: float) -> None:
+        """Sets the refill rate of the bucket, keeping at most one second of tokens. Must be called holding the lock."""
+        self.rate.value = max(self.min_rate, min(self.max_rate.value, rate))
+        self.tokens.value = min(self.tokens.value, self.rate.value)
+
+    def record_success(self) -> None:
+        """Probes upward after a successful response."""
+        with self.lock:
+            self._refill()
+            self.successes.value += 1
+            self._set_rate(self.rate.value + self.increase_step / self.rate.value)
+
+    def record_throttled(self) -> None:
+        """Backs off after a throttling response."""
+        with self.lock:
+            self._refill()
+            self.throttles.value += 1
+            now = time.monotonic()
+            if now - self.last_decrease.value < self.decrease_cooldown:
+                return
+            self.last_decrease.value = now
+            self.decreases.value += 1
+            self._set_rate(self.rate.value * self.decrease_factor)
+            rate = self.rate.value
+        log.info(f'Rate limiter for {self.name} throttled, backing off to {rate:.2f} requests per second\n')
+
+    def record_response(self, status_code: int) -> None:
+        """Adapts the rate to the status code of a response of the upstream service."""
+        if status_code in THROTTLING_STATUS_CODES:
+            self.record_throttled()
+        elif 200 <= status_code < 300:
+            self.record_success()
+
+    def get_statistics(self) -> dict[str, float]:
+        """Returns the effective and maximum rates, the feedback received and the wait times of the callers."""
+        statistics = super().get_statistics()
+        with self.lock:
+            statistics.update({
+                'current_requests_per_sec': self.rate.value,
+                'max_requests_per_sec': self.max_rate.value,
+                'min_requests_per_sec': self.min_rate,
+                'successes': self.successes.value,
+                'throttles': self.throttles.value,
+                'decreases': self.decreases.value
+            })
+        return statistics
+
+
+rate_limiter_search_requests = AdaptiveRateLimiter(name='DuckDuckGo', max_requests_per_sec=30)
+rate_limiter_llm_calls = AdaptiveRateLimiter(name='Gemini', max_requests_per_sec=5, min_requests_per_sec=0.2, increase_step=0.2)
+rate_limiter_crawlbase = AdaptiveRateLimiter(name='Crawlbase', max_requests_per_sec=20)
 
 
 def retry_on_exceeding_rate_limit(max_retries: int = 8, base_delay: float = 3.0, backoff_factor: float = 2.0) -> Callable:
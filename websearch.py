@@ -1,11 +1,13 @@
-from cache import cache, TTL
+from cache import cache
 from generate_recent_news import GenerateRecentNews
 from progress_sink import ProgressSink
+from url_canonicalization import canonicalize_url
 from utils import log, get_and_log_current_time, log_processing_duration, run_multiple_with_limited_time, convert_to_dictionary
-from websearch_client import websearch_client
+from websearch_client import websearch_client, websearch_worker_pool
 
 
 MAX_TIME_WEBSEARCH_PER_SEARCH_TERM = None
+TIMED_OUT_SEARCH_TTL = 60 #Seconds, searches which timed out are done again after this time
 
 
 def _set_entry_for_timed_out_searches(search_terms: list[str], search_results: dict[str, list[str]]) -> dict[str, list[str]]:
@@ -21,11 +23,14 @@ def _set_entry_for_timed_out_searches(search_terms: list[str], search_results: d
     """
     
     for s in search_terms:   
+        if s in search_results:
+            continue
         key = "Search results for: {}".format(s)
-        if cache.get(key=key, default=["No cache entry found"]) == ["No cache entry found"]:
-            cache.set(key=key, value=[], expire=TTL)
+        # Stale results are kept, since they are still served while being revalidated, and the empty marker is never kept stale
+        if cache.get(key=key, default=["No cache entry found"], stale=True) == ["No cache entry found"]:
+            cache.set(key=key, value=[], expire=TIMED_OUT_SEARCH_TTL, stale_ttl=0)
             #log.info('Cache entry set (after the search was done) for {}: {}\n'.format(s, []))
-            search_results[s] = []
+        search_results[s] = []
 
     return search_results
     
@@ -49,17 +54,21 @@ def _log_search_results(search_results: dict[str, list[str]]) -> None:
 
 def _aggregate_search_results(search_results: dict[str, list[str]]) -> list[str]:
     """
-    Aggregates and deduplicates search results for multiple search terms
+    Aggregates and deduplicates search results for multiple search terms, comparing the canonical forms of the URLs.
+    The first URL returned for each canonical form is kept as is, since the canonical form is a key which may not be fetchable.
     
     Args:
         search_results (dict[str, list[str]]): A dictionary containing for each search term the list of retrieved URLs
     
     Returns:
-        list[str]: A sorted list containing the aggregated and deduplicated search results
+        list[str]: A sorted list containing the aggregated and deduplicated URLs
     """
     
-    aggregated_search_results = set(url for urls in search_results.values() for url in urls)
-    return sorted(list(aggregated_search_results))
+    original_urls = {}
+    for urls in search_results.values():
+        for url in urls:
+            original_urls.setdefault(canonicalize_url(url=url), url)
+    return sorted(original_urls.values())
 
 
 def perform_web_search(recent_news: GenerateRecentNews, sink: ProgressSink) -> GenerateRecentNews:
@@ -83,13 +92,14 @@ def perform_web_search(recent_news: GenerateRecentNews, sink: ProgressSink) -> G
         raise Exception("Search terms have not been generated")
     
     def wrapper(search_function):
-        return lambda search_term, results: results.append({search_term: search_function(search_term)['search_results']})
+        return lambda search_term: {search_term: search_function(search_term)['search_results']}
     
-    search_results = list(run_multiple_with_limited_time(
+    search_results = run_multiple_with_limited_time(
         func=wrapper(websearch_client.search_web),
         args=recent_news.search_terms,
-        max_time=MAX_TIME_WEBSEARCH_PER_SEARCH_TERM
-    ))
+        max_time=MAX_TIME_WEBSEARCH_PER_SEARCH_TERM,
+        pool=websearch_worker_pool
+    )
     search_results = convert_to_dictionary(key_value_list=search_results)  
     search_results = _set_entry_for_timed_out_searches(
         search_terms=recent_news.search_terms,
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import RatelimitException
 from cache import *
 from utils import *
 from typing import *
@@ -7,6 +8,9 @@ from progress_sink import *
 
 
 NEWS_RESULT_COUNT = 10
+MAX_CONCURRENT_SEARCHES = 32
+
+websearch_worker_pool = WorkerPool(name = 'web search', max_workers = MAX_CONCURRENT_SEARCHES)
 
 
 class WebSearchClient(ABC):
@@ -22,6 +26,10 @@ class WebSearchClient(ABC):
         """Method to search a search term on the web."""
         pass
 
+    async def search_web_async(self, search_term, max_time = None):
+        """Coroutine searching a search term on the web on the web search worker pool."""
+        return await websearch_worker_pool.run_async(self.search_web, search_term, max_time = max_time)
+
 
 class DuckDuckGoClient(WebSearchClient):
     """Concrete implementation of WebSearchClient for DuckDuckGo."""
@@ -36,39 +44,57 @@ class DuckDuckGoClient(WebSearchClient):
 
         try:
             key = "Search results for: {}".format(search_term)
-            cached_result = cache.get(key, ["No cache entry found"])
+            # Stale search results are served right away while they are refreshed in the background
+            cached_result = cache.get_stale_while_revalidate(
+                key,
+                revalidate = lambda: self._search_and_store(search_term, key, rate_limiter),
+                default = ["No cache entry found"]
+            )
             #log.info('Searching for key in the cache: {}, found: {}\n'.format(key, cached_result))
     
             if cached_result != ["No cache entry found"]:
                 log.info('Cache hit for {}\n'.format(key))
                 return {'status_code': 200, 'search_results': cached_result}
-            else:
-                log.info('Searching the web for {}\n'.format(search_term))
+            
+            return {'status_code': 200, 'search_results': self._search_and_store(search_term, key, rate_limiter)}
     
-                rate_limiter.acquire()
-                
+        except Exception as e:
+                log.info('An exception ocurred during searching the web for {}: {}\n'.format(search_term, e))
+                default_status_code = 429 if isinstance(e, RatelimitException) else 500
+                return {'status_code': getattr(e, 'status_code', default_status_code), 'search_results': []}
+
+    def _search_and_store(self, search_term, key, rate_limiter):
+        """Searches a search term on the web and stores the retrieved URLs into the cache, unless fresh ones are already stored."""
+
+        # Only one caller searches the web for the same search query, the others wait for its results
+        with cache.single_flight(key):
+            previously_stored_search_results = cache.get(key, ["No cache entry found"])
+            if previously_stored_search_results != ["No cache entry found"]:
+                log.info('Search results already stored in the cache for the same search query {}\n'.format(search_term))
+                return previously_stored_search_results
+            
+            log.info('Searching the web for {}\n'.format(search_term))
+
+            rate_limiter.acquire()
+            
+            try:
                 search_results = self.client.news(
                     keywords = search_term, 
                     region = "us-en", #or "wt-wt" ?
                     timelimit = "d", #results from today only
                     max_results = NEWS_RESULT_COUNT
                 )
-    
-                search_results_urls = [n['url'] for n in search_results]
-                #log.info('Search results found for {}: {}\n'.format(search_term, search_results_urls))
-    
-                previously_stored_search_results = cache.get(key, ["No cache entry found"])
-                if previously_stored_search_results != ["No cache entry found"]:
-                    log.info('Search results already stored in the cache for the same search query {}\n'.format(search_term))
-                    return {'status_code': 200, 'search_results': previously_stored_search_results}
-                else:
-                    cache.set(key, search_results_urls, expire = TTL)
-                    #log.info('Cache entry set for {}\n'.format(key))
-                    return {'status_code': 200, 'search_results': search_results_urls}
-    
-        except Exception as e:
-                log.info('An exception ocurred during searching the web for {}: {}\n'.format(search_term, e))
-                return {'status_code': getattr(e, 'status_code', 500), 'search_results': []}
+            except RatelimitException:
+                rate_limiter.record_throttled()
+                raise
+            rate_limiter.record_success()
+
+            search_results_urls = [n['url'] for n in search_results]
+            #log.info('Search results found for {}: {}\n'.format(search_term, search_results_urls))
 
+            # Stored for the TTL of the search results namespace, and kept stale for a while longer
+            cache.set(key, search_results_urls)
+            #log.info('Cache entry set for {}\n'.format(key))
+            return search_results_urls
 
 websearch_client = DuckDuckGoClient()
\ No newline at end of file